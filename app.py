@@ -4,39 +4,322 @@ Flask Web Application — Main Entry Point
 """
 
 import os
+import io
+import atexit
 import sys
 import json
-import base64
-import tempfile
+import struct
+import binascii
+import importlib
+import threading
 
+import numpy as np
 from flask import (
-    Flask, render_template, request, jsonify, session, redirect, url_for
+    Flask, Request, Response, render_template, request, jsonify, session,
+    redirect, url_for
 )
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from database.db_utils import init_db
+from emotion.worker_pool import InferencePoolBusy, InferenceTimeout, get_inference_pool
 from database.seed_data import seed_database
-from emotion.predict import predict_emotion, predict_emotion_from_bytes
-from questionnaire.questions import get_first_question, get_question
+from questionnaire.graph import get_question_graph
 from questionnaire.scorer import score_responses
 from fusion.mood_fusion import fuse_moods
+from fusion.mood_vector import from_dict, normalize, to_dict, top_mood
 from recommender.engine import get_recommendations
+from recommender.questionnaire_table import get_questionnaire_table
+from sessions.flask_interface import ServerSideSessionInterface
+from sessions.store import get_session_store
 
 # ── Flask App Setup ──────────────────────────────────────────────────────
+class InMemoryUploadRequest(Request):
+    """Request that buffers uploaded files in memory instead of temp files."""
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        return io.BytesIO()
+
+
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 app.secret_key = "mood-recommendation-secret-key-2024"
 
-# Upload folder
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads are held in memory, so cap the request size
+app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024
+
+# Images accepted by one /api/upload-batch request
+app.config["MAX_BATCH_IMAGES"] = int(os.environ.get("MAX_BATCH_IMAGES", "32"))
+
+# Preload the emotion pipeline in the background after startup
+# (set EMOTION_WARMUP=0 for workers that only serve the questionnaire)
+app.config["EMOTION_WARMUP"] = os.environ.get("EMOTION_WARMUP", "1") != "0"
+
+# Seconds interpreter exit waits for a warm-up still importing native code
+app.config["EMOTION_WARMUP_EXIT_TIMEOUT"] = 10.0
+
+# Run detection and the CNN in this many worker processes (0 = in-process)
+app.config["INFERENCE_WORKERS"] = int(os.environ.get("INFERENCE_WORKERS", "0"))
+
+# Where session data lives: "sqlite" (shared by worker processes),
+# "memory" (one process only) or "cookie" (Flask's signed cookie, no
+# server state)
+app.config["SESSION_BACKEND"] = os.environ.get("SESSION_BACKEND", "sqlite")
+if (app.config["SESSION_BACKEND"] == "memory"
+        and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1):
+    # Each process would only see its own sessions
+    raise RuntimeError(
+        "SESSION_BACKEND=memory cannot be shared by WEB_CONCURRENCY > 1 web "
+        "processes; use SESSION_BACKEND=sqlite."
+    )
+if app.config["SESSION_BACKEND"] != "cookie":
+    app.session_interface = ServerSideSessionInterface(
+        get_session_store(app.config["SESSION_BACKEND"])
+    )
 
 
 # ── Initialize Database on Startup ──────────────────────────────────────
 with app.app_context():
     seed_database()
 
+# Validate the question tree and pre-encode its responses (fails fast);
+# request handlers call get_question_graph(), which follows later edits
+# Fused results and slot allocations of every questionnaire-only path
+get_questionnaire_table(get_question_graph())
+
+
+# ── Emotion Pipeline (loaded lazily) ────────────────────────────────────
+# emotion.predict pulls in OpenCV (and TensorFlow when no serving artifact
+# exists), so it is imported on the first upload instead of at startup.
+# With INFERENCE_WORKERS set it never loads here: the pool's workers do.
+
+def emotion_pipeline():
+    """
+    Return the object serving predictions: the inference pool, or the
+    emotion.predict module (imported on first use).
+    """
+    if app.config["INFERENCE_WORKERS"] > 0:
+        return get_inference_pool(app.config["INFERENCE_WORKERS"])
+    return importlib.import_module("emotion.predict")
+
+
+def _warm_up_emotion():
+    try:
+        emotion_pipeline().warm_up()
+    except Exception as e:
+        print(f"Warning: Emotion pipeline warm-up failed: {e}")
+
+
+_warmup_pid = None
+
+
+def start_emotion_warmup():
+    """
+    Import and load the emotion pipeline on a background thread.
+
+    Called by the server entry points (the `__main__` block here, the
+    ASGI lifespan, or a WSGI server's worker hook), never at import, so
+    importing the app stays cheap. Does nothing when EMOTION_WARMUP is off
+    or the warm-up already started in this process.
+    """
+    global _warmup_pid
+    if not app.config["EMOTION_WARMUP"] or _warmup_pid == os.getpid():
+        return None
+    _warmup_pid = os.getpid()
+    # A daemon, so a slow model load never holds up interpreter shutdown for
+    # long; exit still waits briefly, since finalizing the interpreter in
+    # the middle of OpenCV's extension import aborts the process
+    thread = threading.Thread(target=_warm_up_emotion, name="emotion-warmup", daemon=True)
+    thread.start()
+    atexit.register(thread.join, app.config["EMOTION_WARMUP_EXIT_TIMEOUT"])
+    return thread
+
+
+# ── Helpers ─────────────────────────────────────────────────────────────
+
+def _upload_buffer(file):
+    """Return the uploaded file's bytes as a buffer, without copying if possible."""
+    stream = file.stream
+    if isinstance(stream, io.BytesIO):
+        return stream.getbuffer()
+    return stream.read()
+
+
+def _question_response(graph, question_id):
+    """Serve a pre-encoded question body, honouring If-None-Match."""
+    body, etag = graph.bodies[question_id]
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # always revalidate via the ETag
+    return response.make_conditional(request)
+
+
+def _decode_base64_image(image_data):
+    """
+    Decode a base64 image, with or without a data-URL prefix.
+
+    The string is encoded once and the payload after the comma is decoded
+    through a memoryview, so no split() or sliced copies are made.
+    """
+    raw = image_data.encode("ascii")
+    start = raw.find(b",") + 1
+    return binascii.a2b_base64(memoryview(raw)[start:])
+
+
+def _request_image():
+    """
+    Return the image of an /upload-style request: base64 JSON (webcam
+    capture) or a multipart file under "image".
+
+    Raises ValueError with the message for the client when there is none.
+    """
+    # Check if it's a webcam capture (base64 data)
+    if request.is_json:
+        data = request.get_json()
+        return _decode_base64_image(data.get("image", ""))
+
+    # Check if it's a file upload
+    if "image" in request.files:
+        file = request.files["image"]
+        if file.filename == "":
+            raise ValueError("No file selected")
+
+        # Decode straight from the in-memory upload
+        return _upload_buffer(file)
+    raise ValueError("No image provided")
+
+
+# Packed batch body: each image is preceded by its length (uint32, little-endian)
+_FRAME_HEADER = struct.Struct("<I")
+
+
+def _unpack_frames(body):
+    """
+    Split a packed /api/upload-batch body into per-image buffers.
+
+    The buffers are memoryviews into `body`, so nothing is copied.
+    Raises ValueError if a length runs past the end of the body.
+    """
+    view = memoryview(body)
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if offset + _FRAME_HEADER.size > len(view):
+            raise ValueError("Truncated frame header in batch body.")
+        (size,) = _FRAME_HEADER.unpack_from(view, offset)
+        offset += _FRAME_HEADER.size
+        if offset + size > len(view):
+            raise ValueError("Truncated frame in batch body.")
+        frames.append(view[offset:offset + size])
+        offset += size
+    return frames
+
+
+# Mood emoji mapping
+MOOD_EMOJIS = {
+    "happy": "😊",
+    "sad": "😢",
+    "angry": "😠",
+    "neutral": "😐",
+    "excited": "🤩",
+    "stressed": "😰",
+}
+
+
+def score_questionnaire(responses):
+    """Score a response list; complete paths are precomputed, others scored directly."""
+    return get_question_graph().result_for(responses) or score_responses(responses)
+
+
+def upload_payload(cnn_result):
+    """JSON body for a successful /upload."""
+    return {
+        "face_found": True,
+        "emotion": cnn_result["emotion"],
+        "mood": cnn_result["mood"],
+        "confidence": round(cnn_result["confidence"] * 100, 1),
+        "mood_scores": {k: round(v, 4) for k, v in cnn_result["mood_scores"].items()},
+    }
+
+
+def batch_payload(results):
+    """JSON body for /api/upload-batch: per-image results and the mean mood distribution."""
+    faces = [result for result in results if result["face_found"]]
+    payload = {
+        "count": len(results),
+        "faces_found": len(faces),
+        "results": [
+            upload_payload(result) if result["face_found"] else {
+                "face_found": False,
+                "error": result.get("error", "No face detected in the image."),
+            }
+            for result in results
+        ],
+        "mood_scores": {},
+        "top_mood": None,
+    }
+    if faces:
+        mean = normalize(np.mean([from_dict(result["mood_scores"]) for result in faces], axis=0))
+        payload["mood_scores"] = {k: round(v, 4) for k, v in to_dict(mean).items()}
+        payload["top_mood"] = top_mood(mean)
+    return payload
+
+
+def group_payload(prediction):
+    """JSON body for /api/upload-group: the group's mood plus each face with its box."""
+    payload = upload_payload(prediction["group"])
+    payload["face_count"] = prediction["face_count"]
+    payload["faces"] = [
+        dict(upload_payload(face), box=list(face["box"])) for face in prediction["faces"]
+    ]
+    return payload
+
+
+def results_context(cnn_result, quest_result):
+    """Fuse the stored results, fetch recommendations and build the results.html context."""
+    # Questionnaire only: fusion and slot allocation were precomputed per path
+    precomputed = None
+    if not cnn_result and quest_result:
+        precomputed = get_questionnaire_table(get_question_graph()).lookup(quest_result)
+
+    if precomputed is not None:
+        fusion, recs = precomputed
+    else:
+        # Get mood scores from each source
+        cnn_mood_scores = cnn_result.get("mood_scores") if cnn_result else None
+        quest_mood_scores = quest_result.get("mood_scores") if quest_result else None
+
+        # Fuse moods
+        fusion = fuse_moods(
+            cnn_mood_scores=cnn_mood_scores,
+            questionnaire_mood_scores=quest_mood_scores,
+        )
+
+        # Get recommendations
+        recs = get_recommendations(
+            final_mood=fusion["final_mood"],
+            cnn_emotion=cnn_result.get("emotion") if cnn_result else None,
+            cnn_confidence=cnn_result.get("confidence") if cnn_result else None,
+            questionnaire_mood=quest_result.get("top_mood") if quest_result else None,
+            questionnaire_score=max(quest_result["mood_scores"].values()) if quest_result else None,
+            mood_scores=fusion["final_scores"],
+        )
+
+    return {
+        "mood": fusion["final_mood"],
+        "mood_emoji": MOOD_EMOJIS.get(fusion["final_mood"], "🎭"),
+        "confidence": round(fusion["confidence"] * 100, 1),
+        "scores": fusion["final_scores"],
+        "songs": recs["songs"],
+        "movies": recs["movies"],
+        "cnn_used": fusion["cnn_used"],
+        "quest_used": fusion["quest_used"],
+        "cnn_emotion": cnn_result.get("emotion") if cnn_result else None,
+        "quest_mood": quest_result.get("top_mood") if quest_result else None,
+    }
+
 
 # ── Routes ──────────────────────────────────────────────────────────────
 
@@ -47,63 +330,106 @@ def index():
     session.pop("cnn_result", None)
     session.pop("quest_responses", None)
     session.pop("quest_result", None)
-    return render_template("index.html")
+    # Live mode needs the WebSocket route only asgi_app serves
+    return render_template("index.html", live_mode=False)
 
 
 @app.route("/upload", methods=["POST"])
 def upload_image():
     """Handle image upload or webcam capture for emotion detection."""
     try:
-        cnn_result = None
+        try:
+            image_bytes = _request_image()
+            cnn_result = emotion_pipeline().predict_emotion_from_bytes(image_bytes)
+        except ValueError as e:
+            # No image, or one that cannot be decoded
+            return jsonify({"error": str(e)}), 400
+
+        if not cnn_result["face_found"]:
+            return jsonify({
+                "error": "No face detected in the image. Please try again with a clearer photo.",
+                "face_found": False,
+            }), 200
 
-        # Check if it's a webcam capture (base64 data)
-        if request.is_json:
-            data = request.get_json()
-            image_data = data.get("image", "")
+        # Store CNN result in session
+        session["cnn_result"] = cnn_result
 
-            # Remove data URL prefix if present
-            if "," in image_data:
-                image_data = image_data.split(",")[1]
+        return jsonify(upload_payload(cnn_result))
 
-            image_bytes = base64.b64decode(image_data)
-            cnn_result = predict_emotion_from_bytes(image_bytes)
+    except InferencePoolBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Check if it's a file upload
-        elif "image" in request.files:
-            file = request.files["image"]
-            if file.filename == "":
-                return jsonify({"error": "No file selected"}), 400
 
-            # Save temporarily
-            filepath = os.path.join(UPLOAD_FOLDER, "temp_upload.jpg")
-            file.save(filepath)
-            cnn_result = predict_emotion(filepath)
+@app.route("/api/upload-batch", methods=["POST"])
+def upload_batch():
+    """
+    Score a burst of images in one request.
 
-            # Clean up
+    Accepts multipart files under "images", or an application/octet-stream
+    body of packed frames (see _unpack_frames). The session is not changed.
+    """
+    try:
+        if request.mimetype == "application/octet-stream":
             try:
-                os.remove(filepath)
-            except OSError:
-                pass
+                images = _unpack_frames(request.get_data())
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
         else:
-            return jsonify({"error": "No image provided"}), 400
+            images = [_upload_buffer(file) for file in request.files.getlist("images")]
 
-        if not cnn_result["face_found"]:
+        if not images:
+            return jsonify({"error": "No images provided"}), 400
+        if len(images) > app.config["MAX_BATCH_IMAGES"]:
+            return jsonify({
+                "error": f"At most {app.config['MAX_BATCH_IMAGES']} images per batch.",
+            }), 400
+
+        results = emotion_pipeline().predict_emotions_from_bytes(images)
+        return jsonify(batch_payload(results))
+
+    except InferencePoolBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/upload-group", methods=["POST"])
+def upload_group():
+    """
+    Detect every face in one image (a group photo or a shared screen).
+
+    Takes the same input as /upload. Each face is returned with its box,
+    and the group's mean mood is stored in the session as the CNN result.
+    """
+    try:
+        try:
+            image_bytes = _request_image()
+            prediction = emotion_pipeline().predict_faces_from_bytes(image_bytes)
+        except ValueError as e:
+            # No image, or one that cannot be decoded
+            return jsonify({"error": str(e)}), 400
+
+        if not prediction["face_count"]:
             return jsonify({
                 "error": "No face detected in the image. Please try again with a clearer photo.",
                 "face_found": False,
             }), 200
 
-        # Store CNN result in session
-        session["cnn_result"] = cnn_result
+        # Store the group's result as the CNN result
+        session["cnn_result"] = prediction["group"]
 
-        return jsonify({
-            "face_found": True,
-            "emotion": cnn_result["emotion"],
-            "mood": cnn_result["mood"],
-            "confidence": round(cnn_result["confidence"] * 100, 1),
-            "mood_scores": {k: round(v, 4) for k, v in cnn_result["mood_scores"].items()},
-        })
+        return jsonify(group_payload(prediction))
 
+    except InferencePoolBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -117,17 +443,17 @@ def questionnaire_page():
 @app.route("/api/question/<question_id>", methods=["GET"])
 def get_question_api(question_id):
     """API to get a specific question by ID."""
-    question = get_question(question_id)
-    if question is None:
+    graph = get_question_graph()
+    if question_id not in graph.bodies:
         return jsonify({"error": "Question not found"}), 404
-    return jsonify(question)
+    return _question_response(graph, question_id)
 
 
 @app.route("/api/first-question", methods=["GET"])
 def first_question_api():
     """API to get the first question."""
-    question = get_first_question()
-    return jsonify(question)
+    graph = get_question_graph()
+    return _question_response(graph, graph.root)
 
 
 @app.route("/api/submit-questionnaire", methods=["POST"])
@@ -141,7 +467,7 @@ def submit_questionnaire():
             return jsonify({"error": "No responses provided"}), 400
 
         # Score the responses
-        quest_result = score_responses(responses)
+        quest_result = score_questionnaire(responses)
 
         # Store in session
         session["quest_result"] = quest_result
@@ -158,51 +484,9 @@ def submit_questionnaire():
 @app.route("/results")
 def results():
     """Show final mood and recommendations."""
-    # Retrieve session data
-    cnn_result = session.get("cnn_result")
-    quest_result = session.get("quest_result")
-
-    # Get mood scores from each source
-    cnn_mood_scores = cnn_result.get("mood_scores") if cnn_result else None
-    quest_mood_scores = quest_result.get("mood_scores") if quest_result else None
-
-    # Fuse moods
-    fusion = fuse_moods(
-        cnn_mood_scores=cnn_mood_scores,
-        questionnaire_mood_scores=quest_mood_scores,
-    )
-
-    # Get recommendations
-    recs = get_recommendations(
-        final_mood=fusion["final_mood"],
-        cnn_emotion=cnn_result.get("emotion") if cnn_result else None,
-        cnn_confidence=cnn_result.get("confidence") if cnn_result else None,
-        questionnaire_mood=quest_result.get("top_mood") if quest_result else None,
-        questionnaire_score=max(quest_result["mood_scores"].values()) if quest_result else None,
-    )
-
-    # Mood emoji mapping
-    mood_emojis = {
-        "happy": "😊",
-        "sad": "😢",
-        "angry": "😠",
-        "neutral": "😐",
-        "excited": "🤩",
-        "stressed": "😰",
-    }
-
     return render_template(
         "results.html",
-        mood=fusion["final_mood"],
-        mood_emoji=mood_emojis.get(fusion["final_mood"], "🎭"),
-        confidence=round(fusion["confidence"] * 100, 1),
-        scores=fusion["final_scores"],
-        songs=recs["songs"],
-        movies=recs["movies"],
-        cnn_used=fusion["cnn_used"],
-        quest_used=fusion["quest_used"],
-        cnn_emotion=cnn_result.get("emotion") if cnn_result else None,
-        quest_mood=quest_result.get("top_mood") if quest_result else None,
+        **results_context(session.get("cnn_result"), session.get("quest_result")),
     )
 
 
@@ -225,4 +509,7 @@ def skip_questionnaire():
 if __name__ == "__main__":
     print("\n🎭 Mood-Based Recommendation System")
     print("   Open http://localhost:5000 in your browser\n")
+    # The debug reloader serves requests from a child process
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_emotion_warmup()
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,482 @@
+"""
+Mood-Based Song & Movie Recommendation System
+ASGI Application — asyncio Serving Mode
+
+Serves the same routes, templates and session contents as app.py from a
+single event loop:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+Idle and slow-upload connections only cost a socket and a coroutine, so
+one process holds thousands of them. Blocking work never runs on the
+loop: face detection and the CNN run on INFERENCE_THREADS executor
+threads (or in the inference pool with INFERENCE_WORKERS set), and all
+SQLite access (fusion, recommendations, SQLite sessions) runs on one
+dedicated DB thread.
+
+It also serves the live webcam mode (WebSocket /ws/stream, see
+emotion.stream), which Flask's development server cannot.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+from starlette.websockets import WebSocketDisconnect
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+# Shares startup (seeding, question graph, emotion warm-up) with the Flask app
+from app import (
+    _decode_base64_image, _unpack_frames, app as flask_app, batch_payload,
+    emotion_pipeline, group_payload, results_context,
+    score_questionnaire, start_emotion_warmup, upload_payload,
+)
+from emotion.worker_pool import InferencePoolBusy, InferenceTimeout
+from questionnaire.graph import get_question_graph
+from sessions.asgi_middleware import ServerSideSessionMiddleware
+from sessions.codec import decode_session, encode_session
+from sessions.store import MemorySessionStore, get_session_store, new_session_id
+
+# Tuning (configurable)
+MAX_CONTENT_LENGTH = flask_app.config["MAX_CONTENT_LENGTH"]
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", str(os.cpu_count() or 1)))
+
+# Live streams: frames processed at once across all viewers (newer frames
+# replace a viewer's waiting one), and how long a stream's last result can
+# still be committed to the session
+MAX_STREAM_INFERENCES = INFERENCE_THREADS
+STREAM_RESULT_TTL = 10 * 60
+
+# CPU-bound prediction; threads feed emotion.predict's micro-batcher
+_inference_executor = ThreadPoolExecutor(INFERENCE_THREADS, thread_name_prefix="inference")
+
+# Every database call goes through this one thread, in submission order
+_db_executor = ThreadPoolExecutor(1, thread_name_prefix="db")
+
+# Latest smoothed result per live stream, by stream token
+_stream_results = MemorySessionStore(max_sessions=10000, ttl=STREAM_RESULT_TTL)
+_stream_slots = None   # asyncio.Semaphore, created on the serving loop
+
+templates = Jinja2Templates(directory=os.path.join(ROOT, "templates"))
+# The templates use Flask's url_for('static', filename=...)
+templates.env.globals["url_for"] = lambda endpoint, filename: f"/static/{filename}"
+
+
+# ── Helpers ─────────────────────────────────────────────────────────────
+
+def _predict(image_bytes):
+    """Run on the inference executor (the first call imports the pipeline)."""
+    return emotion_pipeline().predict_emotion_from_bytes(image_bytes)
+
+
+async def run_inference(image_bytes):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor, _predict, image_bytes)
+
+
+def _predict_many(images):
+    return emotion_pipeline().predict_emotions_from_bytes(images)
+
+
+async def run_batch_inference(images):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor, _predict_many, images)
+
+
+def _predict_faces(image_bytes):
+    return emotion_pipeline().predict_faces_from_bytes(image_bytes)
+
+
+async def run_group_inference(image_bytes):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor, _predict_faces, image_bytes)
+
+
+async def run_db(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, fn, *args)
+
+
+def _new_stream():
+    # Imports OpenCV and the model on first use, so it runs on the executor
+    from emotion.stream import EmotionStream
+    return EmotionStream(classify=emotion_pipeline().classify_face)
+
+
+async def _read_body(request):
+    """Read the request body as it streams in, rejecting it past MAX_CONTENT_LENGTH."""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_CONTENT_LENGTH:
+        raise HTTPException(413)
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_CONTENT_LENGTH:
+            raise HTTPException(413)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _read_form(request, body):
+    """Parse a multipart body that has already been read."""
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return await Request(request.scope, receive).form()
+
+
+async def _request_image(request):
+    """
+    Read the image of an /upload-style request: base64 JSON (webcam
+    capture) or a multipart file under "image" (see app._request_image).
+    """
+    body = await _read_body(request)
+
+    # Check if it's a webcam capture (base64 data)
+    if request.headers.get("content-type", "").startswith("application/json"):
+        data = json.loads(body)
+        return _decode_base64_image(data.get("image", ""))
+
+    # Check if it's a file upload
+    form = await _read_form(request, body)
+    file = form.get("image")
+    if file is None or isinstance(file, str):
+        raise ValueError("No image provided")
+    if file.filename == "":
+        raise ValueError("No file selected")
+    return await file.read()
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(","))
+    return etag in tags
+
+
+def _question_response(request, graph, question_id):
+    """Serve a pre-encoded question body, honouring If-None-Match."""
+    body, etag = graph.bodies[question_id]
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# ── Routes ──────────────────────────────────────────────────────────────
+
+async def index(request):
+    """Landing page."""
+    # Clear any previous session data
+    request.session.pop("cnn_result", None)
+    request.session.pop("quest_responses", None)
+    request.session.pop("quest_result", None)
+    return templates.TemplateResponse(request, "index.html", {"live_mode": True})
+
+
+async def upload_image(request):
+    """Handle image upload or webcam capture for emotion detection."""
+    try:
+        try:
+            image_bytes = await _request_image(request)
+            cnn_result = await run_inference(image_bytes)
+        except ValueError as e:
+            # No image, or one that cannot be decoded
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        if not cnn_result["face_found"]:
+            return JSONResponse({
+                "error": "No face detected in the image. Please try again with a clearer photo.",
+                "face_found": False,
+            })
+
+        # Store CNN result in session
+        request.session["cnn_result"] = cnn_result
+
+        return JSONResponse(upload_payload(cnn_result))
+
+    except HTTPException:
+        raise
+    except InferencePoolBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except InferenceTimeout as e:
+        return JSONResponse({"error": str(e)}, status_code=504)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def upload_batch(request):
+    """Score a burst of images in one request (see app.upload_batch)."""
+    try:
+        body = await _read_body(request)
+        if request.headers.get("content-type", "").startswith("application/octet-stream"):
+            try:
+                images = _unpack_frames(body)
+            except ValueError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+        else:
+            form = await _read_form(request, body)
+            images = [await file.read() for file in form.getlist("images")
+                      if not isinstance(file, str)]
+
+        if not images:
+            return JSONResponse({"error": "No images provided"}, status_code=400)
+        if len(images) > flask_app.config["MAX_BATCH_IMAGES"]:
+            return JSONResponse({
+                "error": f"At most {flask_app.config['MAX_BATCH_IMAGES']} images per batch.",
+            }, status_code=400)
+
+        results = await run_batch_inference(images)
+        return JSONResponse(batch_payload(results))
+
+    except HTTPException:
+        raise
+    except InferencePoolBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except InferenceTimeout as e:
+        return JSONResponse({"error": str(e)}, status_code=504)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def upload_group(request):
+    """Detect every face in one image (see app.upload_group)."""
+    try:
+        try:
+            image_bytes = await _request_image(request)
+            prediction = await run_group_inference(image_bytes)
+        except ValueError as e:
+            # No image, or one that cannot be decoded
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        if not prediction["face_count"]:
+            return JSONResponse({
+                "error": "No face detected in the image. Please try again with a clearer photo.",
+                "face_found": False,
+            })
+
+        # Store the group's result as the CNN result
+        request.session["cnn_result"] = prediction["group"]
+
+        return JSONResponse(group_payload(prediction))
+
+    except HTTPException:
+        raise
+    except InferencePoolBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except InferenceTimeout as e:
+        return JSONResponse({"error": str(e)}, status_code=504)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def stream_frames(websocket):
+    """
+    Live webcam mode: binary JPEG frames in, smoothed predictions out.
+
+    Each viewer has at most one frame being processed and one waiting;
+    a frame that arrives while another is waiting replaces it (dropped).
+    Every reply carries the stream token for /api/stream/commit.
+    """
+    global _stream_slots
+    if _stream_slots is None:
+        _stream_slots = asyncio.Semaphore(MAX_STREAM_INFERENCES)
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    stream = await loop.run_in_executor(_inference_executor, _new_stream)
+    token = new_session_id()
+    latest = None
+    arrived = asyncio.Event()
+
+    async def process_frames():
+        nonlocal latest
+        try:
+            while True:
+                await arrived.wait()
+                try:
+                    async with _stream_slots:
+                        # Take the newest frame only once a slot is free
+                        frame, latest = latest, None
+                        arrived.clear()
+                        face_in_frame, result = await loop.run_in_executor(
+                            _inference_executor, stream.process, frame
+                        )
+                    reply = {"token": token, "face_in_frame": face_in_frame, **stream.stats()}
+                    if result["face_found"]:
+                        _stream_results.set(token, encode_session({"cnn_result": result}))
+                        reply.update(upload_payload(result))
+                    else:
+                        reply["face_found"] = False
+                except Exception as e:
+                    # A frame that fails is reported; the stream goes on
+                    reply = {"error": str(e), "face_found": False, **stream.stats()}
+                await websocket.send_json(reply)
+        except Exception:
+            # Never leave the viewer streaming into a dead task (if the
+            # viewer already left, there is nothing to close)
+            with contextlib.suppress(Exception):
+                await websocket.close(code=1011)
+
+    worker = asyncio.create_task(process_frames())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                if latest is not None:
+                    stream.dropped += 1
+                latest = message["bytes"]
+                arrived.set()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+
+
+async def commit_stream(request):
+    """Store a live stream's latest smoothed result as the session's CNN result."""
+    try:
+        data = json.loads(await _read_body(request))
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+    blob = _stream_results.get(str(data.get("token", "")))
+    if blob is None:
+        return JSONResponse({"error": "No result for this stream"}, status_code=404)
+    cnn_result = decode_session(blob)["cnn_result"]
+    request.session["cnn_result"] = cnn_result
+    return JSONResponse(upload_payload(cnn_result))
+
+
+async def questionnaire_page(request):
+    """Serve the questionnaire page."""
+    return templates.TemplateResponse(request, "questionnaire.html")
+
+
+async def get_question_api(request):
+    """API to get a specific question by ID."""
+    question_id = request.path_params["question_id"]
+    graph = get_question_graph()
+    if question_id not in graph.bodies:
+        return JSONResponse({"error": "Question not found"}, status_code=404)
+    return _question_response(request, graph, question_id)
+
+
+async def first_question_api(request):
+    """API to get the first question."""
+    graph = get_question_graph()
+    return _question_response(request, graph, graph.root)
+
+
+async def submit_questionnaire(request):
+    """Process completed questionnaire responses."""
+    try:
+        data = json.loads(await _read_body(request))
+        responses = data.get("responses", [])
+
+        if not responses:
+            return JSONResponse({"error": "No responses provided"}, status_code=400)
+
+        # Complete paths are a dict lookup, so this stays on the loop
+        quest_result = score_questionnaire(responses)
+
+        # Store in session
+        request.session["quest_result"] = quest_result
+
+        return JSONResponse({
+            "top_mood": quest_result["top_mood"],
+            "mood_scores": {k: round(v, 4) for k, v in quest_result["mood_scores"].items()},
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def results(request):
+    """Show final mood and recommendations."""
+    context = await run_db(
+        results_context, request.session.get("cnn_result"), request.session.get("quest_result")
+    )
+    return templates.TemplateResponse(request, "results.html", context)
+
+
+async def skip_image(request):
+    """Skip the image analysis step."""
+    request.session.pop("cnn_result", None)
+    return JSONResponse({"status": "ok"})
+
+
+async def skip_questionnaire(request):
+    """Skip the questionnaire step."""
+    request.session.pop("quest_result", None)
+    return JSONResponse({"status": "ok"})
+
+
+# ── ASGI App Setup ──────────────────────────────────────────────────────
+
+def session_middleware():
+    """Session middleware for the configured SESSION_BACKEND (see app.py)."""
+    backend = flask_app.config["SESSION_BACKEND"]
+    if backend == "cookie":
+        return Middleware(SessionMiddleware, secret_key=flask_app.secret_key)
+    return Middleware(
+        ServerSideSessionMiddleware, store=get_session_store(backend), run_blocking=run_db
+    )
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    start_emotion_warmup()
+    yield
+    _inference_executor.shutdown(wait=False, cancel_futures=True)
+    _db_executor.shutdown(wait=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/", index),
+        Route("/upload", upload_image, methods=["POST"]),
+        Route("/api/upload-batch", upload_batch, methods=["POST"]),
+        Route("/api/upload-group", upload_group, methods=["POST"]),
+        WebSocketRoute("/ws/stream", stream_frames),
+        Route("/api/stream/commit", commit_stream, methods=["POST"]),
+        Route("/questionnaire", questionnaire_page),
+        Route("/api/question/{question_id}", get_question_api),
+        Route("/api/first-question", first_question_api),
+        Route("/api/submit-questionnaire", submit_questionnaire, methods=["POST"]),
+        Route("/results", results),
+        Route("/api/skip-image", skip_image, methods=["POST"]),
+        Route("/api/skip-questionnaire", skip_questionnaire, methods=["POST"]),
+        Mount("/static", StaticFiles(directory=os.path.join(ROOT, "static")), name="static"),
+    ],
+    middleware=[session_middleware()],
+    lifespan=lifespan,
+)
+
+
+# ── Main ────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print("\n🎭 Mood-Based Recommendation System (asyncio)")
+    print("   Open http://localhost:5000 in your browser\n")
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,224 @@
+"""
+Benchmark: Flask (threaded) vs ASGI serving under many held connections.
+
+Starts each server in its own process against a scratch copy of the
+database: app.py on Flask's threaded server (as `python app.py` runs it)
+and asgi_app.py on uvicorn. The client first opens --hold connections
+and keeps them open for the whole run: half stay idle, half are slow
+uploads that send a POST /upload one byte per second. It then runs
+--concurrency clients in a closed loop for --duration seconds, each
+fetching a question and the results page on fresh connections, and
+reports throughput, latency, failed requests, how many held connections
+survived and the server's RSS and thread count.
+
+Usage:
+    python3 -m benchmarks.bench_asgi [--hold 2000] [--concurrency 50] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = "127.0.0.1"
+
+# Server programs: {db} and {port} are filled in per run
+SERVERS = {
+    "flask": """
+import sys
+sys.path.insert(0, {root!r})
+from database import db_utils
+db_utils.DB_PATH = {db!r}
+from app import app
+app.run(host={host!r}, port={port}, threaded=True)
+""",
+    "asgi": """
+import sys
+sys.path.insert(0, {root!r})
+from database import db_utils
+db_utils.DB_PATH = {db!r}
+import uvicorn
+uvicorn.run("asgi_app:app", host={host!r}, port={port}, log_level="warning", backlog=4096)
+""",
+}
+
+PATHS = ("/api/question/q1", "/results")
+
+# A multipart upload whose file part never finishes arriving
+SLOW_UPLOAD = (
+    "POST /upload HTTP/1.1\r\nHost: localhost\r\n"
+    "Content-Type: multipart/form-data; boundary=slow\r\nContent-Length: 1000000\r\n\r\n"
+    "--slow\r\nContent-Disposition: form-data; name=\"image\"; filename=\"face.png\"\r\n"
+    "Content-Type: image/png\r\n\r\n"
+).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def process_stats(pid):
+    """RSS (MiB) and thread count of a process (Linux /proc)."""
+    stats = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "Threads"):
+                stats[key] = int(value.split()[0])
+    return stats.get("VmRSS", 0) / 1024, stats.get("Threads", 0)
+
+
+async def fetch(port, path, timeout=10.0):
+    """GET `path` on a new connection; return (status, seconds)."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(data.split(b" ", 2)[1]), time.perf_counter() - start
+
+
+async def wait_ready(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await fetch(port, "/api/first-question"))[0] == 200:
+                return
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def hold_connections(port, n):
+    """Open `n` connections: even ones idle, odd ones starting a slow upload."""
+    held = []
+    for i in range(n):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), 5)
+        except (OSError, asyncio.TimeoutError):
+            continue
+        if i % 2:
+            writer.write(SLOW_UPLOAD)
+        held.append((reader, writer, bool(i % 2)))
+    return held
+
+
+async def trickle(held, stop):
+    """Send one more body byte per slow upload every second."""
+    while not stop.is_set():
+        for _, writer, slow in held:
+            if slow and not writer.is_closing():
+                try:
+                    writer.write(b"x")
+                except (OSError, RuntimeError):
+                    pass
+        try:
+            await asyncio.wait_for(stop.wait(), 1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def load(port, concurrency, duration):
+    """Closed-loop clients over PATHS; return latencies (s) and failure count."""
+    latencies, failures = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client(k):
+        nonlocal failures
+        i = k
+        while time.monotonic() < deadline:
+            try:
+                status, seconds = await fetch(port, PATHS[i % len(PATHS)])
+                if status == 200:
+                    latencies.append(seconds)
+                else:
+                    failures += 1
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                failures += 1
+            i += 1
+
+    await asyncio.gather(*(client(k) for k in range(concurrency)))
+    return latencies, failures
+
+
+async def bench(port, proc, args):
+    await wait_ready(port)
+    rss_start, threads_start = process_stats(proc.pid)
+
+    held = await hold_connections(port, args.hold)
+    stop = asyncio.Event()
+    trickler = asyncio.create_task(trickle(held, stop))
+    await asyncio.sleep(1.0)
+    rss_held, threads_held = process_stats(proc.pid)
+
+    start = time.perf_counter()
+    latencies, failures = await load(port, args.concurrency, args.duration)
+    elapsed = time.perf_counter() - start
+
+    alive = sum(not reader.at_eof() and not writer.is_closing() for reader, writer, _ in held)
+    stop.set()
+    await trickler
+    for _, writer, _ in held:
+        writer.close()
+
+    latencies.sort()
+    pct = lambda q: latencies[int(q * (len(latencies) - 1))] * 1000 if latencies else float("nan")
+    return {
+        "held": f"{alive}/{args.hold}",
+        "rps": len(latencies) / elapsed,
+        "p50": pct(0.50),
+        "p99": pct(0.99),
+        "failures": failures,
+        "rss": (rss_start, rss_held),
+        "threads": (threads_start, threads_held),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hold", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["flask", "asgi"])
+    args = parser.parse_args()
+
+    # Held connections need file descriptors on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        print(f"📊 {args.hold} held connections (half idle, half slow uploads), "
+              f"{args.concurrency} clients for {args.duration:g}s over {', '.join(PATHS)}")
+        for name in args.servers:
+            port = free_port()
+            code = SERVERS[name].format(root=ROOT, db=db, host=HOST, port=port)
+            env = dict(os.environ, EMOTION_WARMUP="0")
+            proc = subprocess.Popen(
+                [sys.executable, "-c", code], cwd=ROOT, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                r = asyncio.run(bench(port, proc, args))
+            finally:
+                proc.terminate()
+                proc.wait()
+            print(f"   {name:<6} {r['rps']:8.1f} req/s   p50 {r['p50']:7.1f} ms   "
+                  f"p99 {r['p99']:7.1f} ms   failed {r['failures']:5d}   held {r['held']:>11}   "
+                  f"RSS {r['rss'][0]:6.1f} → {r['rss'][1]:6.1f} MiB   "
+                  f"threads {r['threads'][0]} → {r['threads'][1]}")
+
+
+if __name__ == "__main__":
+    main()
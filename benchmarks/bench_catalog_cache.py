@@ -0,0 +1,87 @@
+"""
+Benchmark: /results latency with and without the in-memory catalog cache.
+
+Renders /results for a questionnaire-only session through Flask's test
+client against a scratch copy of the database, once with catalog lookups
+going to SQLite and once served from database.catalog_cache.
+
+Usage:
+    python3 -m benchmarks.bench_catalog_cache [--runs 300]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+
+def measure(fn, runs):
+    fn()  # warm-up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"   {label:<30} mean {statistics.mean(timings):7.3f} ms   "
+          f"median {statistics.median(timings):7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+
+        from app import app
+        from database.catalog_cache import (
+            get_cached_movies, get_cached_songs, get_catalog_cache,
+        )
+        from questionnaire.scorer import score_responses
+        from recommender import engine
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["quest_result"] = score_responses(
+                [{"question_id": "q1", "option_index": 0}]
+            )
+
+        def render():
+            response = client.get("/results")
+            assert response.status_code == 200
+
+        def lookup():
+            if engine.USE_CATALOG_CACHE:
+                get_cached_songs("happy")
+                get_cached_movies("happy")
+            else:
+                db_utils.get_songs_by_mood("happy")
+                db_utils.get_movies_by_mood("happy")
+
+        engine.USE_CATALOG_SNAPSHOT = False
+        print(f"📊 Latency over {args.runs} runs")
+        for label, cached in (("uncached (SQLite)", False), ("cached (in-memory)", True)):
+            engine.USE_CATALOG_CACHE = cached
+            report(f"lookup — {label}", measure(lookup, args.runs))
+            report(f"/results — {label}", measure(render, args.runs))
+
+        usage = get_catalog_cache().memory_usage()
+        print("📦 Catalog cache memory: " + ", ".join(
+            f"{table} {size / 1024:.1f} KiB" for table, size in usage.items()
+        ))
+        db_utils.close_pool()
+
+
+if __name__ == "__main__":
+    main()
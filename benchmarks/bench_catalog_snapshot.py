@@ -0,0 +1,152 @@
+"""
+Benchmark: worker cold start and memory, SQLite-backed cache vs snapshot.
+
+Builds a scratch database with a synthetic catalog, writes its columnar
+snapshot, then starts worker processes that each serve one lookup per
+mood, either through the in-memory catalog cache (loaded from SQLite) or
+through the memory-mapped snapshot. Each worker reports its time to the
+first lookup and its memory: RSS, private (anonymous) RSS and PSS, which
+splits shared pages between the processes mapping them.
+
+Usage:
+    python3 -m benchmarks.bench_catalog_snapshot [--rows 200000] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+from fusion.mood_vector import MOOD_CATEGORIES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kib():
+    """RSS, private RSS and PSS of this process in KiB (Linux /proc)."""
+    usage = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon"):
+                usage[key] = int(value.split()[0])
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    usage["Pss"] = int(line.split()[1])
+    except OSError:
+        pass
+    return usage
+
+
+def worker(mode, db_path, snapshot_dir, ready_path):
+    """Serve one lookup per mood through `mode`, then report and wait."""
+    start = time.perf_counter()
+    db_utils.DB_PATH = db_path
+    if mode == "snapshot":
+        from database import catalog_snapshot
+        catalog_snapshot.SNAPSHOT_DIR = snapshot_dir
+        catalog = catalog_snapshot.get_catalog_snapshot()
+    else:
+        from database.catalog_cache import get_catalog_cache
+        catalog = get_catalog_cache()
+    for mood in MOOD_CATEGORIES:
+        catalog.sample("songs", mood, 5)
+        catalog.sample("movies", mood, 5)
+    first_lookup_ms = (time.perf_counter() - start) * 1000
+
+    # Touch every mapped page once, as a long-running worker eventually would
+    if mode == "snapshot":
+        for table in catalog.tables.values():
+            for i in range(0, len(table), max(1, len(table) // 2000)):
+                table.row(i)
+
+    report = {"first_lookup_ms": first_lookup_ms, **memory_kib()}
+    print(json.dumps(report), flush=True)
+    # Stay alive until every worker has reported, so shared pages overlap
+    while not os.path.exists(ready_path):
+        time.sleep(0.01)
+
+
+def make_catalog(rows):
+    """Fill the current DB_PATH with `rows` synthetic songs and movies."""
+    from database.seed_data import seed_database
+    seed_database()
+    conn = db_utils.get_connection()
+    conn.executemany(
+        "INSERT INTO songs (title, artist, genre, mood_tag, youtube_url) VALUES (?, ?, ?, ?, ?)",
+        ((f"Song {i}", f"Artist {i % 5000}", f"Genre {i % 40}", MOOD_CATEGORIES[i % 6],
+          f"https://www.youtube.com/watch?v={i:011d}") for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO movies (title, genre, year, mood_tag, ott_platform, ott_url) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Movie {i}", f"Genre {i % 40}", 1950 + i % 75, MOOD_CATEGORIES[i % 6],
+          f"Platform {i % 8}", f"https://example.com/title/{i}") for i in range(rows)),
+    )
+    db_utils.bump_catalog_version(conn)
+    conn.commit()
+    conn.close()
+
+
+def run_workers(mode, n, db_path, snapshot_dir, tmp):
+    ready = os.path.join(tmp, f"{mode}.ready")
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_catalog_snapshot",
+             "--worker", mode, "--db", db_path, "--snapshot", snapshot_dir,
+             "--ready", ready],
+            cwd=ROOT, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(n)
+    ]
+    reports = [json.loads(p.stdout.readline()) for p in procs]
+    open(ready, "w").close()
+    for p in procs:
+        p.wait()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker", choices=("cache", "snapshot"), help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    parser.add_argument("--ready", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.db, args.snapshot, args.ready)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+        snapshot_dir = os.path.join(tmp, "snapshot")
+        make_catalog(args.rows)
+
+        from database.catalog_snapshot import build_snapshot
+        build_snapshot(snapshot_dir)
+        db_utils.close_pool()
+
+        print(f"📊 {args.workers} workers, {args.rows:,} synthetic songs + movies")
+        for label, mode in (("SQLite → in-memory cache", "cache"), ("mmap snapshot", "snapshot")):
+            reports = run_workers(mode, args.workers, db_utils.DB_PATH, snapshot_dir, tmp)
+            mean = lambda key: statistics.mean(r.get(key, 0) for r in reports)
+            print(f"   {label:<26} first lookup {mean('first_lookup_ms'):8.1f} ms   "
+                  f"RSS {mean('VmRSS') / 1024:7.1f} MiB   "
+                  f"private {mean('RssAnon') / 1024:7.1f} MiB   "
+                  f"PSS {mean('Pss') / 1024:7.1f} MiB  (per worker)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Load test: recommendation queries per second with and without pooling.
+
+Runs the read set of one /results render (songs + movies for a mood) from
+1, 8 and 32 concurrent workers against a scratch copy of the database,
+first opening a fresh connection per query (the old behaviour) and then
+through the connection pool.
+
+Usage:
+    python3 -m benchmarks.bench_db_pool [--seconds 3] [--workers 1 8 32]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+from database.seed_data import seed_database
+from questionnaire.questions import MOOD_CATEGORIES
+
+
+def unpooled_query(table, mood_tag, limit=5):
+    """The original helper pattern: connect, query, close."""
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.execute(
+        f"SELECT * FROM {table} WHERE mood_tag = ? ORDER BY RANDOM() LIMIT ?",
+        (mood_tag, limit),
+    )
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def unpooled_request(mood):
+    unpooled_query("songs", mood)
+    unpooled_query("movies", mood)
+
+
+def pooled_request(mood):
+    db_utils.get_songs_by_mood(mood)
+    db_utils.get_movies_by_mood(mood)
+
+
+def run_load(request_fn, workers, seconds):
+    """Return queries per second achieved by `workers` threads."""
+    stop = time.perf_counter() + seconds
+    counts = [0] * workers
+
+    def worker(slot):
+        rng = random.Random(slot)
+        while time.perf_counter() < stop:
+            request_fn(rng.choice(MOOD_CATEGORIES))
+            counts[slot] += 2  # two queries per request
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+        seed_database()
+
+        print(f"📊 Queries/second ({args.seconds:.0f}s per run)")
+        print(f"   {'workers':>7}  {'unpooled':>10}  {'pooled':>10}  speed-up")
+        for workers in args.workers:
+            before = run_load(unpooled_request, workers, args.seconds)
+            after = run_load(pooled_request, workers, args.seconds)
+            print(f"   {workers:>7}  {before:>10.0f}  {after:>10.0f}  {after / before:7.2f}x")
+
+        db_utils.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: per-request face detection latency.
+
+Compares the old path (parse the Haar cascade XML on every call) with the
+cached per-thread detector.
+
+Usage:
+    python3 -m benchmarks.bench_face_detector [--runs 50] [--size 640x480]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion.face_detector import (
+    MIN_FACE_SIZE,
+    MIN_NEIGHBORS,
+    SCALE_FACTOR,
+    detect_face_from_bytes,
+    load_cascade,
+    preprocess_face,
+)
+
+
+def synthetic_jpeg(width, height):
+    """Encode a noisy test image as JPEG bytes."""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (9, 9), 0)
+    ok, buf = cv2.imencode(".jpg", image)
+    return buf.tobytes()
+
+
+def detect_uncached(image_bytes):
+    """The original detection path: reload the cascade per request."""
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    cascade = load_cascade()
+    faces = cascade.detectMultiScale(
+        gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=MIN_FACE_SIZE
+    )
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda rect: rect[2] * rect[3])
+    return preprocess_face(gray[y : y + h, x : x + w])
+
+
+def measure(fn, image_bytes, runs):
+    fn(image_bytes)  # warm-up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(image_bytes)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"   {label:<24} mean {statistics.mean(timings):8.2f} ms   "
+          f"median {statistics.median(timings):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--size", default="640x480", help="WIDTHxHEIGHT")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    image_bytes = synthetic_jpeg(width, height)
+
+    start = time.perf_counter()
+    load_cascade()
+    print(f"📊 Cascade load time: {(time.perf_counter() - start) * 1000:.2f} ms")
+    print(f"📊 Detection latency ({width}x{height}, {args.runs} runs)")
+    report("before (reload/request)", measure(detect_uncached, image_bytes, args.runs))
+    report("after (cached detector)", measure(detect_face_from_bytes, image_bytes, args.runs))
+
+
+if __name__ == "__main__":
+    main()
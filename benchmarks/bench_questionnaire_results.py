@@ -0,0 +1,85 @@
+"""
+Benchmark: questionnaire-only /results with and without the precomputed table.
+
+Builds the results page context for every complete questionnaire path,
+once through fusion and catalog ranking per request and once from the
+precomputed questionnaire-only table, then times full /results requests
+through Flask's test client. Runs against a scratch copy of the database.
+
+Usage:
+    python3 -m benchmarks.bench_questionnaire_results [--rounds 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+
+def per_call_us(fn, items, rounds):
+    for item in items:  # warm-up
+        fn(item)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (rounds * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["EMOTION_WARMUP"] = "0"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+        import app as app_module
+        from database.log_writer import flush_mood_log
+        from recommender import questionnaire_table
+        from recommender.questionnaire_table import get_questionnaire_table
+
+        graph = app_module.get_question_graph()
+        results = list(graph.paths.values())
+        questionnaire_table._table = None  # time a fresh build
+        start = time.perf_counter()
+        table = app_module.get_questionnaire_table = get_questionnaire_table(graph)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        class NoTable:
+            def lookup(self, quest_result):
+                return None
+
+        def context(quest_result):
+            app_module.results_context(None, quest_result)
+
+        def request(quest_result):
+            with client.session_transaction() as session:
+                session["quest_result"] = quest_result
+            client.get("/results")
+
+        client = app_module.app.test_client()
+        timings = {}
+        for label, source in (("per request", NoTable()), ("precomputed", table)):
+            app_module.get_questionnaire_table = lambda graph, source=source: source
+            timings[label] = (
+                per_call_us(context, results, args.rounds),
+                per_call_us(request, results, max(1, args.rounds // 10)),
+            )
+        flush_mood_log()
+        db_utils.close_pool()
+
+    print(f"📊 {len(results)} questionnaire paths ({len(table)} distinct results), "
+          f"table built in {build_ms:.1f} ms")
+    for label, (context_us, request_us) in timings.items():
+        print(f"   {label:<12} results context {context_us:7.1f} µs   "
+              f"/results request {request_us:7.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
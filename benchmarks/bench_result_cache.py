@@ -0,0 +1,80 @@
+"""
+Benchmark: re-submitted photos with and without the prediction result cache.
+
+Scores the same webcam-sized JPEG repeatedly through
+predict_emotion_from_bytes() with the cache off (every call decodes the
+image and runs face detection), on an in-process hit, and on a hit from
+the SQLite table shared by worker processes, using a NumPy model with
+random weights and a scratch database. Also reports the cost of hashing
+the image bytes, which every call pays when the cache is on.
+
+Usage:
+    python3 -m benchmarks.bench_result_cache [--size 640x480] [--calls 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_upload_batch import random_model, synthetic_frames
+from database import db_utils
+from emotion import predict, result_cache
+
+
+def per_call_ms(fn, calls):
+    fn()  # warm-up
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    (image_bytes,) = synthetic_frames(1, width, height)
+    predict._model = random_model()
+
+    def score():
+        predict.predict_emotion_from_bytes(image_bytes)
+
+    def score_shared():
+        # A fresh in-process cache per call, as another worker would have
+        result_cache._cache = None
+        predict.predict_emotion_from_bytes(image_bytes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+        db_utils.init_db()
+
+        result_cache.PREDICTION_CACHE = "off"
+        off_ms = per_call_ms(score, args.calls)
+        result_cache.PREDICTION_CACHE = "memory"
+        hit_ms = per_call_ms(score, args.calls)
+        result_cache.PREDICTION_CACHE = "sqlite"
+        result_cache._cache = None
+        shared_ms = per_call_ms(score_shared, args.calls)
+        key_ms = per_call_ms(lambda: result_cache.image_key(image_bytes, b"bytes"), args.calls)
+        db_utils.close_pool()
+
+    print(f"📊 Same {args.size} JPEG ({len(image_bytes) / 1024:.0f} KiB) scored "
+          f"{args.calls} times, median per call")
+    print(f"   cache off            {off_ms:8.3f} ms")
+    print(f"   in-process hit       {hit_ms:8.3f} ms   ({off_ms / hit_ms:.0f}x faster)")
+    print(f"   shared (SQLite) hit  {shared_ms:8.3f} ms   ({off_ms / shared_ms:.0f}x faster)")
+    print(f"   hashing the bytes    {key_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: session cookie size and per-request overhead by session backend.
+
+Fills a session with a typical CNN result and questionnaire result, then
+for Flask's signed cookie and the memory and SQLite server-side stores
+reports the bytes the browser sends (Cookie) on every request and gets
+back (Set-Cookie) when the session changes, and the time spent opening
+and saving the session on a request that only reads it and on one that
+writes it. Runs against a scratch copy of the database.
+
+Usage:
+    python3 -m benchmarks.bench_sessions [--requests 20000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from database import db_utils
+from emotion.labels import EMOTION_LABELS, EMOTION_TO_MOOD, emotion_to_mood_scores
+from questionnaire.scorer import score_responses
+
+
+def sample_session():
+    """A session after an upload and a completed questionnaire."""
+    probabilities = np.random.default_rng(0).dirichlet(np.ones(7)).astype(np.float32)
+    top = int(np.argmax(probabilities))
+    cnn_result = {
+        "emotion": EMOTION_LABELS[top],
+        "mood": EMOTION_TO_MOOD[EMOTION_LABELS[top]],
+        "confidence": float(probabilities[top]),
+        "mood_scores": emotion_to_mood_scores(probabilities),
+        "face_found": True,
+    }
+    quest_result = score_responses([
+        {"question_id": "q1", "option_index": 0},
+        {"question_id": "q2_high_energy", "option_index": 1},
+    ])
+    return {"cnn_result": cnn_result, "quest_result": quest_result}
+
+
+def session_interface(backend):
+    from flask.sessions import SecureCookieSessionInterface
+    from sessions.flask_interface import ServerSideSessionInterface
+    from sessions.store import get_session_store
+    if backend == "cookie":
+        return SecureCookieSessionInterface()
+    return ServerSideSessionInterface(get_session_store(backend))
+
+
+def bench_backend(app, backend, data, n):
+    """Cookie sizes and µs per read-only / writing request for one backend."""
+    from flask import request
+
+    app.session_interface = iface = session_interface(backend)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(data)
+    name = app.config["SESSION_COOKIE_NAME"]
+    cookie = f"{name}={client.get_cookie(name).value}"
+
+    with app.test_request_context("/results", headers={"Cookie": cookie}):
+        # Read-only request (e.g. /results)
+        start = time.perf_counter()
+        for _ in range(n):
+            session = iface.open_session(app, request)
+            session.get("cnn_result"), session.get("quest_result")
+            iface.save_session(app, session, app.response_class())
+        read_us = (time.perf_counter() - start) / n * 1e6
+
+        # Writing request (e.g. /api/submit-questionnaire)
+        start = time.perf_counter()
+        for _ in range(n):
+            session = iface.open_session(app, request)
+            session["quest_result"] = data["quest_result"]
+            response = app.response_class()
+            iface.save_session(app, session, response)
+        write_us = (time.perf_counter() - start) / n * 1e6
+
+    # A fresh session's first write is the one that sets the cookie
+    with app.test_request_context("/"):
+        session = iface.open_session(app, request)
+        session.update(data)
+        response = app.response_class()
+        iface.save_session(app, session, response)
+        set_cookie = response.headers.get("Set-Cookie", "")
+
+    return len(f"Cookie: {cookie}"), len(f"Set-Cookie: {set_cookie}"), read_us, write_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ["EMOTION_WARMUP"] = "0"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+        from app import app
+        from sessions.codec import encode_session
+
+        data = sample_session()
+        print(f"📊 Session with cnn_result + quest_result "
+              f"({len(encode_session(data))} bytes server-side), {args.requests:,} requests")
+        for backend in ("cookie", "memory", "sqlite"):
+            cookie, set_cookie, read_us, write_us = bench_backend(app, backend, data, args.requests)
+            print(f"   {backend:<7} Cookie {cookie:5d} B   Set-Cookie {set_cookie:5d} B   "
+                  f"read {read_us:7.1f} µs   write {write_us:7.1f} µs  (per request)")
+        db_utils.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: web process start-up with eager vs lazy emotion imports.
+
+Starts fresh interpreters that import app.py and serve one
+/api/first-question through Flask's test client, against a scratch copy
+of the database. "eager" imports emotion.predict (OpenCV, and TensorFlow
+when no serving artifact exists) before the app, as app.py used to;
+"lazy" leaves it to the first upload; "lazy + warm-up" also preloads it
+on the background thread. Reports time from process launch to the first
+response and the RSS at that point, then the heaviest imports of each
+mode from `python -X importtime`.
+
+Usage:
+    python3 -m benchmarks.bench_startup [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Child program: {db} and {eager} are filled in per mode
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+from database import db_utils
+db_utils.DB_PATH = {db!r}
+if {eager}:
+    import emotion.predict
+from app import app, start_emotion_warmup
+start_emotion_warmup()
+assert app.test_client().get("/api/first-question").status_code == 200
+first_response = time.time()
+rss = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1])
+print(f"RESULT {{first_response}} {{rss}}", flush=True)
+"""
+
+MODES = (
+    ("eager (old)", True, "0"),
+    ("lazy", False, "0"),
+    ("lazy + warm-up", False, "1"),
+)
+
+
+def run_child(code, warmup, extra_args=()):
+    env = dict(os.environ, EMOTION_WARMUP=warmup)
+    start = time.time()
+    proc = subprocess.run(
+        [sys.executable, *extra_args, "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return start, proc
+
+
+def top_imports(stderr, n=5):
+    """Largest cumulative import times (top-level packages) from -X importtime."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not name.startswith(" ") and "." not in name.strip():
+            totals[name.strip()] = max(totals.get(name.strip(), 0), int(cumulative))
+    return sorted(totals.items(), key=lambda item: -item[1])[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        print(f"📊 Time to first response and RSS over {args.runs} fresh processes")
+        for label, eager, warmup in MODES:
+            code = CHILD.format(root=ROOT, db=db, eager=eager)
+            latencies, rss = [], []
+            for _ in range(args.runs):
+                start, proc = run_child(code, warmup)
+                result = next(l for l in proc.stdout.splitlines() if l.startswith("RESULT"))
+                _, first_response, kib = result.split()
+                latencies.append((float(first_response) - start) * 1000)
+                rss.append(int(kib) / 1024)
+            print(f"   {label:<16} first response {statistics.median(latencies):8.1f} ms   "
+                  f"RSS {statistics.median(rss):7.1f} MiB")
+
+        print("⏱  Heaviest imports (python -X importtime, cumulative)")
+        for label, eager, warmup in MODES[:2]:
+            code = CHILD.format(root=ROOT, db=db, eager=eager)
+            _, proc = run_child(code, warmup, ("-X", "importtime"))
+            summary = ", ".join(f"{name} {us / 1000:.0f} ms" for name, us in top_imports(proc.stderr))
+            print(f"   {label:<16} {summary}")
+
+
+if __name__ == "__main__":
+    main()
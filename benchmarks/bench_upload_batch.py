@@ -0,0 +1,128 @@
+"""
+Benchmark: scoring a burst of frames one request at a time vs in one batch.
+
+Times the three costs a burst of N frames pays, per frame vs batched:
+decoding and face detection (a loop vs the detection thread pool), CNN
+classification (N single-face forward passes vs one batched pass, using
+a NumPy model with random weights so no trained artifact is needed), and
+HTTP (N /upload requests vs one /api/upload-batch request with a packed
+body, through Flask's test client against a scratch database).
+
+Usage:
+    python3 -m benchmarks.bench_upload_batch [--frames 16] [--size 640x480] [--runs 10]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+from emotion import predict
+from emotion.face_detector import detect_face_from_bytes
+from emotion.runtime import NUM_CONV_BLOCKS, NumpyEmotionModel
+
+
+def synthetic_frames(n, width, height):
+    """Encode `n` different noisy test images as JPEG bytes."""
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(n):
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        image = cv2.GaussianBlur(image, (9, 9), 0)
+        frames.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return frames
+
+
+def random_model():
+    """NumPy serving model with the CNN's shapes and random weights."""
+    rng = np.random.default_rng(0)
+    weights, channels = {}, 1
+    for i, out in zip(range(1, NUM_CONV_BLOCKS + 1), (32, 64, 128)):
+        weights[f"conv{i}_kernel"] = rng.standard_normal((9 * channels, out)).astype(np.float32) * 0.1
+        weights[f"conv{i}_bias"] = np.zeros(out, np.float32)
+        weights[f"conv{i}_scale"] = np.ones(out, np.float32)
+        weights[f"conv{i}_shift"] = np.zeros(out, np.float32)
+        channels = out
+    weights["dense1_kernel"] = rng.standard_normal((6 * 6 * 128, 256)).astype(np.float32) * 0.01
+    weights["dense1_bias"] = np.zeros(256, np.float32)
+    weights["dense2_kernel"] = rng.standard_normal((256, 7)).astype(np.float32) * 0.1
+    weights["dense2_bias"] = np.zeros(7, np.float32)
+    return NumpyEmotionModel(weights)
+
+
+def measure(fn, runs):
+    fn()  # warm-up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def report(label, per_frame_ms, batch_ms, n):
+    print(f"   {label:<22} per frame {per_frame_ms:8.2f} ms   batch {batch_ms:8.2f} ms   "
+          f"({per_frame_ms / batch_ms:4.1f}x, {batch_ms / n:6.2f} ms/frame)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    frames = synthetic_frames(args.frames, width, height)
+    faces = np.random.default_rng(1).random((args.frames, 48, 48, 1), dtype=np.float32)
+    predict._model = random_model()
+
+    print(f"📊 Burst of {args.frames} frames ({args.size} JPEG), "
+          f"{predict.DETECT_THREADS} detection threads, median of {args.runs} runs")
+
+    report(
+        "decode + detect",
+        measure(lambda: [detect_face_from_bytes(f, reduced_decode=True) for f in frames], args.runs),
+        measure(lambda: list(predict._get_detect_executor().map(predict._detect_for_batch, frames)),
+                args.runs),
+        args.frames,
+    )
+    report(
+        "CNN classification",
+        measure(lambda: [predict._predict_batch(face[None]) for face in faces], args.runs),
+        measure(lambda: predict._predict_batch(faces), args.runs),
+        args.frames,
+    )
+
+    os.environ["EMOTION_WARMUP"] = "0"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DB_PATH = os.path.join(tmp, "bench.db")
+        from app import app
+        client = app.test_client()
+        packed = b"".join(struct.pack("<I", len(f)) + f for f in frames)
+
+        def one_by_one():
+            for f in frames:
+                client.post("/upload", data={"image": (io.BytesIO(f), "frame.jpg")})
+
+        def batched():
+            assert client.post("/api/upload-batch", data=packed,
+                               content_type="application/octet-stream").status_code == 200
+
+        report("HTTP end to end", measure(one_by_one, args.runs), measure(batched, args.runs),
+               args.frames)
+        db_utils.close_pool()
+
+
+if __name__ == "__main__":
+    main()
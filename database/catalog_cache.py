@@ -0,0 +1,188 @@
+"""
+In-Memory Catalog Cache
+Holds the songs and movies tables in per-mood arrays so recommendations
+are served without touching SQLite.
+
+The cache reloads when the catalog version (see db_utils.get_catalog_version)
+changes. To keep the check cheap it is only re-read when the database
+file's or WAL's mtime has moved, and at most once per CATALOG_CHECK_INTERVAL.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+# Catalog tables held in memory
+CATALOG_TABLES = ("songs", "movies")
+
+# Seconds between staleness checks
+CATALOG_CHECK_INTERVAL = 1.0
+
+
+class CatalogCache:
+    """
+    Process-wide copy of the catalog tables, grouped by mood tag.
+
+    Each table is stored as a column-name tuple plus {mood_tag: [row, ...]}
+    where every row is a plain tuple; dicts are only built for the rows a
+    request actually returns. Both structures are swapped in as one tuple,
+    so a lookup never mixes tables from two loads.
+    """
+
+    def __init__(self, check_interval=CATALOG_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._data = None       # (tables, by_id) of the last load
+        self._version = None
+        self._file_signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    # ── Freshness ────────────────────────────────────────────────────
+
+    @staticmethod
+    def _stat_signature():
+        """mtimes of the database and its WAL; they move on any write."""
+        signature = []
+        for path in (db_utils.DB_PATH, db_utils.DB_PATH + "-wal"):
+            try:
+                signature.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _ensure_fresh(self):
+        """Reload if stale and return the current (tables, by_id)."""
+        now = time.monotonic()
+        data = self._data
+        if data is not None and now < self._next_check:
+            return data
+
+        with self._lock:
+            if self._data is not None and now < self._next_check:
+                return self._data
+            signature = self._stat_signature()
+            if self._data is None or signature != self._file_signature:
+                version = db_utils.get_catalog_version()
+                if self._data is None or version != self._version:
+                    self._load()
+                    self._version = version
+                self._file_signature = signature
+            self._next_check = now + self.check_interval
+            return self._data
+
+    def _load(self):
+        tables = {}
+        by_id = {}
+        with db_utils.pooled_connection() as conn:
+            for table in CATALOG_TABLES:
+                cursor = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+                columns = tuple(d[0] for d in cursor.description)
+                id_col = columns.index("id")
+                mood_col = columns.index("mood_tag")
+                by_mood = {}
+                rows_by_id = {}
+                for row in cursor:
+                    row = tuple(row)
+                    by_mood.setdefault(row[mood_col], []).append(row)
+                    rows_by_id[row[id_col]] = row
+                tables[table] = (columns, by_mood)
+                by_id[table] = rows_by_id
+        self._data = (tables, by_id)
+        self.loads += 1
+
+    def invalidate(self):
+        """
+        Force a reload on the next access. Lookups running meanwhile keep
+        using the previous load.
+        """
+        with self._lock:
+            self._version = None
+            self._file_signature = None
+            self._next_check = 0.0
+
+    # ── Lookups ──────────────────────────────────────────────────────
+
+    def sample(self, table, mood_tag, limit):
+        """Return up to `limit` distinct random rows of `table` for a mood."""
+        tables, _ = self._ensure_fresh()
+        columns, by_mood = tables[table]
+        rows = by_mood.get(mood_tag.lower(), ())
+        chosen = random.sample(rows, min(limit, len(rows)))
+        return [dict(zip(columns, row)) for row in chosen]
+
+    def get_many(self, table, ids):
+        """Return the rows of `table` with the given ids, in order (missing ids skipped)."""
+        tables, by_id = self._ensure_fresh()
+        columns = tables[table][0]
+        rows_by_id = by_id[table]
+        return [dict(zip(columns, rows_by_id[i])) for i in ids if i in rows_by_id]
+
+    def version(self):
+        """Catalog version the cached tables were loaded from."""
+        self._ensure_fresh()
+        return self._version
+
+    def memory_usage(self):
+        """
+        Approximate memory held by the cache.
+
+        Returns
+        -------
+        dict
+            {table: bytes} plus "total", counting the per-mood lists, the
+            row tuples and their values.
+        """
+        tables, by_id = self._ensure_fresh()
+        usage = {}
+        for table, (columns, by_mood) in tables.items():
+            size = sys.getsizeof(by_mood) + sys.getsizeof(by_id[table])
+            for rows in by_mood.values():
+                size += sys.getsizeof(rows)
+                for row in rows:
+                    size += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+            usage[table] = size
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def stats(self):
+        """Row counts, loaded catalog version and reload count."""
+        tables, _ = self._ensure_fresh()
+        return {
+            "version": self._version,
+            "loads": self.loads,
+            "rows": {
+                table: sum(len(rows) for rows in by_mood.values())
+                for table, (_, by_mood) in tables.items()
+            },
+        }
+
+
+# Process-wide instance
+_cache = CatalogCache()
+
+
+def get_catalog_cache():
+    """Return the process-wide catalog cache."""
+    return _cache
+
+
+def get_cached_songs(mood_tag, limit=5):
+    """Cached equivalent of db_utils.get_songs_by_mood."""
+    return _cache.sample("songs", mood_tag, limit)
+
+
+def get_cached_movies(mood_tag, limit=5):
+    """Cached equivalent of db_utils.get_movies_by_mood."""
+    return _cache.sample("movies", mood_tag, limit)
+
+
+def get_cached_items(table, ids):
+    """Cached equivalent of db_utils.get_items_by_ids."""
+    return _cache.get_many(table, ids)
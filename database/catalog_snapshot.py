@@ -0,0 +1,371 @@
+"""
+Columnar Catalog Snapshot
+Read-only, memory-mapped copy of the songs and movies tables.
+
+A build step writes each table as fixed-width column arrays plus string
+heaps, all as .npy files in one version directory:
+
+    {table}.id.npy                int64 ids, ascending
+    {table}.{column}.npy          int64 integer columns (e.g. year)
+    {table}.{column}.codes.npy    uint16 codes of categorical columns
+                                  (mood_tag, genre, ...); labels in meta.json
+    {table}.{column}.heap.npy     uint8 UTF-8 bytes of a string column
+    {table}.{column}.offsets.npy  int64 (N + 1) row offsets into that heap
+    {table}.by_mood.npy           int64 row positions grouped by mood
+    meta.json                     column layout, labels, mood ranges, version
+
+Each build goes to a fresh v{catalog_version}-{ns}/ directory under the
+snapshot root; the CURRENT file naming it is replaced last, so readers
+never see a half-written snapshot and mapped files are never rewritten.
+
+Workers map the files with np.load(mmap_mode="r"), so N processes share
+one copy through the page cache instead of each holding the catalog on
+its heap. Rows are only decoded into dicts for the items a request
+returns.
+
+Usage:
+    python -m database.catalog_snapshot
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+# Where the snapshot lives
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot")
+
+SNAPSHOT_TABLES = ("songs", "movies")
+
+# Column encodings per table (every other column goes to a string heap)
+SNAPSHOT_LAYOUT = {
+    "songs": {"codes": ("genre", "mood_tag"), "ints": ()},
+    "movies": {"codes": ("genre", "mood_tag", "ott_platform"), "ints": ("year",)},
+}
+
+# Seconds between checks that the snapshot still matches the database
+SNAPSHOT_CHECK_INTERVAL = 1.0
+
+BUILD_CHUNK = 100000
+
+# Categorical codes are stored as uint16
+MAX_CODES = np.iinfo(np.uint16).max + 1
+
+# File under the snapshot root naming the live version directory
+CURRENT_FILE = "CURRENT"
+
+# Old version directories kept after a swap (workers may still be mapping them)
+KEEP_VERSIONS = 2
+
+
+# ── Build ────────────────────────────────────────────────────────────────
+
+def save_npy(path, array):
+    """Write an array atomically (temp file + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _build_table(conn, table, version_dir):
+    """
+    Write one table's column files; return its meta.json entry.
+
+    The row count and heap sizes are read first (in the same transaction),
+    so every column is a preallocated memory-mapped .npy file that each
+    chunk is written straight into: peak memory is O(BUILD_CHUNK), not
+    O(rows). The version directory is not published until CURRENT names
+    it, so the files are written in place.
+    """
+    layout = SNAPSHOT_LAYOUT[table]
+    cursor = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+    columns = [d[0] for d in cursor.description]
+    position = {c: i for i, c in enumerate(columns)}
+    strings = [c for c in columns if c != "id" and c not in layout["ints"]
+               and c not in layout["codes"]]
+
+    sizes = conn.execute(
+        "SELECT COUNT(*)"
+        + "".join(f", IFNULL(SUM(LENGTH(CAST({c} AS BLOB))), 0)" for c in strings)
+        + f" FROM {table}"
+    ).fetchone()
+    rows = sizes[0]
+
+    prefix = os.path.join(version_dir, table)
+
+    def column(suffix, dtype, length):
+        return np.lib.format.open_memmap(
+            f"{prefix}.{suffix}.npy", mode="w+", dtype=dtype, shape=(length,)
+        )
+
+    ints = {c: column(c, np.int64, rows) for c in ("id",) + layout["ints"]}
+    codes = {c: column(f"{c}.codes", np.uint16, rows) for c in layout["codes"]}
+    labels = {c: {} for c in layout["codes"]}
+    heaps = {c: column(f"{c}.heap", np.uint8, size) for c, size in zip(strings, sizes[1:])}
+    offsets = {c: column(f"{c}.offsets", np.int64, rows + 1) for c in strings}
+
+    start = 0
+    while True:
+        chunk = cursor.fetchmany(BUILD_CHUNK)
+        if not chunk:
+            break
+        end = start + len(chunk)
+        for c, out in ints.items():
+            i = position[c]
+            out[start:end] = [row[i] for row in chunk]
+        for c, out in codes.items():
+            i, seen = position[c], labels[c]
+            values = [seen.setdefault(row[i], len(seen)) for row in chunk]
+            if len(seen) > MAX_CODES:
+                raise ValueError(
+                    f"{table}.{c} has more than {MAX_CODES:,} distinct values; "
+                    f"at most {MAX_CODES:,} fit the uint16 codes."
+                )
+            out[start:end] = values
+        for c, heap in heaps.items():
+            i = position[c]
+            encoded = [row[i].encode("utf-8") for row in chunk]
+            ends = offsets[c][start] + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+            heap[offsets[c][start]:ends[-1]] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            offsets[c][start + 1:end + 1] = ends
+        start = end
+
+    # Row positions grouped by mood code (a chunked counting sort); mood m
+    # owns by_mood[start:end]
+    mood_codes = codes["mood_tag"]
+    counts = np.zeros(len(labels["mood_tag"]), dtype=np.int64)
+    for block_start in range(0, rows, BUILD_CHUNK):
+        block = mood_codes[block_start:block_start + BUILD_CHUNK]
+        counts += np.bincount(block, minlength=len(counts))
+    bounds = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=bounds[1:])
+
+    by_mood = column("by_mood", np.int64, rows)
+    fill = bounds[:-1].copy()
+    for block_start in range(0, rows, BUILD_CHUNK):
+        block = mood_codes[block_start:block_start + BUILD_CHUNK]
+        block_counts = np.bincount(block, minlength=len(counts))
+        grouped = block_start + np.argsort(block, kind="stable")
+        for code, part in enumerate(np.split(grouped, np.cumsum(block_counts)[:-1])):
+            by_mood[fill[code]:fill[code] + len(part)] = part
+        fill += block_counts
+
+    for array in (*ints.values(), *codes.values(), *heaps.values(),
+                  *offsets.values(), by_mood):
+        array.flush()
+
+    return {
+        "columns": columns,
+        "rows": rows,
+        "ints": ["id", *layout["ints"]],
+        "codes": {c: sorted(labels[c], key=labels[c].get) for c in layout["codes"]},
+        "strings": strings,
+        "mood_ranges": {
+            mood: [int(bounds[code]), int(bounds[code + 1])]
+            for mood, code in labels["mood_tag"].items()
+        },
+    }
+
+
+def _version_dirs(snapshot_dir):
+    """Version directory names under the snapshot root, oldest first."""
+    names = [n for n in os.listdir(snapshot_dir)
+             if n.startswith("v") and os.path.isdir(os.path.join(snapshot_dir, n))]
+    return sorted(names, key=lambda n: int(n.rsplit("-", 1)[-1]))
+
+
+def build_snapshot(snapshot_dir=None, verbose=True):
+    """
+    Write the columnar snapshot of every catalog table.
+
+    The whole build reads from one transaction, so all tables match the
+    recorded catalog version. The files go to a new version directory,
+    which CURRENT is then switched to with os.replace(); version
+    directories beyond the newest KEEP_VERSIONS are removed.
+    """
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    os.makedirs(snapshot_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    with db_utils.pooled_connection() as conn:
+        conn.execute("BEGIN")
+        meta = {"catalog_version": db_utils.get_catalog_version(conn), "tables": {}}
+        name = f"v{meta['catalog_version']}-{time.time_ns()}"
+        version_dir = os.path.join(snapshot_dir, name)
+        os.makedirs(version_dir)
+        try:
+            for table in SNAPSHOT_TABLES:
+                meta["tables"][table] = _build_table(conn, table, version_dir)
+        except BaseException:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise
+        finally:
+            conn.rollback()
+
+    with open(os.path.join(version_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    tmp = os.path.join(snapshot_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(snapshot_dir, CURRENT_FILE))
+
+    for old in _version_dirs(snapshot_dir)[:-KEEP_VERSIONS]:
+        if old != name:
+            shutil.rmtree(os.path.join(snapshot_dir, old), ignore_errors=True)
+
+    if verbose:
+        rows = ", ".join(f"{t['rows']:,} {table}" for table, t in meta["tables"].items())
+        print(f"✅ Catalog snapshot ({rows}) for version {meta['catalog_version']} "
+              f"written to {version_dir} in {time.perf_counter() - start:.2f}s")
+    return meta
+
+
+def current_snapshot_dir(snapshot_dir=None):
+    """Version directory CURRENT points to, or None if none has been built."""
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(snapshot_dir, name)
+
+
+# ── Read side ────────────────────────────────────────────────────────────
+
+class SnapshotTable:
+    """Memory-mapped columns of one catalog table."""
+
+    def __init__(self, snapshot_dir, name, meta):
+        prefix = os.path.join(snapshot_dir, name)
+        self.columns = meta["columns"]
+        self.mood_ranges = meta["mood_ranges"]
+        self.ints = {c: np.load(f"{prefix}.{c}.npy", mmap_mode="r") for c in meta["ints"]}
+        self.codes = {
+            c: (np.load(f"{prefix}.{c}.codes.npy", mmap_mode="r"), labels)
+            for c, labels in meta["codes"].items()
+        }
+        self.strings = {
+            c: (np.load(f"{prefix}.{c}.heap.npy", mmap_mode="r"),
+                np.load(f"{prefix}.{c}.offsets.npy", mmap_mode="r"))
+            for c in meta["strings"]
+        }
+        self.by_mood = np.load(f"{prefix}.by_mood.npy", mmap_mode="r")
+        self.ids = self.ints["id"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, i):
+        """Decode row position `i` into a dict (same keys as SQLite's)."""
+        values = {}
+        for c, column in self.ints.items():
+            values[c] = int(column[i])
+        for c, (codes, labels) in self.codes.items():
+            values[c] = labels[codes[i]]
+        for c, (heap, offsets) in self.strings.items():
+            values[c] = heap[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+        return {c: values[c] for c in self.columns}
+
+    def sample(self, mood_tag, limit):
+        """Up to `limit` distinct random rows for a mood, in O(limit)."""
+        start, end = self.mood_ranges.get(mood_tag.lower(), (0, 0))
+        chosen = random.sample(range(start, end), min(limit, end - start))
+        return [self.row(int(self.by_mood[k])) for k in chosen]
+
+    def get_many(self, ids):
+        """Rows with the given ids, in order (missing ids skipped)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids)
+        rows = []
+        for item_id, i in zip(ids, positions):
+            if i < len(self.ids) and self.ids[i] == item_id:
+                rows.append(self.row(int(i)))
+        return rows
+
+
+class CatalogSnapshot:
+    """
+    All tables of a snapshot directory, with the catalog-cache interface
+    (sample, get_many, version).
+
+    is_current() compares the snapshot's catalog version with the database
+    at most once per SNAPSHOT_CHECK_INTERVAL; callers fall back to another
+    backend while it is stale.
+    """
+
+    def __init__(self, snapshot_dir, check_interval=SNAPSHOT_CHECK_INTERVAL):
+        with open(os.path.join(snapshot_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.snapshot_dir = snapshot_dir
+        self.catalog_version = meta["catalog_version"]
+        self.tables = {
+            name: SnapshotTable(snapshot_dir, name, table_meta)
+            for name, table_meta in meta["tables"].items()
+        }
+        self.check_interval = check_interval
+        self._current = None
+        self._next_check = 0.0
+
+    def is_current(self):
+        """Whether the snapshot matches the database's catalog version."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._current = db_utils.get_catalog_version() == self.catalog_version
+            self._next_check = now + self.check_interval
+        return self._current
+
+    def version(self):
+        """Catalog version the snapshot was built from."""
+        return self.catalog_version
+
+    def sample(self, table, mood_tag, limit):
+        """Return up to `limit` distinct random rows of `table` for a mood."""
+        return self.tables[table].sample(mood_tag, limit)
+
+    def get_many(self, table, ids):
+        """Return the rows of `table` with the given ids, in order."""
+        return self.tables[table].get_many(ids)
+
+
+_snapshot = None
+_snapshot_signature = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog_snapshot():
+    """
+    Return the process-wide snapshot, or None if none has been built.
+
+    The new version directory is mapped once a rebuild replaces CURRENT.
+    """
+    global _snapshot, _snapshot_signature
+    try:
+        st = os.stat(os.path.join(SNAPSHOT_DIR, CURRENT_FILE))
+    except OSError:
+        return None
+    signature = (st.st_ino, st.st_mtime_ns)
+    if signature != _snapshot_signature:
+        with _snapshot_lock:
+            if signature != _snapshot_signature:
+                version_dir = current_snapshot_dir()
+                if version_dir is None:
+                    return None
+                _snapshot = CatalogSnapshot(version_dir)
+                _snapshot_signature = signature
+    return _snapshot
+
+
+if __name__ == "__main__":
+    build_snapshot()
@@ -5,6 +5,10 @@ Provides connection management and query helpers.
 
 import sqlite3
 import os
+import random
+import threading
+from array import array
+from contextlib import contextmanager
 from datetime import datetime
 
 # Path to the SQLite database file
@@ -12,14 +16,134 @@ DB_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(DB_DIR, "mood_recommendations.db")
 SCHEMA_PATH = os.path.join(DB_DIR, "schema.sql")
 
+# Connection tuning applied to every new connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # readers never block the writer
+    "PRAGMA synchronous=NORMAL",     # fsync at checkpoints only (safe with WAL)
+    "PRAGMA cache_size=-16000",      # 16 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
 
-def get_connection():
-    """Get a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
+# Prepared statements kept per connection (sqlite3's LRU statement cache)
+STATEMENT_CACHE_SIZE = 128
+
+# Idle connections kept open in the pool
+POOL_SIZE = 16
+
+
+def _connect(path):
+    """Open a tuned connection to the database at `path`."""
+    conn = sqlite3.connect(
+        path,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # pooled connections move between threads
+    )
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def get_connection():
+    """Get a new connection to the SQLite database (caller closes it)."""
+    return _connect(DB_PATH)
+
+
+class ConnectionPool:
+    """
+    Pool of reusable SQLite connections.
+
+    Connections stay open between requests, so pragmas are applied once
+    and each connection's prepared-statement cache is reused. Idle
+    connections are kept LIFO so the warmest one is handed out first.
+    """
+
+    def __init__(self, path, max_idle=POOL_SIZE):
+        self.path = path
+        self.max_idle = max_idle
+        self.pid = os.getpid()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take an idle connection, or open a new one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _connect(self.path)
+
+    def release(self, conn):
+        """Return a connection to the pool (closing it if the pool is full)."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, recreating it after fork or a DB_PATH change."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid() or pool.path != DB_PATH:
+        with _pool_lock:
+            pool = _pool
+            if pool is None or pool.pid != os.getpid() or pool.path != DB_PATH:
+                pool = _pool = ConnectionPool(DB_PATH)
+    return pool
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection for the duration of a `with` block."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def close_pool():
+    """Close the idle connections of the process-wide pool."""
+    if _pool is not None:
+        _pool.close()
+
+
+def get_catalog_version(conn=None):
+    """
+    Return the catalog version stored in the database header.
+
+    Any code that changes the songs or movies tables must call
+    bump_catalog_version() so in-memory catalog copies reload.
+    """
+    if conn is None:
+        with pooled_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def bump_catalog_version(conn):
+    """Increment the catalog version (commit is left to the caller)."""
+    version = get_catalog_version(conn) + 1
+    conn.execute(f"PRAGMA user_version = {version}")
+    return version
+
+
 def init_db():
     """Initialize the database by executing the schema SQL file."""
     conn = get_connection()
@@ -29,19 +153,63 @@ def init_db():
     conn.close()
 
 
+# ── Random sampling by mood ──────────────────────────────────────────────
+# Each (table, mood) keeps an array of matching ids, so a sample of `limit`
+# rows costs O(limit) instead of sorting every matching row by RANDOM().
+# The arrays are rebuilt when the catalog version changes (any insert,
+# update or delete, see bump_catalog_version) or when sampled ids no
+# longer resolve (a writer that forgot to bump the version).
+
+_mood_ids = {}          # (table, mood_tag) → array of ids
+_mood_ids_marker = {}   # table → catalog version when its arrays were built
+_mood_ids_lock = threading.Lock()
+
+
+def _get_mood_ids(conn, table, mood_tag, marker, refresh=False):
+    """Return the cached id array for (table, mood_tag), loading it if stale."""
+    key = (table, mood_tag)
+    with _mood_ids_lock:
+        if _mood_ids_marker.get(table) != marker:
+            for cached in [k for k in _mood_ids if k[0] == table]:
+                del _mood_ids[cached]
+            _mood_ids_marker[table] = marker
+        ids = None if refresh else _mood_ids.get(key)
+    if ids is None:
+        # Served from the covering index on mood_tag (which includes rowid)
+        cursor = conn.execute(f"SELECT id FROM {table} WHERE mood_tag = ?", (mood_tag,))
+        ids = array("q", (row[0] for row in cursor))
+        with _mood_ids_lock:
+            _mood_ids[key] = ids
+    return ids
+
+
+def _sample_by_mood(table, mood_tag, limit):
+    """Return up to `limit` distinct, uniformly random rows of `table` for a mood."""
+    mood_tag = mood_tag.lower()
+    with pooled_connection() as conn:
+        marker = get_catalog_version(conn)
+        for attempt in range(2):
+            ids = _get_mood_ids(conn, table, mood_tag, marker, refresh=attempt > 0)
+            chosen = random.sample(ids, min(limit, len(ids)))
+            if not chosen:
+                return []
+            placeholders = ",".join("?" * len(chosen))
+            cursor = conn.execute(
+                f"SELECT * FROM {table} WHERE mood_tag = ? AND id IN ({placeholders})",
+                (mood_tag, *chosen),
+            )
+            rows = {row["id"]: dict(row) for row in cursor.fetchall()}
+            if len(rows) == len(chosen):
+                break
+        return [rows[i] for i in chosen if i in rows]
+
+
 def get_songs_by_mood(mood_tag, limit=5):
     """
     Retrieve songs matching the given mood tag.
     Returns a randomized selection up to `limit` results.
     """
-    conn = get_connection()
-    cursor = conn.execute(
-        "SELECT * FROM songs WHERE mood_tag = ? ORDER BY RANDOM() LIMIT ?",
-        (mood_tag.lower(), limit),
-    )
-    songs = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return songs
+    return _sample_by_mood("songs", mood_tag, limit)
 
 
 def get_movies_by_mood(mood_tag, limit=5):
@@ -49,44 +217,59 @@ def get_movies_by_mood(mood_tag, limit=5):
     Retrieve movies matching the given mood tag.
     Returns a randomized selection up to `limit` results.
     """
-    conn = get_connection()
-    cursor = conn.execute(
-        "SELECT * FROM movies WHERE mood_tag = ? ORDER BY RANDOM() LIMIT ?",
-        (mood_tag.lower(), limit),
+    return _sample_by_mood("movies", mood_tag, limit)
+
+
+def get_items_by_ids(table, ids):
+    """Retrieve rows of a catalog table by id, in the order given (missing ids skipped)."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return []
+    placeholders = ",".join("?" * len(ids))
+    with pooled_connection() as conn:
+        cursor = conn.execute(f"SELECT * FROM {table} WHERE id IN ({placeholders})", ids)
+        rows = {row["id"]: dict(row) for row in cursor.fetchall()}
+    return [rows[i] for i in ids if i in rows]
+
+
+_INSERT_MOOD_HISTORY = """INSERT INTO mood_history
+   (timestamp, cnn_emotion, cnn_confidence, questionnaire_mood,
+    questionnaire_score, final_mood)
+   VALUES (?, ?, ?, ?, ?, ?)"""
+
+
+def mood_history_record(cnn_emotion, cnn_confidence, questionnaire_mood,
+                        questionnaire_score, final_mood):
+    """Build a mood_history row tuple, timestamped now."""
+    return (
+        datetime.now().isoformat(),
+        cnn_emotion,
+        cnn_confidence,
+        questionnaire_mood,
+        questionnaire_score,
+        final_mood,
     )
-    movies = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return movies
 
 
 def log_mood(cnn_emotion, cnn_confidence, questionnaire_mood,
              questionnaire_score, final_mood):
     """Log a mood analysis session to the mood_history table."""
-    conn = get_connection()
-    conn.execute(
-        """INSERT INTO mood_history
-           (timestamp, cnn_emotion, cnn_confidence, questionnaire_mood,
-            questionnaire_score, final_mood)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (
-            datetime.now().isoformat(),
-            cnn_emotion,
-            cnn_confidence,
-            questionnaire_mood,
-            questionnaire_score,
-            final_mood,
-        ),
-    )
-    conn.commit()
-    conn.close()
+    log_moods([mood_history_record(
+        cnn_emotion, cnn_confidence, questionnaire_mood,
+        questionnaire_score, final_mood,
+    )])
+
+
+def log_moods(records):
+    """Insert many mood_history_record() tuples in a single transaction."""
+    with pooled_connection() as conn, conn:
+        conn.executemany(_INSERT_MOOD_HISTORY, records)
 
 
 def get_mood_history(limit=20):
     """Retrieve recent mood history entries."""
-    conn = get_connection()
-    cursor = conn.execute(
-        "SELECT * FROM mood_history ORDER BY id DESC LIMIT ?", (limit,)
-    )
-    history = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return history
+    with pooled_connection() as conn:
+        cursor = conn.execute(
+            "SELECT * FROM mood_history ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,385 @@
+"""
+Bulk Catalog Importer
+Streams songs or movies from a CSV or JSONL export into the database.
+
+Rows are read and inserted in fixed-size chunks, so memory use does not
+grow with the file. The mood index is dropped for the duration of the
+import and rebuilt at the end, and rows are committed in large
+transactions. Each commit also records the byte offset reached in the
+import_progress table, so an interrupted import resumes where the last
+commit left off, and the id range it inserted in import_id_ranges, so
+--restart first deletes what earlier runs of the same file imported.
+Records that cannot be parsed or validated are counted as rejected and
+skipped, so a bad line never blocks the rest of the file.
+
+Usage:
+    python -m database.import_catalog songs songs.csv
+    python -m database.import_catalog movies movies.jsonl [--chunk-size 5000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+# Allow running as module from project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_utils import bump_catalog_version, get_connection, init_db
+from fusion.mood_vector import MOOD_CATEGORIES
+
+# Insertable columns per catalog table (id is assigned by SQLite)
+CATALOG_COLUMNS = {
+    "songs": ("title", "artist", "genre", "mood_tag", "youtube_url"),
+    "movies": ("title", "genre", "year", "mood_tag", "ott_platform", "ott_url"),
+}
+
+# Secondary index dropped during the import and rebuilt afterwards
+CATALOG_INDEXES = {
+    "songs": ("idx_songs_mood", "CREATE INDEX IF NOT EXISTS idx_songs_mood ON songs(mood_tag)"),
+    "movies": ("idx_movies_mood", "CREATE INDEX IF NOT EXISTS idx_movies_mood ON movies(mood_tag)"),
+}
+
+# Import tuning (configurable)
+DEFAULT_CHUNK_SIZE = 10000          # rows per executemany
+DEFAULT_COMMIT_EVERY = 200000       # rows per transaction (and checkpoint)
+
+_VALID_MOODS = frozenset(MOOD_CATEGORIES)
+
+
+class CatalogImportError(Exception):
+    """Raised when an import cannot start or resume."""
+
+
+# ── Readers ──────────────────────────────────────────────────────────────
+# Each reader yields (record, end_offset) where end_offset is the byte
+# position just after the record, so a resume can seek straight to it.
+
+def _counted_lines(f, offset):
+    """Yield decoded lines from a binary file, tracking the byte offset."""
+    position = [offset]
+
+    def lines():
+        for raw in f:
+            position[0] += len(raw)
+            yield raw.decode("utf-8")
+
+    return lines(), position
+
+
+def read_csv(path, offset=0):
+    """Yield ({column: value}, end_offset) for each CSV record after `offset`."""
+    with open(path, "rb") as f:
+        lines, position = _counted_lines(f, 0)
+        header = next(csv.reader(lines), None)
+        if header is None:
+            return
+        header = [name.strip().lstrip("\ufeff") for name in header]
+        if offset > position[0]:
+            f.seek(offset)
+            lines, position = _counted_lines(f, offset)
+        # csv.reader pulls exactly the lines of one record, no read-ahead
+        for values in csv.reader(lines):
+            if values:
+                yield dict(zip(header, values)), position[0]
+
+
+def read_jsonl(path, offset=0):
+    """
+    Yield (object, end_offset) for each JSON line after `offset`; the
+    object is None for a line that is not valid UTF-8 JSON.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        position = offset
+        for raw in f:
+            position += len(raw)
+            if raw.strip():
+                try:
+                    record = json.loads(raw)
+                except ValueError:  # JSONDecodeError and UnicodeDecodeError
+                    record = None
+                yield record, position
+
+
+READERS = {".csv": read_csv, ".jsonl": read_jsonl, ".ndjson": read_jsonl}
+
+
+def detect_format(path):
+    """Pick a reader from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise CatalogImportError(f"Unsupported file type {ext!r} (use .csv or .jsonl).")
+    return READERS[ext]
+
+
+# ── Validation ───────────────────────────────────────────────────────────
+
+def validate_record(table, record):
+    """
+    Convert a parsed record into an insert tuple.
+
+    Returns
+    -------
+    tuple or None
+        Values in CATALOG_COLUMNS[table] order, or None if the record is
+        not an object, is missing a field, has an unknown mood_tag or a
+        non-integer year.
+    """
+    if not isinstance(record, dict):
+        return None
+    values = []
+    for column in CATALOG_COLUMNS[table]:
+        value = record.get(column)
+        if value is None:
+            return None
+        if column == "year":
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return None
+        else:
+            value = str(value).strip()
+            if not value:
+                return None
+            if column == "mood_tag":
+                value = value.lower()
+                if value not in _VALID_MOODS:
+                    return None
+        values.append(value)
+    return tuple(values)
+
+
+# ── Progress tracking ────────────────────────────────────────────────────
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load_progress(conn, source):
+    return conn.execute(
+        "SELECT table_name, file_size, file_mtime, byte_offset, rows_imported, "
+        "rows_rejected, completed FROM import_progress WHERE source = ?",
+        (source,),
+    ).fetchone()
+
+
+def _last_id(conn, table):
+    """Largest id ever assigned in `table` (AUTOINCREMENT sequence)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    return row[0] if row is not None else 0
+
+
+def _delete_imported(conn, source):
+    """Delete the rows earlier runs imported from `source`; return how many."""
+    deleted = 0
+    ranges = conn.execute(
+        "SELECT table_name, first_id, last_id FROM import_id_ranges WHERE source = ?",
+        (source,),
+    ).fetchall()
+    for table, first_id, last_id in ranges:
+        deleted += conn.execute(
+            f"DELETE FROM {table} WHERE id BETWEEN ? AND ?", (first_id, last_id)
+        ).rowcount
+        conn.execute(
+            "DELETE FROM item_mood_vectors WHERE table_name = ? AND item_id BETWEEN ? AND ?",
+            (table, first_id, last_id),
+        )
+    conn.execute("DELETE FROM import_id_ranges WHERE source = ?", (source,))
+    conn.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+    return deleted
+
+
+def _save_progress(conn, source, table, fingerprint, offset, imported, rejected,
+                   completed=False):
+    conn.execute(
+        "INSERT OR REPLACE INTO import_progress "
+        "(source, table_name, file_size, file_mtime, byte_offset, rows_imported, "
+        " rows_rejected, completed, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+        (source, table, *fingerprint, offset, imported, rejected, int(completed)),
+    )
+
+
+# ── Import ───────────────────────────────────────────────────────────────
+
+def import_catalog(table, path, chunk_size=DEFAULT_CHUNK_SIZE,
+                   commit_every=DEFAULT_COMMIT_EVERY, restart=False, verbose=True):
+    """
+    Stream a CSV or JSONL export into the songs or movies table.
+
+    Parameters
+    ----------
+    table : str
+        "songs" or "movies".
+    path : str
+        Export file; CSV needs a header row with the column names.
+    chunk_size : int
+        Rows passed to each executemany call.
+    commit_every : int
+        Rows per transaction; progress is checkpointed at each commit.
+    restart : bool
+        Delete the rows earlier runs imported from this file, then import
+        it from the start.
+    verbose : bool
+        Print rows-per-second progress at every commit.
+
+    Returns
+    -------
+    dict with keys:
+        imported : int   — Rows inserted (including earlier runs)
+        rejected : int   — Rows skipped as unparsable or invalid
+        seconds  : float — Time spent in this run
+        rows_per_second : float — Rows inserted per second in this run
+    """
+    if table not in CATALOG_COLUMNS:
+        raise CatalogImportError(f"Unknown catalog table {table!r}.")
+    reader = detect_format(path)
+    source = os.path.realpath(path)
+    fingerprint = _fingerprint(path)
+
+    init_db()
+    conn = get_connection()
+    conn.isolation_level = None  # transactions are managed explicitly below
+    try:
+        return _import(conn, table, path, reader, source, fingerprint,
+                       chunk_size, commit_every, restart, verbose)
+    finally:
+        conn.close()
+
+
+def _import(conn, table, path, reader, source, fingerprint,
+            chunk_size, commit_every, restart, verbose):
+    """Body of import_catalog() on an open connection."""
+    offset = imported = rejected = 0
+    progress = None if restart else _load_progress(conn, source)
+    if progress is not None:
+        if progress["table_name"] != table:
+            raise CatalogImportError(f"{path} was imported into {progress['table_name']!r}.")
+        if (progress["file_size"], progress["file_mtime"]) != fingerprint:
+            raise CatalogImportError(f"{path} changed since the last run; use --restart.")
+        if progress["completed"]:
+            if verbose:
+                print(f"{path} was already imported. Skipping.")
+            return {"imported": progress["rows_imported"],
+                    "rejected": progress["rows_rejected"],
+                    "seconds": 0.0, "rows_per_second": 0.0}
+        offset = progress["byte_offset"]
+        imported = progress["rows_imported"]
+        rejected = progress["rows_rejected"]
+        if verbose:
+            print(f"Resuming {path} at byte {offset} ({imported} rows imported).")
+
+    columns = CATALOG_COLUMNS[table]
+    insert_sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+    index_name, create_index = CATALOG_INDEXES[table]
+
+    start = time.perf_counter()
+    run_imported = 0
+    chunk = []
+    in_transaction = 0
+    end_offset = offset
+    first_id = None
+
+    def begin():
+        # IMMEDIATE takes the write lock up front, so the ids this
+        # transaction assigns are contiguous and start after first_id
+        nonlocal first_id
+        conn.execute("BEGIN IMMEDIATE")
+        first_id = _last_id(conn, table) + 1
+
+    def flush_chunk():
+        nonlocal chunk, in_transaction, imported, run_imported
+        if chunk:
+            conn.executemany(insert_sql, chunk)
+            in_transaction += len(chunk)
+            imported += len(chunk)
+            run_imported += len(chunk)
+            chunk = []
+
+    def checkpoint(completed=False):
+        nonlocal in_transaction
+        last_id = _last_id(conn, table)
+        if last_id >= first_id:
+            conn.execute(
+                "INSERT INTO import_id_ranges (source, table_name, first_id, last_id) "
+                "VALUES (?, ?, ?, ?)",
+                (source, table, first_id, last_id),
+            )
+        _save_progress(conn, source, table, fingerprint, end_offset,
+                       imported, rejected, completed)
+        conn.execute("COMMIT")
+        in_transaction = 0
+        if verbose:
+            elapsed = time.perf_counter() - start
+            rate = run_imported / elapsed if elapsed > 0 else 0.0
+            print(f"   {imported:>12,} rows   {rejected:>8,} rejected   {rate:>10,.0f} rows/s")
+
+    try:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+        begin()
+        if restart:
+            # Removed in the same transaction that writes the new checkpoint
+            deleted = _delete_imported(conn, source)
+            if deleted:
+                bump_catalog_version(conn)
+                if verbose:
+                    print(f"Restarting {path}: removed {deleted:,} rows of earlier runs.")
+        for record, end_offset in reader(path, offset):
+            values = validate_record(table, record)
+            if values is None:
+                rejected += 1
+                continue
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                flush_chunk()
+                if in_transaction >= commit_every:
+                    checkpoint()
+                    begin()
+        flush_chunk()
+
+        # Final transaction: remaining rows, rebuilt index and catalog version
+        conn.execute(create_index)
+        bump_catalog_version(conn)
+        checkpoint(completed=True)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        # Leave the mood index in place; the next run drops it again
+        conn.execute(create_index)
+        raise
+
+    elapsed = time.perf_counter() - start
+    rate = run_imported / elapsed if elapsed > 0 else 0.0
+    if verbose:
+        print(f"✅ Imported {run_imported:,} {table} in {elapsed:.1f}s "
+              f"({rate:,.0f} rows/s, {rejected:,} rejected in total).")
+    return {"imported": imported, "rejected": rejected,
+            "seconds": elapsed, "rows_per_second": rate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("table", choices=sorted(CATALOG_COLUMNS))
+    parser.add_argument("path", help="CSV (with header) or JSONL export")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--commit-every", type=int, default=DEFAULT_COMMIT_EVERY)
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore saved progress and start from the beginning")
+    args = parser.parse_args()
+
+    try:
+        import_catalog(args.table, args.path, chunk_size=args.chunk_size,
+                       commit_every=args.commit_every, restart=args.restart)
+    except CatalogImportError as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Asynchronous Mood-History Writer
+Moves mood_history inserts off the request path. Requests enqueue a record;
+a single background thread writes them in executemany batches, one
+transaction (and one commit) per batch.
+"""
+
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_utils import log_moods, mood_history_record
+
+# Writer tuning (configurable)
+LOG_QUEUE_SIZE = 10000      # records buffered before new ones are dropped
+LOG_BATCH_SIZE = 256        # flush once this many records are collected...
+LOG_FLUSH_INTERVAL = 0.5    # ...or this many seconds after the first one
+
+_STOP = object()
+
+
+class MoodLogWriter:
+    """
+    Bounded queue drained by one writer thread.
+
+    submit() never blocks: when the queue is full the record is dropped
+    and counted. flush() blocks until everything queued before it has
+    been written; close() flushes and stops the thread.
+    """
+
+    def __init__(self, max_queue=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="mood-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    # ── Producer side ────────────────────────────────────────────────
+
+    def submit(self, record):
+        """Queue one mood_history record; return False if it was dropped."""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until all records queued so far are written."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Flush pending records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Counters for queued, written, dropped and failed records."""
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+    # ── Writer thread ────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            records, waiters, stop = self._collect()
+            if records:
+                self._write(records)
+            for done in waiters:
+                done.set()
+            if stop:
+                return
+
+    def _collect(self):
+        """Block for the first item, then gather a batch by size or time."""
+        records, waiters = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is _STOP:
+                # Drain whatever is still queued before stopping
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        return records, waiters, True
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        records.append(item)
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                return records, waiters, False
+            records.append(item)
+            if len(records) >= self.batch_size:
+                return records, waiters, False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return records, waiters, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return records, waiters, False
+
+    def _write(self, records):
+        try:
+            log_moods(records)
+        except Exception as e:
+            print(f"Warning: Could not log mood history: {e}")
+            with self._stats_lock:
+                self.failed += len(records)
+            return
+        with self._stats_lock:
+            self.written += len(records)
+            self.batches += 1
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Return the process-wide writer, starting it (again after fork) if needed."""
+    global _writer
+    writer = _writer
+    if writer is None or writer.pid != os.getpid():
+        with _writer_lock:
+            writer = _writer
+            if writer is None or writer.pid != os.getpid():
+                writer = _writer = MoodLogWriter()
+                atexit.register(writer.close)
+    return writer
+
+
+def enqueue_mood_log(cnn_emotion, cnn_confidence, questionnaire_mood,
+                     questionnaire_score, final_mood):
+    """Queue a mood analysis session for logging; returns False if dropped."""
+    return get_log_writer().submit(mood_history_record(
+        cnn_emotion, cnn_confidence, questionnaire_mood,
+        questionnaire_score, final_mood,
+    ))
+
+
+def flush_mood_log(timeout=None):
+    """Block until all queued mood-history records are written."""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
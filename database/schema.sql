@@ -38,3 +38,52 @@ CREATE TABLE IF NOT EXISTS mood_history (
 -- Indexes for fast mood-based queries
 CREATE INDEX IF NOT EXISTS idx_songs_mood  ON songs(mood_tag);
 CREATE INDEX IF NOT EXISTS idx_movies_mood ON movies(mood_tag);
+
+-- Import checkpoints: one row per source file (see database/import_catalog.py)
+CREATE TABLE IF NOT EXISTS import_progress (
+    source         TEXT    PRIMARY KEY,  -- absolute path of the export file
+    table_name     TEXT    NOT NULL,
+    file_size      INTEGER NOT NULL,
+    file_mtime     INTEGER NOT NULL,
+    byte_offset    INTEGER NOT NULL,     -- end of the last committed record
+    rows_imported  INTEGER NOT NULL,
+    rows_rejected  INTEGER NOT NULL,
+    completed      INTEGER NOT NULL DEFAULT 0,
+    updated_at     TEXT    NOT NULL
+);
+
+-- Id ranges committed by each import, so --restart can remove them
+-- (an import holds the write lock per transaction, so its ids are contiguous)
+CREATE TABLE IF NOT EXISTS import_id_ranges (
+    source      TEXT    NOT NULL,    -- import_progress.source
+    table_name  TEXT    NOT NULL,
+    first_id    INTEGER NOT NULL,
+    last_id     INTEGER NOT NULL,
+    PRIMARY KEY (source, first_id)
+) WITHOUT ROWID;
+
+-- Optional per-item mood vectors (items without a row use their mood_tag)
+CREATE TABLE IF NOT EXISTS item_mood_vectors (
+    table_name   TEXT    NOT NULL,   -- songs | movies
+    item_id      INTEGER NOT NULL,
+    mood_vector  BLOB    NOT NULL,   -- 6 float32 values in MOOD_CATEGORIES order
+    PRIMARY KEY (table_name, item_id)
+) WITHOUT ROWID;
+
+-- Server-side web sessions (see sessions/store.py)
+CREATE TABLE IF NOT EXISTS sessions (
+    sid      TEXT    PRIMARY KEY,   -- random id carried in the session cookie
+    data     BLOB    NOT NULL,      -- sessions.codec encoding
+    expires  REAL    NOT NULL       -- unix time
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires);
+
+-- Cached CNN outputs shared by inference processes (see emotion/result_cache.py)
+CREATE TABLE IF NOT EXISTS prediction_cache (
+    key            BLOB    PRIMARY KEY,   -- BLAKE2b-128 of the raw image bytes
+    probabilities  BLOB    NOT NULL,      -- 7 float32 FER probabilities; empty = no face
+    expires        REAL    NOT NULL       -- unix time
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_prediction_cache_expires ON prediction_cache(expires);
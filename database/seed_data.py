@@ -10,7 +10,7 @@ import sys
 # Allow running as module from project root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db_utils import get_connection, init_db
+from database.db_utils import get_connection, init_db, bump_catalog_version
 
 # ── Song Data ────────────────────────────────────────────────────────────
 SONGS = [
@@ -309,6 +309,7 @@ def seed_database():
         MOVIES,
     )
 
+    bump_catalog_version(conn)
     conn.commit()
     print(f"✅ Seeded {len(SONGS)} songs and {len(MOVIES)} movies.")
     conn.close()
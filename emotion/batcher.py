@@ -0,0 +1,167 @@
+"""
+Micro-Batching Inference Scheduler
+Collects face patches from concurrent requests for a few milliseconds and
+runs them through the CNN in a single batched forward pass.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# Default scheduling parameters (configurable)
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class MicroBatcher:
+    """
+    Batch individual inference requests into one forward pass.
+
+    Callers submit one (48, 48) face patch at a time and receive a Future.
+    A single background thread waits for the first pending patch, keeps
+    collecting for up to `max_wait_ms` (or until `max_batch_size` patches
+    are queued), stacks them into an (N, 48, 48, 1) tensor and resolves
+    every Future with its own row of the output.
+
+    Parameters
+    ----------
+    predict_fn : callable
+        Takes an (N, 48, 48, 1) float32 array, returns (N, num_classes).
+    max_batch_size : int
+        Upper bound on the number of patches in one forward pass.
+    max_wait_ms : float
+        How long to hold the first patch while waiting for more.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Statistics
+        self._batch_sizes = Counter()
+        self._queue_depths = Counter()
+        self._max_queue_depth = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="emotion-batcher", daemon=True
+        )
+        self._thread.start()
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    def submit(self, face_roi):
+        """
+        Queue a preprocessed face patch for classification.
+
+        Parameters
+        ----------
+        face_roi : np.ndarray
+            Shape (48, 48) or (48, 48, 1), values in [0, 1].
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to the (num_classes,) probability vector.
+        """
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed.")
+            self._pending.append((face_roi, future))
+            depth = len(self._pending)
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+            self._cond.notify()
+        return future
+
+    def predict(self, face_roi, timeout=None):
+        """Submit a patch and block until its probabilities are ready."""
+        return self.submit(face_roi).result(timeout=timeout)
+
+    def stats(self):
+        """
+        Return scheduler statistics.
+
+        Returns
+        -------
+        dict with keys:
+            queue_depth           : int  — Patches currently waiting
+            max_queue_depth       : int  — Highest depth seen so far
+            batches               : int  — Forward passes executed
+            requests              : int  — Patches classified
+            batch_size_histogram  : dict — {batch_size: count}
+            queue_depth_histogram : dict — {depth at dispatch: count}
+        """
+        with self._cond:
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            queue_depths = dict(sorted(self._queue_depths.items()))
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": sum(batch_sizes.values()),
+                "requests": sum(size * n for size, n in batch_sizes.items()),
+                "batch_size_histogram": batch_sizes,
+                "queue_depth_histogram": queue_depths,
+            }
+
+    def close(self):
+        """Stop the scheduler thread after draining pending requests."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    # ── Scheduler loop ───────────────────────────────────────────────
+
+    def _next_batch(self):
+        """Block until a batch is ready; return [] once closed and drained."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+
+            # Hold the first patch briefly so concurrent callers can join
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            self._queue_depths[len(self._pending)] += 1
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            self._batch_sizes[len(batch)] += 1
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            futures = [future for _, future in batch]
+            try:
+                inputs = np.stack(
+                    [np.asarray(face, dtype="float32").reshape(48, 48, 1)
+                     for face, _ in batch]
+                )
+                outputs = self.predict_fn(inputs)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, probabilities in zip(futures, outputs):
+                future.set_result(probabilities)
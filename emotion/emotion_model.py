@@ -22,22 +22,12 @@ from tensorflow.keras.layers import (
     Input,
 )
 
-# Emotion labels aligned with FER-2013 dataset
-EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
-
-#  Map 7 FER classes → 6 project mood categories
-EMOTION_TO_MOOD = {
-    "angry": "angry",
-    "disgust": "angry",      # merge disgust into angry
-    "fear": "stressed",      # fear maps to stressed
-    "happy": "happy",
-    "sad": "sad",
-    "surprise": "excited",   # surprise maps to excited
-    "neutral": "neutral",
-}
-
-# All mood categories used in the project
-MOOD_CATEGORIES = ["happy", "sad", "angry", "neutral", "excited", "stressed"]
+from emotion.labels import (
+    EMOTION_LABELS,
+    EMOTION_TO_MOOD,
+    MOOD_CATEGORIES,
+    emotion_to_mood_scores,
+)
 
 # Path to saved model weights
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -105,23 +95,3 @@ def get_model():
         model = build_model()
         return model
 
-
-def emotion_to_mood_scores(probabilities):
-    """
-    Convert 7-class FER probabilities into 6 mood-category scores.
-
-    Parameters
-    ----------
-    probabilities : np.ndarray
-        Shape (7,) — raw softmax outputs from the CNN.
-
-    Returns
-    -------
-    dict
-        {mood_category: score} for each of the 6 moods.
-    """
-    mood_scores = {mood: 0.0 for mood in MOOD_CATEGORIES}
-    for i, emotion in enumerate(EMOTION_LABELS):
-        target_mood = EMOTION_TO_MOOD[emotion]
-        mood_scores[target_mood] += float(probabilities[i])
-    return mood_scores
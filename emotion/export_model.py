@@ -0,0 +1,101 @@
+"""
+Export the trained Keras CNN into the NumPy serving artifact.
+
+Usage:
+    python3 -m emotion.export_model
+
+Reads emotion/emotion_model.h5 and writes emotion/emotion_model.npz, which
+is what emotion/predict.py loads at serving time.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion.emotion_model import get_model
+from emotion.runtime import (
+    NUM_CONV_BLOCKS,
+    SERVING_MODEL_PATH,
+    load_serving_model,
+)
+
+
+def _bn_scale_shift(bn_layer):
+    """Reduce a BatchNormalization layer to y = x * scale + shift."""
+    gamma, beta, mean, variance = bn_layer.get_weights()
+    scale = gamma / np.sqrt(variance + bn_layer.epsilon)
+    shift = beta - mean * scale
+    return scale, shift
+
+
+def extract_weights(model):
+    """
+    Convert a model from emotion_model.build_model into serving arrays.
+
+    Each conv block is Conv2D(relu) → BN → MaxPool; its BN becomes a
+    per-channel scale/shift. The classifier is Dense(relu) → BN → Dense;
+    that BN is folded exactly into the last Dense layer.
+    """
+    convs = [l for l in model.layers if type(l).__name__ == "Conv2D"]
+    bns = [l for l in model.layers if type(l).__name__ == "BatchNormalization"]
+    denses = [l for l in model.layers if type(l).__name__ == "Dense"]
+    if len(convs) != NUM_CONV_BLOCKS or len(bns) != NUM_CONV_BLOCKS + 1 or len(denses) != 2:
+        raise ValueError("Model does not match the emotion_model.build_model architecture.")
+
+    weights = {}
+    for i, (conv, bn) in enumerate(zip(convs, bns), start=1):
+        kernel, bias = conv.get_weights()
+        kh, kw, c_in, c_out = kernel.shape
+        # (kh, kw, c_in, c_out) → (kh * kw * c_in, c_out), the runtime's patch order
+        weights[f"conv{i}_kernel"] = kernel.reshape(kh * kw * c_in, c_out)
+        weights[f"conv{i}_bias"] = bias
+        weights[f"conv{i}_scale"], weights[f"conv{i}_shift"] = _bn_scale_shift(bn)
+
+    dense1_kernel, dense1_bias = denses[0].get_weights()
+    dense2_kernel, dense2_bias = denses[1].get_weights()
+    scale, shift = _bn_scale_shift(bns[-1])
+    weights["dense1_kernel"] = dense1_kernel
+    weights["dense1_bias"] = dense1_bias
+    weights["dense2_kernel"] = scale[:, None] * dense2_kernel
+    weights["dense2_bias"] = shift @ dense2_kernel + dense2_bias
+
+    return {key: value.astype(np.float32) for key, value in weights.items()}
+
+
+def export_model(model=None, path=SERVING_MODEL_PATH):
+    """Write the serving artifact and return the max deviation from Keras."""
+    if model is None:
+        model = get_model()
+
+    np.savez(path, **extract_weights(model))
+
+    # Verify against Keras on random faces
+    sample = np.random.default_rng(0).random((32, 48, 48, 1), dtype=np.float32)
+    expected = model.predict(sample, verbose=0)
+    actual = load_serving_model(path).predict(sample)
+    return float(np.abs(expected - actual).max())
+
+
+def main():
+    max_diff = export_model()
+    print(f"✅ Serving model exported to {SERVING_MODEL_PATH}")
+    print(f"   Max |Keras - NumPy| probability difference: {max_diff:.2e}")
+
+    serving = load_serving_model()
+    face = np.random.default_rng(1).random((1, 48, 48, 1), dtype=np.float32)
+    serving.predict(face)
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        serving.predict(face)
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"   Per-face latency: {elapsed * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
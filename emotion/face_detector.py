@@ -6,6 +6,7 @@ Uses OpenCV's Haar Cascade Classifier to detect and preprocess faces.
 import cv2
 import numpy as np
 import os
+import threading
 
 
 # Path to Haar Cascade XML (bundled with OpenCV)
@@ -14,6 +15,31 @@ CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
 # Target size for the emotion CNN input
 TARGET_SIZE = (48, 48)
 
+# detectMultiScale parameters
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 5
+MIN_FACE_SIZE = (30, 30)   # in the detection copy (see MAX_DETECT_EDGE)
+
+# Most faces detect_faces() returns per image (the largest ones)
+MAX_FACES = 32
+
+# Detection runs on a copy whose longest edge is at most this many pixels,
+# so MIN_FACE_SIZE is relative to that size: on a 4000 px photo the
+# smallest face found is about 190 px. The face is cropped from the decoded
+# image (full resolution, or the reduced frame with reduced_decode=True).
+# None disables it.
+MAX_DETECT_EDGE = 640
+
+# JPEG decode-time reduction factors, largest first
+_REDUCED_GRAYSCALE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+# Per-thread detector cache (cv2.CascadeClassifier must not be shared)
+_local = threading.local()
+
 
 def load_cascade():
     """Load the Haar Cascade face detector."""
@@ -23,6 +49,233 @@ def load_cascade():
     return cascade
 
 
+class FaceDetector:
+    """
+    Haar Cascade face detector holding a loaded classifier.
+
+    Instances are not thread-safe; use get_detector() to obtain the one
+    belonging to the calling thread.
+    """
+
+    def __init__(self):
+        self.cascade = load_cascade()
+
+    def detect(self, image, max_edge=MAX_DETECT_EDGE):
+        """
+        Detect the largest face in a decoded image.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            BGR (H, W, 3) or grayscale (H, W) image.
+        max_edge : int or None
+            Longest edge of the copy that detection runs on.
+
+        Returns
+        -------
+        Same as detect_face().
+        """
+        gray = _to_gray(image)
+        boxes = self.find(gray, max_edge)
+        if not boxes:
+            return None, image, None
+
+        # Crop the largest face at full resolution and preprocess
+        x, y, w, h = boxes[0]
+        face_roi = gray[y : y + h, x : x + w]
+        face_roi = preprocess_face(face_roi)
+
+        return face_roi, image, (x, y, w, h)
+
+    def detect_all(self, image, max_edge=MAX_DETECT_EDGE, max_faces=MAX_FACES):
+        """
+        Detect every face in a decoded image.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            BGR (H, W, 3) or grayscale (H, W) image.
+        max_edge : int or None
+            Longest edge of the copy that detection runs on.
+        max_faces : int or None
+            Keep at most this many faces (the largest ones).
+
+        Returns
+        -------
+        Same as detect_faces().
+        """
+        gray = _to_gray(image)
+        boxes = self.find(gray, max_edge)[:max_faces]
+        return preprocess_faces(gray, boxes), image, boxes
+
+    def find(self, gray, max_edge=MAX_DETECT_EDGE):
+        """
+        Run the cascade on a grayscale image.
+
+        Returns
+        -------
+        list of tuple
+            (x, y, w, h) boxes in `gray`'s coordinates, largest first.
+        """
+        # Detect on a downscaled copy so the cost is bounded by max_edge
+        height, width = gray.shape
+        scale = 1.0
+        search = gray
+        if max_edge and max(height, width) > max_edge:
+            scale = max_edge / max(height, width)
+            search = cv2.resize(
+                gray,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        faces = self.cascade.detectMultiScale(
+            search,
+            scaleFactor=SCALE_FACTOR,
+            minNeighbors=MIN_NEIGHBORS,
+            minSize=MIN_FACE_SIZE,
+            flags=cv2.CASCADE_SCALE_IMAGE,
+        )
+
+        # Largest face (by area) first
+        faces = sorted(faces, key=lambda rect: rect[2] * rect[3], reverse=True)
+        return [_scale_box(rect, 1.0 / scale, width, height) for rect in faces]
+
+
+def _to_gray(image):
+    """Return a grayscale view of a BGR or grayscale image."""
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _scale_box(box, factor, width, height):
+    """Scale an (x, y, w, h) box by `factor` and clip it to the image."""
+    x, y, w, h = (int(round(v * factor)) for v in box)
+    x = min(max(x, 0), width - 1)
+    y = min(max(y, 0), height - 1)
+    return x, y, min(w, width - x), min(h, height - y)
+
+
+def _jpeg_size(image_bytes):
+    """
+    Read (width, height) from a JPEG's SOF header without decoding it.
+
+    Returns None if the data is not a JPEG or the header is not found.
+    """
+    buf = memoryview(image_bytes)
+    n = len(buf)
+    if n < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 < n:
+        if buf[i] != 0xFF:
+            return None
+        marker = buf[i + 1]
+        if marker == 0xFF:                              # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:    # markers without a payload
+            i += 2
+            continue
+        # SOF0..SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (buf[i + 5] << 8) | buf[i + 6]
+            width = (buf[i + 7] << 8) | buf[i + 8]
+            return width, height
+        i += 2 + ((buf[i + 2] << 8) | buf[i + 3])
+    return None
+
+
+def decode_image(image_bytes, flag=cv2.IMREAD_COLOR):
+    """
+    Decode raw image bytes with cv2.imdecode.
+
+    Raises
+    ------
+    ValueError
+        If the bytes are empty or not a decodable image (OpenCV raises
+        cv2.error for an empty buffer and returns None for garbage).
+    """
+    if not len(image_bytes):
+        raise ValueError("Empty image data.")
+    try:
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
+    except cv2.error as e:
+        raise ValueError(f"Could not decode image from bytes: {e}") from e
+    if image is None:
+        raise ValueError("Could not decode image from bytes.")
+    return image
+
+
+def decode_reduced(image_bytes, max_edge=MAX_DETECT_EDGE):
+    """
+    Decode a JPEG straight to a reduced-size grayscale image.
+
+    libjpeg scales by 1/2, 1/4 or 1/8 during the IDCT, which is much
+    cheaper than decoding at full size and resizing. The largest factor
+    that still leaves the longest edge at or above `max_edge` is used, so
+    detection sees the same resolution it would after downscaling.
+
+    Returns
+    -------
+    gray : np.ndarray or None
+        Reduced grayscale image, or None when reduction does not apply.
+    factor : int
+        Reduction factor applied (1 when gray is None).
+    """
+    size = _jpeg_size(image_bytes) if max_edge else None
+    if size is None:
+        return None, 1
+
+    longest = max(size)
+    for factor, flag in _REDUCED_GRAYSCALE_FLAGS:
+        if longest // factor >= max_edge:
+            return decode_image(image_bytes, flag), factor
+    return None, 1
+
+
+def get_detector():
+    """Return the calling thread's FaceDetector, loading it on first use."""
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = _local.detector = FaceDetector()
+    return detector
+
+
+def detect_face_from_array(image):
+    """
+    Detect the largest face in an already decoded image.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        BGR (H, W, 3) or grayscale (H, W) image.
+
+    Returns
+    -------
+    Same as detect_face().
+    """
+    return get_detector().detect(image)
+
+
+def detect_faces_from_array(image):
+    """
+    Detect every face in an already decoded image.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        BGR (H, W, 3) or grayscale (H, W) image.
+
+    Returns
+    -------
+    Same as detect_faces().
+    """
+    return get_detector().detect_all(image)
+
+
 def detect_face(image_path):
     """
     Detect the largest face in an image and return the preprocessed patch.
@@ -41,71 +294,93 @@ def detect_face(image_path):
     face_coords : tuple or None
         (x, y, w, h) of the detected face bounding box.
     """
-    # Read image
     image = cv2.imread(image_path)
     if image is None:
         raise FileNotFoundError(f"Could not read image: {image_path}")
+    return detect_face_from_array(image)
 
-    # Convert to grayscale for face detection
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    # Detect faces
-    cascade = load_cascade()
-    faces = cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=5,
-        minSize=(30, 30),
-        flags=cv2.CASCADE_SCALE_IMAGE,
-    )
 
-    if len(faces) == 0:
-        return None, image, None
+def detect_face_from_bytes(image_bytes, reduced_decode=False):
+    """
+    Detect face from raw image bytes (e.g., from a webcam capture).
 
-    # Select the largest face (by area)
-    largest = max(faces, key=lambda rect: rect[2] * rect[3])
-    x, y, w, h = largest
+    Parameters
+    ----------
+    image_bytes : bytes
+        Raw image data.
+    reduced_decode : bool
+        Decode large JPEGs at reduced resolution (see decode_reduced).
+        The face is then cropped from the reduced frame, whose longest
+        edge is still at least MAX_DETECT_EDGE, so the crop has at least
+        MIN_FACE_SIZE pixels before it is resized to 48x48. The
+        full-size image is never decoded, so `original` is None;
+        face_coords refer to the full-size image, as with detect_face().
 
-    # Crop and preprocess
-    face_roi = gray[y : y + h, x : x + w]
-    face_roi = preprocess_face(face_roi)
+    Returns
+    -------
+    Same as detect_face().
+    """
+    if reduced_decode:
+        gray, factor = decode_reduced(image_bytes)
+        if gray is not None:
+            face_roi, _, face_coords = detect_face_from_array(gray)
+            if face_coords is not None:
+                face_coords = _scale_box(face_coords, factor, *_jpeg_size(image_bytes))
+            return face_roi, None, face_coords
 
-    return face_roi, image, (x, y, w, h)
+    return detect_face_from_array(decode_image(image_bytes))
 
 
-def detect_face_from_bytes(image_bytes):
+def detect_faces(image_path):
     """
-    Detect face from raw image bytes (e.g., from a webcam capture).
+    Detect every face in an image and return the preprocessed patches.
 
     Parameters
     ----------
-    image_bytes : bytes
-        Raw image data.
+    image_path : str
+        Path to the input image file.
 
     Returns
     -------
-    Same as detect_face().
+    faces : np.ndarray
+        Preprocessed face regions, shape (K, 48, 48, 1), largest face
+        first; K is 0 if no face was found.
+    original : np.ndarray
+        The original BGR image.
+    face_coords : list of tuple
+        (x, y, w, h) of each face, in the same order as `faces`.
     """
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    image = cv2.imread(image_path)
     if image is None:
-        raise ValueError("Could not decode image from bytes.")
+        raise FileNotFoundError(f"Could not read image: {image_path}")
+    return detect_faces_from_array(image)
 
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    cascade = load_cascade()
-    faces = cascade.detectMultiScale(
-        gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-    )
 
-    if len(faces) == 0:
-        return None, image, None
+def detect_faces_from_bytes(image_bytes, reduced_decode=False):
+    """
+    Detect every face in raw image bytes (e.g., a group photo).
 
-    largest = max(faces, key=lambda rect: rect[2] * rect[3])
-    x, y, w, h = largest
-    face_roi = gray[y : y + h, x : x + w]
-    face_roi = preprocess_face(face_roi)
+    Parameters
+    ----------
+    image_bytes : bytes
+        Raw image data.
+    reduced_decode : bool
+        Decode large JPEGs at reduced resolution (see
+        detect_face_from_bytes(); `original` is then None).
+
+    Returns
+    -------
+    Same as detect_faces().
+    """
+    if reduced_decode:
+        gray, factor = decode_reduced(image_bytes)
+        if gray is not None:
+            faces, _, face_coords = detect_faces_from_array(gray)
+            size = _jpeg_size(image_bytes)
+            face_coords = [_scale_box(box, factor, *size) for box in face_coords]
+            return faces, None, face_coords
 
-    return face_roi, image, (x, y, w, h)
+    return detect_faces_from_array(decode_image(image_bytes))
 
 
 def preprocess_face(face_gray):
@@ -125,3 +400,30 @@ def preprocess_face(face_gray):
     face_resized = cv2.resize(face_gray, TARGET_SIZE, interpolation=cv2.INTER_AREA)
     face_normalized = face_resized.astype("float32") / 255.0
     return face_normalized
+
+
+def preprocess_faces(gray, boxes):
+    """
+    Crop, resize to 48x48 and normalize many faces at once.
+
+    Each crop is resized by OpenCV straight into one preallocated uint8
+    stack, which is then normalized in a single vectorized pass; the
+    values equal preprocess_face() on each crop.
+
+    Parameters
+    ----------
+    gray : np.ndarray
+        Grayscale image, shape (H, W).
+    boxes : sequence of tuple
+        (x, y, w, h) crops lying inside `gray`.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (K, 48, 48, 1), dtype float32, values in [0, 1].
+    """
+    out_w, out_h = TARGET_SIZE
+    faces = np.empty((len(boxes), out_h, out_w), dtype=np.uint8)
+    for face, (x, y, w, h) in zip(faces, boxes):
+        cv2.resize(gray[y : y + h, x : x + w], TARGET_SIZE, dst=face, interpolation=cv2.INTER_AREA)
+    return np.divide(faces, np.float32(255.0), dtype=np.float32)[..., None]
@@ -0,0 +1,62 @@
+"""
+Emotion Label Definitions
+FER-2013 class labels and their mapping onto the project's mood categories.
+Kept free of TensorFlow so the serving path can import it cheaply.
+"""
+
+import numpy as np
+
+from fusion.mood_vector import MOOD_CATEGORIES, MOOD_DTYPE, MOOD_INDEX, to_dict
+
+# Emotion labels aligned with FER-2013 dataset
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+#  Map 7 FER classes → 6 project mood categories
+EMOTION_TO_MOOD = {
+    "angry": "angry",
+    "disgust": "angry",      # merge disgust into angry
+    "fear": "stressed",      # fear maps to stressed
+    "happy": "happy",
+    "sad": "sad",
+    "surprise": "excited",   # surprise maps to excited
+    "neutral": "neutral",
+}
+
+# 7x6 projection matrix: mood_vector = probabilities @ EMOTION_TO_MOOD_MATRIX
+EMOTION_TO_MOOD_MATRIX = np.eye(len(MOOD_CATEGORIES), dtype=MOOD_DTYPE)[
+    [MOOD_INDEX[EMOTION_TO_MOOD[emotion]] for emotion in EMOTION_LABELS]
+]
+
+
+def emotion_to_mood_vector(probabilities):
+    """
+    Project FER probabilities onto mood vectors.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        Shape (7,) or (N, 7) — softmax outputs from the CNN.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (6,) or (N, 6) mood vectors (see fusion.mood_vector).
+    """
+    return np.asarray(probabilities, dtype=MOOD_DTYPE) @ EMOTION_TO_MOOD_MATRIX
+
+
+def emotion_to_mood_scores(probabilities):
+    """
+    Convert 7-class FER probabilities into 6 mood-category scores.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        Shape (7,) — raw softmax outputs from the CNN.
+
+    Returns
+    -------
+    dict
+        {mood_category: score} for each of the 6 moods.
+    """
+    return to_dict(emotion_to_mood_vector(probabilities))
@@ -3,33 +3,179 @@ Emotion Prediction API
 Public interface for the facial emotion recognition pipeline.
 """
 
+import hashlib
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from emotion.face_detector import detect_face, detect_face_from_bytes
-from emotion.emotion_model import (
-    get_model,
+from emotion.face_detector import (
+    TARGET_SIZE,
+    decode_image,
+    detect_face_from_array,
+    detect_face_from_bytes,
+    detect_faces,
+    detect_faces_from_bytes,
+)
+from emotion.labels import (
     EMOTION_LABELS,
     EMOTION_TO_MOOD,
     emotion_to_mood_scores,
 )
+from emotion.runtime import (
+    MODEL_DIR,
+    NumpyEmotionModel,
+    SERVING_MODEL_PATH,
+    load_serving_model,
+)
+from emotion.result_cache import get_result_cache, image_key
+from emotion.batcher import (
+    MicroBatcher,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_WAIT_MS,
+)
 
+# Batch prediction tuning (configurable)
+DETECT_THREADS = os.cpu_count() or 1   # images decoded/detected in parallel
+MAX_CLASSIFY_BATCH = 64                # face patches per forward pass
+
+# Keras weights used when there is no serving artifact (see emotion_model)
+KERAS_MODEL_PATH = os.path.join(MODEL_DIR, "emotion_model.h5")
 
 # Module-level model cache
 _model = None
+_model_id = None
+
+# Decode + detection threads for predict_emotions_from_bytes()
+_detect_executor = None
+
+# Micro-batching scheduler (created on first classification)
+_batcher = None
+_batcher_lock = threading.Lock()
+_batch_config = {
+    "max_batch_size": DEFAULT_MAX_BATCH_SIZE,
+    "max_wait_ms": DEFAULT_MAX_WAIT_MS,
+}
 
 
 def _get_cached_model():
-    """Load model once and cache it."""
+    """
+    Load model once and cache it.
+
+    Uses the exported NumPy serving artifact when present; otherwise falls
+    back to the Keras model, which imports TensorFlow.
+    """
     global _model
     if _model is None:
-        _model = get_model()
+        if os.path.exists(SERVING_MODEL_PATH):
+            _model = load_serving_model(SERVING_MODEL_PATH)
+        else:
+            from emotion.emotion_model import get_model
+            _model = get_model()
     return _model
 
 
+def model_identity():
+    """
+    Digest identifying the model this process serves; part of every result
+    cache key, so entries cached for an older model never match.
+
+    Taken once per process (the model is never reloaded) from the path,
+    size and mtime of the file _get_cached_model() loads. Without model
+    files every process builds an untrained network and they all share
+    one constant identity, so workers keep sharing (meaningless but
+    consistent) cache entries until a trained model is installed.
+    """
+    global _model_id
+    if _model_id is None:
+        for path in (SERVING_MODEL_PATH, KERAS_MODEL_PATH):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            identity = f"{path}:{st.st_size}:{st.st_mtime_ns}".encode()
+            break
+        else:
+            identity = b"untrained"
+        _model_id = hashlib.blake2b(identity, digest_size=16).digest()
+    return _model_id
+
+
+def _predict_batch(face_batch):
+    """Run one forward pass over an (N, 48, 48, 1) batch."""
+    model = _get_cached_model()
+    if isinstance(model, NumpyEmotionModel):
+        return model.predict(face_batch)
+    return model.predict(face_batch, verbose=0)
+
+
+def _get_batcher():
+    """Start the micro-batching scheduler once and cache it."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(_predict_batch, **_batch_config)
+    return _batcher
+
+
+def _get_detect_executor():
+    """Start the detection thread pool once and cache it."""
+    global _detect_executor
+    if _detect_executor is None:
+        with _batcher_lock:
+            if _detect_executor is None:
+                _detect_executor = ThreadPoolExecutor(
+                    DETECT_THREADS, thread_name_prefix="emotion-detect"
+                )
+    return _detect_executor
+
+
+def configure_batching(max_batch_size=None, max_wait_ms=None):
+    """
+    Change the micro-batching parameters.
+
+    Parameters
+    ----------
+    max_batch_size : int, optional
+        Maximum number of face patches per forward pass.
+    max_wait_ms : float, optional
+        How long the scheduler holds a patch waiting for more to arrive.
+        Use 0 to dispatch immediately.
+    """
+    global _batcher
+    with _batcher_lock:
+        if max_batch_size is not None:
+            _batch_config["max_batch_size"] = max_batch_size
+        if max_wait_ms is not None:
+            _batch_config["max_wait_ms"] = max_wait_ms
+        old, _batcher = _batcher, None
+    if old is not None:
+        old.close()
+
+
+def get_batching_stats():
+    """Return queue-depth and batch-size statistics of the scheduler."""
+    stats = _get_batcher().stats()
+    stats.update(_batch_config)
+    return stats
+
+
+def warm_up():
+    """
+    Load everything the first prediction would: OpenCV's cascade for the
+    calling thread, the model and the batching scheduler, and run one
+    blank patch through the model.
+    """
+    from emotion.face_detector import get_detector
+    get_detector()
+    _get_batcher().predict(np.zeros((48, 48), dtype="float32"))
+
+
 def predict_emotion(image_path):
     """
     Predict emotion from an image file.
@@ -48,18 +194,22 @@ def predict_emotion(image_path):
         mood_scores: dict  — Scores for all 6 mood categories
         face_found : bool  — Whether a face was detected
     """
-    face_roi, original, face_coords = detect_face(image_path)
+    try:
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+    except OSError as e:
+        raise FileNotFoundError(f"Could not read image: {image_path}") from e
 
-    if face_roi is None:
-        return {
-            "emotion": None,
-            "mood": None,
-            "confidence": 0.0,
-            "mood_scores": {},
-            "face_found": False,
-        }
+    def probabilities():
+        # Decode the bytes already read instead of reading the file again
+        try:
+            image = decode_image(image_bytes)
+        except ValueError as e:
+            raise FileNotFoundError(f"Could not read image: {image_path}") from e
+        face_roi, original, face_coords = detect_face_from_array(image)
+        return None if face_roi is None else classify_face(face_roi)
 
-    return _classify(face_roi)
+    return _cached_result(image_bytes, b"file", probabilities)
 
 
 def predict_emotion_from_bytes(image_bytes):
@@ -75,23 +225,207 @@ def predict_emotion_from_bytes(image_bytes):
     -------
     dict — Same structure as predict_emotion().
     """
-    face_roi, original, face_coords = detect_face_from_bytes(image_bytes)
+    def probabilities():
+        face_roi, original, face_coords = detect_face_from_bytes(
+            image_bytes, reduced_decode=True
+        )
+        return None if face_roi is None else classify_face(face_roi)
 
-    if face_roi is None:
-        return {
-            "emotion": None,
-            "mood": None,
-            "confidence": 0.0,
-            "mood_scores": {},
-            "face_found": False,
-        }
+    return _cached_result(image_bytes, b"bytes", probabilities)
 
-    return _classify(face_roi)
 
+def get_cache_stats():
+    """Return the result cache's size and hit/miss counters (None when off)."""
+    cache = get_result_cache()
+    return None if cache is None else cache.stats()
+
+
+def _cached_result(image_bytes, variant, compute):
+    """
+    Prediction for an image, answered from the result cache when the same
+    bytes were scored before.
 
-def _classify(face_roi):
+    `compute()` returns the image's probabilities, or None without a face;
+    `variant` keeps pipelines that decode differently apart in the cache,
+    and model_identity() keeps models apart.
     """
-    Run the CNN on a preprocessed 48x48 face patch.
+    cache = get_result_cache()
+    if cache is None:
+        probabilities = compute()
+    else:
+        key = image_key(image_bytes, variant, model_identity())
+        found, probabilities = cache.get(key)
+        if not found:
+            probabilities = compute()
+            cache.put(key, probabilities)
+
+    if probabilities is None:
+        return _no_face_result()
+    return result_from_probabilities(probabilities)
+
+
+def predict_emotions_from_bytes(images):
+    """
+    Predict emotions for many raw images (a burst of frames).
+
+    Images already in the result cache (under the same key as
+    predict_emotion_from_bytes()) are answered from it. The rest are
+    decoded and searched for faces in parallel on the detection thread
+    pool (OpenCV releases the GIL), then every detected face is classified
+    in one batched forward pass per MAX_CLASSIFY_BATCH faces, and the
+    results are cached.
+
+    Parameters
+    ----------
+    images : sequence of bytes-like
+        Raw image data (JPEG/PNG), one entry per image.
+
+    Returns
+    -------
+    list of dict
+        One predict_emotion_from_bytes() result per image, in order. An
+        image that cannot be decoded gets face_found False and an "error"
+        message instead of failing the batch.
+    """
+    cache = get_result_cache()
+    keys = []
+    known = {}    # image index → probabilities, or None without a face
+    if cache is not None:
+        model = model_identity()
+        for i, image_bytes in enumerate(images):
+            keys.append(image_key(image_bytes, b"bytes", model))
+            found, probabilities = cache.get(keys[i])
+            if found:
+                known[i] = probabilities
+
+    misses = [i for i in range(len(images)) if i not in known]
+    detections = list(_get_detect_executor().map(
+        _detect_for_batch, [images[i] for i in misses]
+    ))
+    faces = [face_roi for face_roi, _ in detections if face_roi is not None]
+    probabilities = _classify_many(
+        np.stack(faces)[..., None] if faces else np.zeros((0, 48, 48, 1), "float32")
+    )
+
+    errors = {}
+    faces_seen = 0
+    for i, (face_roi, error) in zip(misses, detections):
+        if error is not None:
+            errors[i] = error  # not cached, like a failing single prediction
+            continue
+        if face_roi is None:
+            known[i] = None
+        else:
+            known[i] = probabilities[faces_seen]
+            faces_seen += 1
+        if cache is not None:
+            cache.put(keys[i], known[i])
+
+    results = []
+    for i in range(len(images)):
+        if i in errors:
+            result = _no_face_result()
+            result["error"] = errors[i]
+        elif known[i] is None:
+            result = _no_face_result()
+        else:
+            result = result_from_probabilities(known[i])
+        results.append(result)
+    return results
+
+
+def predict_faces(image_path):
+    """
+    Predict the emotion of every face in an image file (e.g., a group photo).
+
+    Parameters
+    ----------
+    image_path : str
+        Path to an image file.
+
+    Returns
+    -------
+    dict — Same structure as predict_faces_from_bytes().
+    """
+    faces, original, face_coords = detect_faces(image_path)
+    return _classify_faces(faces, face_coords)
+
+
+def predict_faces_from_bytes(image_bytes):
+    """
+    Predict the emotion of every face in raw image bytes.
+
+    All faces are classified in one batched forward pass (per
+    MAX_CLASSIFY_BATCH faces).
+
+    Parameters
+    ----------
+    image_bytes : bytes
+        Raw image data (JPEG/PNG).
+
+    Returns
+    -------
+    dict with keys:
+        faces      : list of dict — One predict_emotion() result per face,
+                     largest face first, each with its "box" (x, y, w, h)
+        face_count : int          — Number of faces found
+        group      : dict         — predict_emotion() result for the mean
+                                    of the faces' probabilities (the mean
+                                    mood), face_found False when no face
+    """
+    faces, original, face_coords = detect_faces_from_bytes(
+        image_bytes, reduced_decode=True
+    )
+    return _classify_faces(faces, face_coords)
+
+
+def _classify_faces(faces, face_coords):
+    """Classify a (K, 48, 48, 1) stack and build the predict_faces() result."""
+    probabilities = _classify_many(faces)
+    results = []
+    for box, face_probabilities in zip(face_coords, probabilities):
+        result = result_from_probabilities(face_probabilities)
+        result["box"] = tuple(int(v) for v in box)
+        results.append(result)
+
+    # Mood projection is linear, so this is also the mean mood vector
+    group = result_from_probabilities(probabilities.mean(axis=0)) if results else _no_face_result()
+    return {"faces": results, "face_count": len(results), "group": group}
+
+
+def _classify_many(faces):
+    """FER probabilities, shape (K, 7), of a (K, 48, 48, 1) stack."""
+    chunks = [
+        _predict_batch(faces[start:start + MAX_CLASSIFY_BATCH])
+        for start in range(0, len(faces), MAX_CLASSIFY_BATCH)
+    ]
+    if not chunks:
+        return np.zeros((0, len(EMOTION_LABELS)), dtype="float32")
+    return np.concatenate(chunks)
+
+
+def _detect_for_batch(image_bytes):
+    """Return (face_roi or None, error message or None) for one image."""
+    try:
+        face_roi, _, _ = detect_face_from_bytes(image_bytes, reduced_decode=True)
+    except ValueError as e:
+        return None, str(e)
+    return face_roi, None
+
+
+def _no_face_result():
+    return {
+        "emotion": None,
+        "mood": None,
+        "confidence": 0.0,
+        "mood_scores": {},
+        "face_found": False,
+    }
+
+
+def classify_face(face_roi):
+    """
+    FER class probabilities for one preprocessed face patch.
 
     Parameters
     ----------
@@ -100,16 +434,30 @@ def _classify(face_roi):
 
     Returns
     -------
-    dict
+    np.ndarray
+        Shape (7,), in EMOTION_LABELS order (batched together with
+        concurrent requests).
     """
-    model = _get_cached_model()
+    return _get_batcher().predict(face_roi)
 
-    # Reshape for model input: (1, 48, 48, 1)
-    face_input = face_roi.reshape(1, 48, 48, 1)
 
-    # Predict
-    probabilities = model.predict(face_input, verbose=0)[0]
+def classify_face_from_bytes(face_bytes):
+    """
+    classify_face() of a patch sent as raw float32 bytes (the inference
+    pool's transport; see emotion.worker_pool.InferencePool.classify_face).
+
+    Returns
+    -------
+    list of float
+        The 7 FER class probabilities.
+    """
+    width, height = TARGET_SIZE
+    face_roi = np.frombuffer(face_bytes, dtype=np.float32).reshape(height, width).copy()
+    return [float(p) for p in classify_face(face_roi)]
+
 
+def result_from_probabilities(probabilities):
+    """Build the prediction dict (see predict_emotion()) from (7,) probabilities."""
     # Top emotion
     top_idx = int(np.argmax(probabilities))
     emotion = EMOTION_LABELS[top_idx]
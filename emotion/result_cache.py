@@ -0,0 +1,244 @@
+"""
+Prediction Result Cache
+Remembers the CNN output for images that were already scored, so a
+re-submitted photo (retry, back button, duplicate upload) skips decoding,
+face detection and the forward pass.
+
+Entries are keyed by a 128-bit BLAKE2b hash of the raw image bytes,
+keyed with the identity of the model that scored them (so a retrained or
+re-exported model never sees the old model's results), and hold only the
+(7,) FER probabilities, or "no face", so the memory
+footprint is bounded by the entry count (about 250 bytes per entry with
+the dict overhead). The prediction dict is rebuilt from the probabilities
+on every hit.
+
+Backends (PREDICTION_CACHE environment variable):
+
+    memory   in-process LRU with a TTL (default)
+    sqlite   the same LRU in front of the `prediction_cache` table of the
+             app database, shared by every worker process on the host
+    off      no caching
+
+get_result_cache() returns the process-wide cache, or None when off.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+# Result cache tuning (configurable)
+PREDICTION_CACHE = os.environ.get("PREDICTION_CACHE", "memory")
+CACHE_MAX_ENTRIES = 4096          # LRU capacity of the in-process cache
+CACHE_TTL = 10 * 60               # seconds an entry lives after it is stored
+SQLITE_PURGE_INTERVAL = 60.0      # seconds between deletes of expired rows
+
+KEY_BYTES = 16
+
+# Stored value meaning "no face in this image"
+_NO_FACE = b""
+
+
+def image_key(image_bytes, variant=b"", model=b""):
+    """
+    Cache key of raw image bytes.
+
+    `variant` (at most 16 bytes) separates pipelines that can give
+    different results for the same bytes, e.g. reduced vs full decoding.
+    `model` (at most 64 bytes) identifies the model producing the result.
+    """
+    return hashlib.blake2b(
+        image_bytes, digest_size=KEY_BYTES, person=variant, key=model
+    ).digest()
+
+
+def _pack(probabilities):
+    if probabilities is None:
+        return _NO_FACE
+    return np.asarray(probabilities, dtype=np.float32).tobytes()
+
+
+def _unpack(blob):
+    if blob == _NO_FACE:
+        return None
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class SQLiteResultStore:
+    """
+    Cached results in the `prediction_cache` table of the app database.
+
+    Uses the pooled connections, so every worker process on the host sees
+    the same entries. Expired rows are ignored on read and deleted at most
+    once per SQLITE_PURGE_INTERVAL, piggybacking on a write.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, purge_interval=SQLITE_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+
+    def get(self, key):
+        """Return the stored bytes for `key`, or None if missing or expired."""
+        with db_utils.pooled_connection() as conn:
+            row = conn.execute(
+                "SELECT probabilities FROM prediction_cache WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def set(self, key, blob):
+        """Store `blob` under `key`."""
+        now = time.time()
+        with db_utils.pooled_connection() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO prediction_cache (key, probabilities, expires) "
+                "VALUES (?, ?, ?)",
+                (key, blob, now + self.ttl),
+            )
+            if now >= self._next_purge:
+                self._next_purge = now + self.purge_interval
+                conn.execute("DELETE FROM prediction_cache WHERE expires <= ?", (now,))
+
+    def clear(self):
+        """Remove every entry."""
+        with db_utils.pooled_connection() as conn, conn:
+            conn.execute("DELETE FROM prediction_cache")
+
+
+class ResultCache:
+    """
+    LRU of FER probabilities with a per-entry TTL, optionally backed by a
+    store shared between processes.
+
+    Parameters
+    ----------
+    max_entries : int
+        Entries kept in process; the least recently used is evicted.
+    ttl : float
+        Seconds an entry stays valid after it is stored.
+    shared : SQLiteResultStore, optional
+        Consulted on an in-process miss and written on every put().
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, shared=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.pid = os.getpid()
+        self._entries = OrderedDict()   # key → (expires, probabilities or None)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Look up a key.
+
+        Returns
+        -------
+        found : bool
+            Whether the key is cached.
+        probabilities : np.ndarray or None
+            Shape (7,), or None for an image without a face.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[1]
+                del self._entries[key]
+
+        blob = self.shared.get(key) if self.shared is not None else None
+        with self._lock:
+            if blob is None:
+                self.misses += 1
+                return False, None
+            self.shared_hits += 1
+        probabilities = _unpack(blob)
+        self._remember(key, probabilities)
+        return True, probabilities
+
+    def put(self, key, probabilities):
+        """Cache the probabilities (None: no face) computed for `key`."""
+        if probabilities is not None:
+            probabilities = np.array(probabilities, dtype=np.float32)
+            probabilities.setflags(write=False)
+        self._remember(key, probabilities)
+        if self.shared is not None:
+            self.shared.set(key, _pack(probabilities))
+
+    def clear(self):
+        """Drop every entry (including the shared ones)."""
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        """Entry count and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key, probabilities):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, probabilities)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CACHE_BACKENDS = ("memory", "sqlite", "off")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Return the process-wide cache for PREDICTION_CACHE (recreated after
+    fork), or None when it is "off".
+    """
+    global _cache
+    if PREDICTION_CACHE not in CACHE_BACKENDS:
+        raise ValueError(
+            f"Unknown prediction cache {PREDICTION_CACHE!r}; "
+            f"expected one of {list(CACHE_BACKENDS)}."
+        )
+    if PREDICTION_CACHE == "off":
+        return None
+    cache = _cache
+    if cache is None or cache.pid != os.getpid():
+        with _cache_lock:
+            cache = _cache
+            if cache is None or cache.pid != os.getpid():
+                shared = SQLiteResultStore() if PREDICTION_CACHE == "sqlite" else None
+                cache = _cache = ResultCache(shared=shared)
+    return cache
@@ -0,0 +1,119 @@
+"""
+Lightweight Serving Runtime
+Pure-NumPy forward pass of the emotion CNN, loaded from the artifact written
+by `python -m emotion.export_model`. Importing this module does not import
+TensorFlow.
+"""
+
+import os
+
+import numpy as np
+
+
+# Path to the exported serving artifact
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVING_MODEL_PATH = os.path.join(MODEL_DIR, "emotion_model.npz")
+
+# Number of conv blocks in emotion_model.build_model
+NUM_CONV_BLOCKS = 3
+
+
+def _conv3x3_relu(x, kernel, bias):
+    """
+    3x3 'same' convolution followed by ReLU, computed as one matmul.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Shape (N, H, W, C_in).
+    kernel : np.ndarray
+        Shape (9 * C_in, C_out), rows ordered (kh, kw, c_in).
+    bias : np.ndarray
+        Shape (C_out,).
+    """
+    n, h, w, c = x.shape
+    padded = np.zeros((n, h + 2, w + 2, c), dtype=np.float32)
+    padded[:, 1:-1, 1:-1, :] = x
+    # Nine shifted views side by side → (N*H*W, 9*C) patch matrix
+    patches = np.concatenate(
+        [padded[:, dy : dy + h, dx : dx + w, :] for dy in range(3) for dx in range(3)],
+        axis=3,
+    ).reshape(n * h * w, 9 * c)
+    out = patches @ kernel
+    out += bias
+    np.maximum(out, 0.0, out=out)
+    return out.reshape(n, h, w, -1)
+
+
+def _max_pool2x2(x):
+    """2x2 max pooling with stride 2 (input sides must be even)."""
+    rows = np.maximum(x[:, 0::2], x[:, 1::2])
+    return np.maximum(rows[:, :, 0::2], rows[:, :, 1::2])
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class NumpyEmotionModel:
+    """
+    Inference-only emotion CNN backed by NumPy arrays.
+
+    Batch normalization is pre-folded at export time: the BN layers that
+    follow each conv block are reduced to a per-channel scale and shift,
+    and the BN before the output layer is folded into the final Dense
+    weights.
+    """
+
+    def __init__(self, weights):
+        self.blocks = []
+        for i in range(1, NUM_CONV_BLOCKS + 1):
+            scale = weights[f"conv{i}_scale"]
+            self.blocks.append((
+                weights[f"conv{i}_kernel"],
+                weights[f"conv{i}_bias"],
+                scale,
+                weights[f"conv{i}_shift"],
+                # An affine map with positive scale commutes with max pooling,
+                # so it can be applied to the 4x smaller pooled tensor.
+                bool(np.all(scale > 0)),
+            ))
+        self.dense1 = (weights["dense1_kernel"], weights["dense1_bias"])
+        self.dense2 = (weights["dense2_kernel"], weights["dense2_bias"])
+
+    def predict(self, inputs):
+        """
+        Classify a batch of preprocessed faces.
+
+        Parameters
+        ----------
+        inputs : np.ndarray
+            Shape (N, 48, 48, 1), values in [0, 1].
+
+        Returns
+        -------
+        np.ndarray
+            Shape (N, 7) — softmax probabilities.
+        """
+        x = np.asarray(inputs, dtype=np.float32)
+        for kernel, bias, scale, shift, pool_first in self.blocks:
+            x = _conv3x3_relu(x, kernel, bias)
+            if pool_first:
+                x = _max_pool2x2(x) * scale + shift
+            else:
+                x = _max_pool2x2(x * scale + shift)
+
+        x = x.reshape(x.shape[0], -1)
+        x = x @ self.dense1[0] + self.dense1[1]
+        np.maximum(x, 0.0, out=x)
+        logits = x @ self.dense2[0] + self.dense2[1]
+        return _softmax(logits)
+
+
+def load_serving_model(path=SERVING_MODEL_PATH):
+    """Load the exported NumPy serving artifact."""
+    with np.load(path) as data:
+        weights = {key: data[key].astype(np.float32) for key in data.files}
+    return NumpyEmotionModel(weights)
@@ -0,0 +1,137 @@
+"""
+Live Emotion Streams
+Per-viewer state for the streaming webcam mode.
+
+Each stream keeps an exponentially smoothed FER probability vector (and
+so a smoothed mood vector, since the mood projection is linear), so one
+odd frame does not flip the displayed mood. To bound the CPU a viewer
+costs, the face box found by detectMultiScale is reused to crop the
+following frames and the full detection only runs again every
+REDETECT_EVERY frames, when the frame size changes, or while no face is
+being tracked. Frames are decoded straight to grayscale.
+
+The box is not moved between detections: a face that moves out of it
+within REDETECT_EVERY frames is classified from an off-centre crop until
+the next detection re-centres it. Lower REDETECT_EVERY (1 detects on
+every frame) when viewers move a lot.
+
+The patches are classified in this process by default; the ASGI app
+passes the inference pool's classify_face when INFERENCE_WORKERS is set.
+
+Frame dropping under load is up to the transport (see asgi_app): it only
+ever hands the newest frame to process().
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion.face_detector import decode_image, decode_reduced, get_detector, preprocess_face
+from emotion.predict import classify_face, result_from_probabilities
+
+# Streaming tuning (configurable)
+STREAM_SMOOTHING = 0.3    # weight of the newest frame in the moving average
+REDETECT_EVERY = 5        # tracked frames between full face detections
+
+
+def decode_gray(image_bytes):
+    """Decode image bytes to a grayscale array (reduced when large, see decode_reduced)."""
+    gray, _ = decode_reduced(image_bytes)
+    if gray is None:
+        gray = decode_image(image_bytes, cv2.IMREAD_GRAYSCALE)
+    return gray
+
+
+class EmotionStream:
+    """
+    Smoothed prediction state of one live stream.
+
+    Not thread-safe: process() must not run for the same stream on two
+    threads at once.
+
+    Parameters
+    ----------
+    smoothing : float
+        Weight in (0, 1] of the newest frame; 1 disables smoothing.
+    redetect_every : int
+        Frames cropped at the tracked box before detecting again.
+    classify : callable, optional
+        Maps a (48, 48) face patch to 7 FER probabilities; defaults to
+        emotion.predict.classify_face.
+    """
+
+    def __init__(self, smoothing=STREAM_SMOOTHING, redetect_every=REDETECT_EVERY,
+                 classify=None):
+        self.smoothing = smoothing
+        self.redetect_every = redetect_every
+        self.classify = classify or classify_face
+        self.probabilities = None   # smoothed (7,) FER probabilities
+
+        self.box = None             # (x, y, w, h) of the tracked face
+        self._shape = None
+        self._since_detection = 0
+
+        # Statistics
+        self.frames = 0
+        self.detections = 0
+        self.dropped = 0
+
+    def process(self, image_bytes):
+        """
+        Fold one frame into the stream.
+
+        Returns
+        -------
+        face_in_frame : bool
+            Whether this frame contributed a face.
+        result : dict
+            The smoothed prediction (see result()).
+        """
+        face_roi = self._track(decode_gray(image_bytes))
+        self.frames += 1
+        if face_roi is not None:
+            probabilities = np.asarray(self.classify(face_roi), dtype=np.float32)
+            if self.probabilities is None:
+                self.probabilities = probabilities
+            else:
+                self.probabilities = (
+                    self.smoothing * probabilities + (1.0 - self.smoothing) * self.probabilities
+                )
+        return face_roi is not None, self.result()
+
+    def result(self):
+        """
+        Smoothed prediction, same structure as predict_emotion_from_bytes()
+        (face_found stays False until the first face).
+        """
+        if self.probabilities is None:
+            return {
+                "emotion": None,
+                "mood": None,
+                "confidence": 0.0,
+                "mood_scores": {},
+                "face_found": False,
+            }
+        return result_from_probabilities(self.probabilities)
+
+    def stats(self):
+        """Frame, detection and drop counters."""
+        return {"frames": self.frames, "detections": self.detections, "dropped": self.dropped}
+
+    def _track(self, gray):
+        """Return the face patch of this frame, detecting only when due."""
+        if (self.box is None or gray.shape != self._shape
+                or self._since_detection >= self.redetect_every):
+            face_roi, _, self.box = get_detector().detect(gray)
+            self._shape = gray.shape
+            self._since_detection = 0
+            self.detections += 1
+            return face_roi
+
+        self._since_detection += 1
+        x, y, w, h = self.box
+        return preprocess_face(gray[y : y + h, x : x + w])
@@ -28,6 +28,8 @@ from tensorflow.keras.callbacks import (
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from emotion.emotion_model import build_model, MODEL_PATH
+from emotion.export_model import export_model
+from emotion.runtime import SERVING_MODEL_PATH
 
 # ── Dataset paths ────────────────────────────────────────────────
 # Try kagglehub cache first, then local emotion/data/ folder
@@ -162,6 +164,10 @@ def train():
 
     print(f"\n✅ Model saved to {MODEL_PATH}")
 
+    # Export the lightweight serving artifact used by emotion/predict.py
+    export_model(model)
+    print(f"✅ Serving model exported to {SERVING_MODEL_PATH}")
+
     return history
 
 
@@ -0,0 +1,551 @@
+"""
+Out-of-Process Inference Pool
+Runs face detection and CNN classification in separate worker processes
+so the web process holds no model and a slow prediction never blocks a
+request thread beyond its timeout.
+
+The pool listens on a private Unix socket (multiprocessing.connection,
+authenticated with a random key) and launches `python -m
+emotion.worker_pool` workers that connect back to it. Each worker is
+served by one dispatcher thread, which owns a shared-memory buffer: image
+bytes are copied into it once and only the segment name and length cross
+the socket. Workers load the model once and answer one request at a time.
+
+Back-pressure: at most `max_pending` requests wait for a worker; beyond
+that callers get InferencePoolBusy right away. Callers give up after
+`request_timeout` seconds (InferenceTimeout); a worker that takes longer
+than `worker_timeout` is killed and replaced. A monitor thread also
+replaces workers that exit, or that do not connect within
+`start_timeout` seconds of being launched.
+
+Every web process runs its own pool, so get_inference_pool() caps it at
+this process's share of the host's cores: the CPU count divided by
+WEB_CONCURRENCY (the number of web processes, as read by gunicorn and
+uvicorn). Set WEB_CONCURRENCY when running several web workers so the
+host does not end up with processes × cores model processes.
+
+This module only uses the standard library, so importing it does not pull
+OpenCV or NumPy into the web process.
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Pool tuning (configurable)
+DEFAULT_MAX_PENDING = 64          # queued requests before callers are turned away
+DEFAULT_REQUEST_TIMEOUT = 10.0    # seconds a caller waits for its result
+DEFAULT_WORKER_TIMEOUT = 30.0     # seconds before a stuck worker is replaced
+DEFAULT_START_TIMEOUT = 60.0      # seconds a new worker may take to load and connect
+MONITOR_INTERVAL = 1.0            # seconds between worker liveness checks
+MIN_BUFFER_SIZE = 1 << 20         # initial shared-memory buffer per worker
+
+# Environment variable carrying the socket authkey to workers
+_AUTHKEY_ENV = "MOOD_INFERENCE_AUTHKEY"
+
+# Workers are single-threaded; the pool provides the parallelism
+_WORKER_ENV = {
+    "OMP_NUM_THREADS": "1",
+    "OPENBLAS_NUM_THREADS": "1",
+    "MKL_NUM_THREADS": "1",
+    "EMOTION_WARMUP": "0",
+}
+
+# emotion.predict functions a request may ask a worker to run
+_WORKER_METHODS = (
+    "predict_emotion_from_bytes",
+    "predict_faces_from_bytes",
+    "classify_face_from_bytes",
+)
+
+_STOP = object()
+
+
+class InferencePoolBusy(RuntimeError):
+    """Raised when the pool's queue is full."""
+
+
+class InferenceTimeout(TimeoutError):
+    """Raised when a prediction does not finish within the request timeout."""
+
+
+class InferenceError(RuntimeError):
+    """Raised when a worker fails to process an image."""
+
+
+def default_num_workers():
+    """One worker per CPU core available to this process."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def host_worker_budget():
+    """Workers one web process may run: its share of the cores over WEB_CONCURRENCY."""
+    web_processes = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+    return max(1, default_num_workers() // web_processes)
+
+
+def _attach(name):
+    """Attach to an existing segment without handing it to the resource tracker."""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers; undo it so exit doesn't unlink the segment
+        shm = SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class InferencePool:
+    """
+    Pool of local inference worker processes.
+
+    Parameters
+    ----------
+    num_workers : int, optional
+        Worker processes to run (default: one per CPU core).
+    max_pending : int
+        Requests allowed to wait for a free worker.
+    request_timeout : float
+        Seconds a caller waits before InferenceTimeout.
+    worker_timeout : float
+        Seconds a worker may spend on one image before it is replaced.
+    start_timeout : float
+        Seconds a launched worker may take to connect before it is replaced.
+    """
+
+    def __init__(self, num_workers=None, max_pending=DEFAULT_MAX_PENDING,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT,
+                 worker_timeout=DEFAULT_WORKER_TIMEOUT,
+                 start_timeout=DEFAULT_START_TIMEOUT):
+        self.num_workers = num_workers or default_num_workers()
+        self.request_timeout = request_timeout
+        self.worker_timeout = worker_timeout
+        self.start_timeout = start_timeout
+        self.pid = os.getpid()
+
+        self._requests = queue.Queue(maxsize=max_pending)
+        self._authkey = os.urandom(32)
+        self._dir = tempfile.mkdtemp(prefix="mood-inference-")
+        self.address = os.path.join(self._dir, "pool.sock")
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self._authkey)
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._processes = {}    # pid → Popen
+        self._launched = {}     # pid → monotonic launch time
+        self._connected = set()  # pids with a dispatcher
+        self._closed = False
+
+        # Statistics
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+        self._accept_thread = threading.Thread(
+            target=self._accept_loop, name="inference-accept", daemon=True
+        )
+        self._accept_thread.start()
+        for _ in range(self.num_workers):
+            self._spawn()
+        self._monitor_thread = threading.Thread(
+            target=self._monitor_loop, name="inference-monitor", daemon=True
+        )
+        self._monitor_thread.start()
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    def submit(self, image_bytes, method="predict_emotion_from_bytes"):
+        """
+        Queue raw image bytes for prediction.
+
+        Parameters
+        ----------
+        image_bytes : bytes-like
+            Raw image data.
+        method : str
+            emotion.predict function the worker runs (see _WORKER_METHODS).
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to that function's result, or fails with the
+            ValueError it raised for a bad image, or with InferenceError.
+
+        Raises
+        ------
+        InferencePoolBusy
+            If max_pending requests are already waiting.
+        """
+        if self._closed:
+            raise RuntimeError("InferencePool is closed.")
+        if method not in _WORKER_METHODS:
+            raise ValueError(f"Unknown inference method: {method}")
+        future = Future()
+        deadline = time.monotonic() + self.request_timeout
+        try:
+            self._requests.put_nowait((image_bytes, method, future, deadline))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise InferencePoolBusy("Inference workers are busy; try again shortly.")
+        return future
+
+    def predict_emotion_from_bytes(self, image_bytes):
+        """Same contract as emotion.predict.predict_emotion_from_bytes()."""
+        return self._call(image_bytes, "predict_emotion_from_bytes")
+
+    def predict_faces_from_bytes(self, image_bytes):
+        """Same contract as emotion.predict.predict_faces_from_bytes()."""
+        return self._call(image_bytes, "predict_faces_from_bytes")
+
+    def classify_face(self, face_roi):
+        """
+        Same contract as emotion.predict.classify_face(), for the live
+        stream's tracked face patches (returned as a list of 7 floats).
+        """
+        return self._call(face_roi.tobytes(), "classify_face_from_bytes")
+
+    def _call(self, image_bytes, method):
+        """Run one request and wait for its result."""
+        future = self.submit(image_bytes, method)
+        try:
+            return future.result(timeout=self.request_timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise InferenceTimeout("Emotion prediction timed out.")
+
+    def predict_emotions_from_bytes(self, images):
+        """
+        Same contract as emotion.predict.predict_emotions_from_bytes().
+
+        The images are spread over the workers; the whole batch shares one
+        request timeout. A failed image gets face_found False and an
+        "error" message.
+        """
+        futures = []
+        try:
+            for image_bytes in images:
+                futures.append(self.submit(image_bytes))
+        except InferencePoolBusy:
+            for future in futures:
+                future.cancel()
+            raise
+
+        deadline = time.monotonic() + self.request_timeout
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeout:
+                for pending in futures:
+                    pending.cancel()
+                with self._lock:
+                    self.timeouts += 1
+                raise InferenceTimeout("Emotion prediction timed out.")
+            except (InferenceError, ValueError) as e:
+                results.append({
+                    "emotion": None, "mood": None, "confidence": 0.0,
+                    "mood_scores": {}, "face_found": False, "error": str(e),
+                })
+        return results
+
+    def warm_up(self, timeout=DEFAULT_START_TIMEOUT):
+        """Block until every worker has loaded its model and connected."""
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            while len(self._connected) < self.num_workers and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._ready.wait(remaining)
+        return True
+
+    def stats(self):
+        """Worker, queue and outcome counters."""
+        with self._lock:
+            return {
+                "workers": self.num_workers,
+                "connected": len(self._connected),
+                "queue_depth": self._requests.qsize(),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+            }
+
+    def close(self):
+        """Stop the dispatchers and workers and remove the socket."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._ready.notify_all()
+            processes = list(self._processes.values())
+        for _ in range(len(processes)):
+            self._requests.put(_STOP)
+        self._listener.close()
+        for proc in processes:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    # ── Workers ──────────────────────────────────────────────────────
+
+    def _spawn(self):
+        env = dict(os.environ, **_WORKER_ENV)
+        env[_AUTHKEY_ENV] = self._authkey.hex()
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "emotion.worker_pool", self.address],
+            cwd=root, env=env, stdin=subprocess.DEVNULL,
+        )
+        with self._lock:
+            self._processes[proc.pid] = proc
+            self._launched[proc.pid] = time.monotonic()
+
+    def _replace(self, pid):
+        """Kill worker `pid` (if still running) and start a new one, once."""
+        with self._lock:
+            proc = self._processes.pop(pid, None)
+            if proc is None:
+                return  # already replaced
+            self._launched.pop(pid, None)
+            self._connected.discard(pid)
+            closed = self._closed
+            if not closed:
+                self.restarts += 1
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        if not closed:
+            self._spawn()
+
+    def _monitor_loop(self):
+        """Replace workers that exited or never connected."""
+        while True:
+            time.sleep(MONITOR_INTERVAL)
+            now = time.monotonic()
+            with self._lock:
+                if self._closed:
+                    return
+                failed = []
+                for pid, proc in self._processes.items():
+                    returncode = proc.poll()
+                    if returncode is not None or (
+                        pid not in self._connected
+                        and now - self._launched[pid] > self.start_timeout
+                    ):
+                        failed.append((pid, returncode))
+            for pid, returncode in failed:
+                if returncode is None:
+                    print(f"Warning: Inference worker {pid} did not connect within "
+                          f"{self.start_timeout}s; restarting it")
+                else:
+                    print(f"Warning: Inference worker {pid} exited with code "
+                          f"{returncode}; restarting it")
+                self._replace(pid)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return  # listener closed
+            except Exception:
+                continue  # failed handshake
+            threading.Thread(
+                target=self._dispatch, args=(conn,), name="inference-dispatch", daemon=True
+            ).start()
+
+    def _dispatch(self, conn):
+        """Feed queued requests to one connected worker."""
+        try:
+            _, pid = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            return
+        with self._ready:
+            if pid not in self._processes:
+                conn.close()  # replaced while it was starting
+                return
+            self._connected.add(pid)
+            self._ready.notify_all()
+
+        buffer = None
+        try:
+            while True:
+                item = self._requests.get()
+                if item is _STOP:
+                    conn.send(("stop",))
+                    with self._lock:
+                        self._connected.discard(pid)
+                    return
+                with self._lock:
+                    replaced = pid not in self._processes
+                if replaced:
+                    # The monitor replaced this worker while it sat idle
+                    self._requeue(item)
+                    return
+                image_bytes, method, future, deadline = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if time.monotonic() >= deadline:
+                    future.set_exception(InferenceTimeout("Emotion prediction timed out."))
+                    continue
+
+                size = len(image_bytes)
+                if buffer is None or buffer.size < size:
+                    if buffer is not None:
+                        buffer.close()
+                        buffer.unlink()
+                    buffer = SharedMemory(create=True, size=max(MIN_BUFFER_SIZE, size * 2))
+                buffer.buf[:size] = image_bytes
+
+                try:
+                    conn.send(("predict", buffer.name, size, method))
+                    if not conn.poll(self.worker_timeout):
+                        raise TimeoutError(f"worker {pid} exceeded {self.worker_timeout}s")
+                    status, payload = conn.recv()
+                except (EOFError, OSError, TimeoutError) as e:
+                    future.set_exception(InferenceError(f"Inference worker failed: {e}"))
+                    with self._lock:
+                        self.failed += 1
+                    self._replace(pid)
+                    return
+
+                if status == "ok":
+                    future.set_result(payload)
+                    with self._lock:
+                        self.completed += 1
+                elif status == "invalid":
+                    # The image was rejected (e.g. undecodable), not a failure
+                    future.set_exception(ValueError(payload))
+                    with self._lock:
+                        self.completed += 1
+                else:
+                    future.set_exception(InferenceError(payload))
+                    with self._lock:
+                        self.failed += 1
+        finally:
+            conn.close()
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+
+    def _requeue(self, item):
+        """Give a request taken by a dead worker's dispatcher back to the queue."""
+        try:
+            self._requests.put_nowait(item)
+        except queue.Full:
+            future = item[2]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(InferenceError("Inference worker exited."))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_inference_pool(num_workers=None):
+    """
+    Return the process-wide pool, starting it (again after fork) if needed.
+
+    `num_workers` is capped at host_worker_budget(), which is also the
+    default.
+    """
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = _pool
+            if pool is None or pool.pid != os.getpid():
+                budget = host_worker_budget()
+                if num_workers and num_workers > budget:
+                    print(f"Warning: {num_workers} inference workers requested; "
+                          f"capped at {budget} (CPU cores / WEB_CONCURRENCY)")
+                pool = _pool = InferencePool(min(num_workers or budget, budget))
+                atexit.register(pool.close)
+    return pool
+
+
+# ── Worker process ───────────────────────────────────────────────────────
+
+def _release(obj):
+    """Release a memoryview or close a segment; arrays still viewing it keep it alive."""
+    try:
+        obj.release() if isinstance(obj, memoryview) else obj.close()
+    except BufferError:
+        pass
+
+
+def worker_main(address):
+    """Load the model, connect to the pool and serve predictions until told to stop."""
+    from emotion import predict
+    from emotion.predict import configure_batching, warm_up
+
+    # One request at a time per worker, so don't hold patches for batching
+    configure_batching(max_wait_ms=0)
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"Warning: Inference worker {os.getpid()} warm-up failed: {e}")
+
+    authkey = bytes.fromhex(os.environ.pop(_AUTHKEY_ENV))
+    conn = Client(address, family="AF_UNIX", authkey=authkey)
+    conn.send(("hello", os.getpid()))
+
+    shm = None
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+            if message[0] == "stop":
+                return
+
+            _, name, size, method = message
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    _release(shm)
+                shm = _attach(name)
+
+            view = shm.buf[:size]
+            try:
+                result = ("ok", getattr(predict, method)(view))
+            except ValueError as e:
+                result = ("invalid", str(e))
+            except Exception as e:
+                result = ("error", str(e))
+            _release(view)
+            conn.send(result)
+    finally:
+        if shm is not None:
+            _release(shm)
+        conn.close()
+
+
+if __name__ == "__main__":
+    worker_main(sys.argv[1])
@@ -4,7 +4,23 @@ Combines CNN emotion predictions with questionnaire scores using
 a weighted decision logic to determine the final mood.
 """
 
-MOOD_CATEGORIES = ["happy", "sad", "angry", "neutral", "excited", "stressed"]
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion.mood_vector import (
+    MOOD_CATEGORIES,
+    MOOD_DTYPE,
+    from_dict,
+    normalize,
+    one_hot,
+    to_dict,
+    top_mood_index,
+    zeros,
+)
 
 # Default weights (configurable)
 DEFAULT_CNN_WEIGHT = 0.6
@@ -36,47 +52,84 @@ def fuse_moods(cnn_mood_scores=None, questionnaire_mood_scores=None,
         confidence    : float — Score of the top mood (0-1)
         cnn_used      : bool  — Whether CNN input was available
         quest_used    : bool  — Whether questionnaire input was available
+
+    With no input at all the result is neutral. Inputs that are given but
+    score nothing leave every fused score at 0, and the tie goes to the
+    first mood in MOOD_CATEGORIES ("happy") with confidence 0.
     """
     cnn_used = cnn_mood_scores is not None and len(cnn_mood_scores) > 0
     quest_used = questionnaire_mood_scores is not None and len(questionnaire_mood_scores) > 0
 
-    # Initialize fused scores
-    fused = {mood: 0.0 for mood in MOOD_CATEGORIES}
-
-    if cnn_used and quest_used:
-        # Both inputs available — weighted combination
-        for mood in MOOD_CATEGORIES:
-            cnn_val = cnn_mood_scores.get(mood, 0.0)
-            quest_val = questionnaire_mood_scores.get(mood, 0.0)
-            fused[mood] = cnn_weight * cnn_val + questionnaire_weight * quest_val
-
-    elif cnn_used:
-        # Only CNN available — use full weight
-        for mood in MOOD_CATEGORIES:
-            fused[mood] = cnn_mood_scores.get(mood, 0.0)
-
-    elif quest_used:
-        # Only questionnaire available — use full weight
-        for mood in MOOD_CATEGORIES:
-            fused[mood] = questionnaire_mood_scores.get(mood, 0.0)
-
-    else:
-        # No input at all — default to neutral
-        fused["neutral"] = 1.0
-
-    # Normalize to sum to 1.0
-    total = sum(fused.values())
-    if total > 0:
-        fused = {mood: score / total for mood, score in fused.items()}
+    fused = fuse_vectors(
+        cnn_vectors=from_dict(cnn_mood_scores) if cnn_used else None,
+        questionnaire_vectors=from_dict(questionnaire_mood_scores) if quest_used else None,
+        cnn_weight=cnn_weight,
+        questionnaire_weight=questionnaire_weight,
+        fallback="neutral" if not (cnn_used or quest_used) else None,
+    )
 
     # Determine final mood
-    final_mood = max(fused, key=fused.get)
-    confidence = fused[final_mood]
+    top_idx = int(top_mood_index(fused))
+    final_mood = MOOD_CATEGORIES[top_idx]
+    confidence = float(fused[top_idx])
 
     return {
         "final_mood": final_mood,
-        "final_scores": fused,
+        "final_scores": to_dict(fused),
         "confidence": confidence,
         "cnn_used": cnn_used,
         "quest_used": quest_used,
     }
+
+
+def fuse_vectors(cnn_vectors=None, questionnaire_vectors=None,
+                 cnn_weight=DEFAULT_CNN_WEIGHT,
+                 questionnaire_weight=DEFAULT_QUESTIONNAIRE_WEIGHT,
+                 fallback="neutral"):
+    """
+    Fuse mood vectors in one weighted sum and normalization.
+
+    Works on a single session (6,) or a batch (N, 6). A source is treated
+    as missing for a row when that row is all zeros (or the argument is
+    None): rows with both sources use the configured weights, rows with
+    one source use it at full weight, and rows with neither get the
+    `fallback` mood.
+
+    Parameters
+    ----------
+    cnn_vectors : np.ndarray or None
+        Shape (6,) or (N, 6) CNN mood vectors.
+    questionnaire_vectors : np.ndarray or None
+        Shape (6,) or (N, 6) questionnaire mood vectors.
+    cnn_weight, questionnaire_weight : float
+        Weights used when both sources are present.
+    fallback : str or None
+        Mood given (as a one-hot vector) to rows with no source; None
+        leaves those rows all zeros.
+
+    Returns
+    -------
+    np.ndarray
+        Fused, normalized mood vectors with the broadcast input shape.
+    """
+    if cnn_vectors is None and questionnaire_vectors is None:
+        return one_hot(fallback) if fallback is not None else zeros()
+
+    if cnn_vectors is None:
+        cnn_vectors = np.zeros_like(questionnaire_vectors, dtype=MOOD_DTYPE)
+    if questionnaire_vectors is None:
+        questionnaire_vectors = np.zeros_like(cnn_vectors, dtype=MOOD_DTYPE)
+    cnn_vectors = np.asarray(cnn_vectors, dtype=MOOD_DTYPE)
+    questionnaire_vectors = np.asarray(questionnaire_vectors, dtype=MOOD_DTYPE)
+
+    cnn_used = np.any(cnn_vectors != 0, axis=-1, keepdims=True)
+    quest_used = np.any(questionnaire_vectors != 0, axis=-1, keepdims=True)
+    both = cnn_used & quest_used
+
+    # Per-row weights: configured split when both exist, else 1.0 for the one present
+    w_cnn = np.where(both, cnn_weight, cnn_used.astype(MOOD_DTYPE)).astype(MOOD_DTYPE)
+    w_quest = np.where(both, questionnaire_weight, quest_used.astype(MOOD_DTYPE)).astype(MOOD_DTYPE)
+
+    fused = w_cnn * cnn_vectors + w_quest * questionnaire_vectors
+    # No input at all — default to the fallback mood
+    return normalize(fused, fallback=one_hot(fallback) if fallback is not None else None)
@@ -0,0 +1,82 @@
+"""
+Mood Vectors
+Fixed-order NumPy representation of mood scores shared by the CNN,
+questionnaire and fusion stages.
+
+A mood vector is a float32 array whose last axis has one entry per mood in
+MOOD_CATEGORIES order: shape (6,) for one session or (N, 6) for a batch.
+{mood: score} dicts are only produced at the JSON/template boundary.
+"""
+
+import numpy as np
+
+# Canonical mood order (index i of a mood vector ↔ MOOD_CATEGORIES[i])
+MOOD_CATEGORIES = ["happy", "sad", "angry", "neutral", "excited", "stressed"]
+MOOD_INDEX = {mood: i for i, mood in enumerate(MOOD_CATEGORIES)}
+NUM_MOODS = len(MOOD_CATEGORIES)
+
+MOOD_DTYPE = np.float32
+
+
+def zeros(batch_size=None):
+    """Return an all-zero mood vector, or an (N, 6) batch of them."""
+    shape = (NUM_MOODS,) if batch_size is None else (batch_size, NUM_MOODS)
+    return np.zeros(shape, dtype=MOOD_DTYPE)
+
+
+def one_hot(mood):
+    """Return the mood vector with 1.0 for `mood` and 0 elsewhere."""
+    vector = zeros()
+    vector[MOOD_INDEX[mood]] = 1.0
+    return vector
+
+
+def from_dict(scores):
+    """Convert {mood: score} into a mood vector (missing moods are 0)."""
+    vector = zeros()
+    for mood, score in scores.items():
+        vector[MOOD_INDEX[mood]] = score
+    return vector
+
+
+def to_dict(vector):
+    """Convert a (6,) mood vector into {mood: float} in canonical order."""
+    return {mood: float(score) for mood, score in zip(MOOD_CATEGORIES, vector)}
+
+
+def normalize(vectors, fallback=None):
+    """
+    Scale mood vectors so each sums to 1.0.
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        Shape (6,) or (N, 6).
+    fallback : np.ndarray, optional
+        Vector used for rows whose total is 0. Such rows are returned
+        unchanged when no fallback is given.
+
+    Returns
+    -------
+    np.ndarray
+        New array of the same shape, dtype float32. The sums and divisions
+        run in float64 (like the scalar scoring code did), so float64 input
+        is only rounded once, at the end.
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    totals = vectors.sum(axis=-1, keepdims=True)
+    positive = totals > 0
+    normalized = np.divide(vectors, totals, out=vectors.copy(), where=positive)
+    if fallback is not None:
+        normalized = np.where(positive, normalized, np.asarray(fallback, dtype=np.float64))
+    return normalized.astype(MOOD_DTYPE)
+
+
+def top_mood_index(vectors):
+    """Index of the highest-scoring mood (first one on ties), per row."""
+    return np.argmax(vectors, axis=-1)
+
+
+def top_mood(vector):
+    """Name of the highest-scoring mood in a (6,) vector."""
+    return MOOD_CATEGORIES[int(np.argmax(vector))]
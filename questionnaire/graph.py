@@ -0,0 +1,241 @@
+"""
+Compiled Question Graph
+Validates the question tree at startup, pre-encodes each question's
+JSON body with an ETag, and precomputes the scoring result of every
+complete root-to-leaf path. get_question_graph() compiles it again when
+QUESTIONS is edited at runtime.
+
+A path is identified by the tuple of option indexes chosen from the root
+onwards; the questions visited follow from those choices.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion.mood_vector import MOOD_DTYPE, normalize, to_dict, top_mood
+from questionnaire.questions import QUESTIONS
+from questionnaire.scorer import UNIFORM_MOOD_VECTOR, CompiledQuestionnaire
+
+ROOT_QUESTION_ID = "q1"
+
+# Seconds between checks of QUESTIONS for runtime edits
+GRAPH_CHECK_INTERVAL = 1.0
+
+
+class QuestionGraphError(ValueError):
+    """Raised when the question tree is not a valid rooted DAG."""
+
+
+def encode_question(question):
+    """Serialize a question the way jsonify() does (sorted keys, compact)."""
+    return json.dumps(question, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body):
+    """Strong ETag value (unquoted) for a response body."""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _tree_fingerprint(root, etags):
+    return make_etag(json.dumps([root, sorted(etags)]).encode("utf-8"))
+
+
+def tree_fingerprint(questions, root=ROOT_QUESTION_ID):
+    """QuestionGraph(questions, root).fingerprint, without compiling the tree."""
+    return _tree_fingerprint(
+        root, (make_etag(encode_question(question)) for question in questions.values())
+    )
+
+
+class QuestionGraph:
+    """
+    Validated, pre-encoded form of a question tree.
+
+    Attributes
+    ----------
+    root : str
+        Id of the first question.
+    bodies : dict
+        {question_id: (json_bytes, etag)}.
+    fingerprint : str
+        Hash of the whole tree; changes whenever any question does.
+    paths : dict
+        {tuple of option indexes: questionnaire result dict}, one entry per
+        complete path, in the score_responses() format.
+    path_vectors : np.ndarray
+        Shape (num_paths, 6) normalized mood vectors, in `paths` order.
+    """
+
+    def __init__(self, questions, root=ROOT_QUESTION_ID):
+        self.questions = questions
+        self.root = root
+        self.validate()
+
+        self.bodies = {}
+        for qid, question in questions.items():
+            body = encode_question(question)
+            self.bodies[qid] = (body, make_etag(body))
+        self.fingerprint = _tree_fingerprint(root, (etag for _, etag in self.bodies.values()))
+
+        self._enumerate_paths()
+
+    # ── Validation ───────────────────────────────────────────────────
+
+    def validate(self):
+        """
+        Check the tree: every next_question_id exists, there are no
+        cycles, and every question is reachable from the root.
+
+        Raises
+        ------
+        QuestionGraphError
+        """
+        questions = self.questions
+        if self.root not in questions:
+            raise QuestionGraphError(f"Root question {self.root!r} is missing.")
+
+        for qid, question in questions.items():
+            if question.get("id") != qid:
+                raise QuestionGraphError(f"Question {qid!r} has id {question.get('id')!r}.")
+            if not question.get("options"):
+                raise QuestionGraphError(f"Question {qid!r} has no options.")
+            for i, option in enumerate(question["options"]):
+                next_id = option.get("next_question_id")
+                if next_id is not None and next_id not in questions:
+                    raise QuestionGraphError(
+                        f"Option {i} of {qid!r} points to missing question {next_id!r}."
+                    )
+
+        # Iterative DFS: gray = on the current path, black = finished
+        state = {self.root: "gray"}
+        stack = [(self.root, iter(self._children(self.root)))]
+        while stack:
+            qid, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[qid] = "black"
+                stack.pop()
+            elif state.get(child) == "gray":
+                raise QuestionGraphError(f"Cycle through {qid!r} → {child!r}.")
+            elif child not in state:
+                state[child] = "gray"
+                stack.append((child, iter(self._children(child))))
+
+        unreachable = [qid for qid in questions if qid not in state]
+        if unreachable:
+            raise QuestionGraphError(
+                f"Questions not reachable from {self.root!r}: {', '.join(unreachable)}."
+            )
+
+    def _children(self, qid):
+        return [
+            option["next_question_id"]
+            for option in self.questions[qid]["options"]
+            if option.get("next_question_id") is not None
+        ]
+
+    # ── Paths ────────────────────────────────────────────────────────
+
+    def _enumerate_paths(self):
+        """Walk every root-to-leaf path and score them all in one batch."""
+        compiled = CompiledQuestionnaire(self.questions)
+        keys, question_idx, option_idx, lengths = [], [], [], []
+
+        stack = [(self.root, ())]
+        while stack:
+            qid, chosen = stack.pop()
+            for i, option in reversed(list(enumerate(self.questions[qid]["options"]))):
+                path = chosen + ((qid, i),)
+                next_id = option.get("next_question_id")
+                if next_id is not None:
+                    stack.append((next_id, path))
+                    continue
+                keys.append(tuple(opt for _, opt in path))
+                lengths.append(len(path))
+                for step_qid, opt in path:
+                    question_idx.append(compiled.question_index[step_qid])
+                    option_idx.append(opt)
+
+        raw = compiled.accumulate(question_idx, option_idx, lengths)
+        self.path_vectors = normalize(raw, fallback=UNIFORM_MOOD_VECTOR)
+        raw = raw.astype(MOOD_DTYPE)
+        self.paths = {
+            key: {
+                "mood_scores": to_dict(vector),
+                "top_mood": top_mood(vector),
+                "raw_scores": to_dict(raw_row),
+            }
+            for key, vector, raw_row in zip(keys, self.path_vectors, raw)
+        }
+
+    def path_key(self, responses):
+        """
+        Return the path key of a response list, or None if the responses
+        are not exactly one complete path from the root.
+        """
+        expected = self.root
+        key = []
+        for response in responses:
+            if expected is None or response.get("question_id") != expected:
+                return None
+            options = self.questions[expected]["options"]
+            idx = response.get("option_index")
+            # bool is an int subclass, but True is not an option index
+            if (not isinstance(idx, int) or isinstance(idx, bool)
+                    or not 0 <= idx < len(options)):
+                return None
+            key.append(idx)
+            expected = options[idx].get("next_question_id")
+        if expected is not None:
+            return None
+        return tuple(key)
+
+    def result_for(self, responses):
+        """
+        Precomputed questionnaire result for a complete path, or None.
+
+        The returned dict is shared; treat it as read-only.
+        """
+        key = self.path_key(responses)
+        return None if key is None else self.paths[key]
+
+
+_graph = None
+_rejected = None      # fingerprint of the last invalid edit (warned once)
+_next_check = 0.0
+_graph_lock = threading.Lock()
+
+
+def get_question_graph():
+    """
+    Compile and validate QUESTIONS and cache the result.
+
+    At most once per GRAPH_CHECK_INTERVAL, QUESTIONS is fingerprinted
+    again; when it was edited the tree is recompiled, so the question
+    bodies, paths and get_questionnaire_table() follow without a restart.
+    The first compilation raises QuestionGraphError on an invalid tree;
+    an invalid edit later on keeps the last valid graph.
+    """
+    global _graph, _rejected, _next_check
+    graph = _graph
+    if graph is not None and time.monotonic() < _next_check:
+        return graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = QuestionGraph(QUESTIONS)
+        elif time.monotonic() >= _next_check:
+            fingerprint = tree_fingerprint(QUESTIONS, _graph.root)
+            if fingerprint not in (_graph.fingerprint, _rejected):
+                try:
+                    _graph = QuestionGraph(QUESTIONS, _graph.root)
+                except QuestionGraphError as e:
+                    _rejected = fingerprint
+                    print(f"Warning: Edited question tree rejected, keeping the previous one: {e}")
+        _next_check = time.monotonic() + GRAPH_CHECK_INTERVAL
+        return _graph
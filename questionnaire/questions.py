@@ -5,7 +5,7 @@ Each answer carries mood scores that accumulate into a final mood profile.
 """
 
 # ── Mood Categories ──────────────────────────────────────────────────────
-MOOD_CATEGORIES = ["happy", "sad", "angry", "neutral", "excited", "stressed"]
+from fusion.mood_vector import MOOD_CATEGORIES
 
 # ── Question Tree ────────────────────────────────────────────────────────
 # Structure:
@@ -3,7 +3,20 @@ Questionnaire Scorer
 Aggregates mood scores from all questionnaire responses into a final mood profile.
 """
 
-from questionnaire.questions import MOOD_CATEGORIES, get_question
+import numpy as np
+
+from fusion.mood_vector import (
+    MOOD_DTYPE,
+    MOOD_INDEX,
+    NUM_MOODS,
+    normalize,
+    to_dict,
+    top_mood,
+)
+from questionnaire.questions import QUESTIONS, get_question
+
+# Fallback distribution when no answer carries any score
+UNIFORM_MOOD_VECTOR = np.full(NUM_MOODS, 1.0 / NUM_MOODS, dtype=MOOD_DTYPE)
 
 
 def score_responses(responses):
@@ -24,8 +37,8 @@ def score_responses(responses):
         top_mood    : str   — The mood with the highest score
         raw_scores  : dict  — {mood: raw_accumulated_score} before normalization
     """
-    # Accumulate raw scores
-    raw_scores = {mood: 0.0 for mood in MOOD_CATEGORIES}
+    # Accumulate raw scores in float64; normalize() rounds to float32 once
+    raw = np.zeros(NUM_MOODS, dtype=np.float64)
 
     for response in responses:
         question = get_question(response["question_id"])
@@ -38,21 +51,174 @@ def score_responses(responses):
 
         option = question["options"][option_idx]
         for mood, score in option.get("mood_scores", {}).items():
-            raw_scores[mood] += score
-
-    # Normalize scores to sum to 1.0
-    total = sum(raw_scores.values())
-    if total > 0:
-        mood_scores = {mood: score / total for mood, score in raw_scores.items()}
-    else:
-        # Uniform distribution as fallback
-        mood_scores = {mood: 1.0 / len(MOOD_CATEGORIES) for mood in MOOD_CATEGORIES}
+            raw[MOOD_INDEX[mood]] += score
 
-    # Determine top mood
-    top_mood = max(mood_scores, key=mood_scores.get)
+    # Normalize scores to sum to 1.0 (uniform distribution as fallback)
+    normalized = normalize(raw, fallback=UNIFORM_MOOD_VECTOR)
 
     return {
-        "mood_scores": mood_scores,
-        "top_mood": top_mood,
-        "raw_scores": raw_scores,
+        "mood_scores": to_dict(normalized),
+        "top_mood": top_mood(normalized),
+        "raw_scores": to_dict(raw.astype(MOOD_DTYPE)),
     }
+
+
+# ── Batch scoring ────────────────────────────────────────────────────────
+# For replaying many submissions the question tree is compiled into a dense
+# option-to-mood matrix: question i's options occupy rows
+# option_offsets[i] .. option_offsets[i + 1] - 1.
+
+class CompiledQuestionnaire:
+    """
+    Question tree flattened into integer ids and a (num_options, 6) matrix.
+
+    Attributes
+    ----------
+    question_ids : tuple of str
+        Question id for each integer id.
+    question_index : dict
+        {question_id: integer id}.
+    option_offsets : np.ndarray
+        Shape (num_questions + 1,), first matrix row of each question.
+    option_matrix : np.ndarray
+        Shape (num_options, 6) float64 mood vector of every option.
+    """
+
+    def __init__(self, questions):
+        self.question_ids = tuple(questions)
+        self.question_index = {qid: i for i, qid in enumerate(self.question_ids)}
+
+        counts = [len(questions[qid]["options"]) for qid in self.question_ids]
+        self.option_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.option_offsets[1:])
+
+        self.option_matrix = np.zeros(
+            (int(self.option_offsets[-1]), NUM_MOODS), dtype=np.float64
+        )
+        row = 0
+        for qid in self.question_ids:
+            for option in questions[qid]["options"]:
+                for mood, score in option.get("mood_scores", {}).items():
+                    self.option_matrix[row, MOOD_INDEX[mood]] = score
+                row += 1
+
+    def encode(self, batch):
+        """
+        Convert response lists into ragged integer arrays.
+
+        Parameters
+        ----------
+        batch : iterable of list of dict
+            Response lists in the score_responses() format.
+
+        Returns
+        -------
+        question_idx : np.ndarray
+            Integer question id per response (-1 for unknown questions).
+        option_idx : np.ndarray
+            Option index per response.
+        lengths : np.ndarray
+            Number of responses in each submission.
+        """
+        question_idx, option_idx, lengths = [], [], []
+        for responses in batch:
+            lengths.append(len(responses))
+            for response in responses:
+                question_idx.append(self.question_index.get(response["question_id"], -1))
+                option_idx.append(response["option_index"])
+        return (
+            np.asarray(question_idx, dtype=np.int64),
+            np.asarray(option_idx, dtype=np.int64),
+            np.asarray(lengths, dtype=np.int64),
+        )
+
+    def accumulate(self, question_idx, option_idx, lengths):
+        """
+        Sum the raw mood scores of every submission.
+
+        Responses with an unknown question or out-of-range option are
+        skipped, as in score_responses(). Scores are added per submission
+        in response order, so the float64 sums are bit-identical to it.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (len(lengths), 6) float64 raw score vectors.
+        """
+        question_idx = np.asarray(question_idx, dtype=np.int64)
+        option_idx = np.asarray(option_idx, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+
+        raw = np.zeros((len(lengths), NUM_MOODS), dtype=np.float64)
+        submission = np.repeat(np.arange(len(lengths)), lengths)
+
+        num_questions = len(self.question_ids)
+        valid = (question_idx >= 0) & (question_idx < num_questions)
+        q = np.where(valid, question_idx, 0)
+        start = self.option_offsets[q]
+        count = self.option_offsets[q + 1] - start
+        valid &= (option_idx >= 0) & (option_idx < count)
+
+        # np.add.at is unbuffered and applies rows in order
+        np.add.at(raw, submission[valid], self.option_matrix[(start + option_idx)[valid]])
+        return raw
+
+    def score_arrays(self, question_idx, option_idx, lengths):
+        """Normalized mood vectors, shape (len(lengths), 6), for ragged arrays."""
+        raw = self.accumulate(question_idx, option_idx, lengths)
+        return normalize(raw, fallback=UNIFORM_MOOD_VECTOR)
+
+    def score_batch(self, batch):
+        """Normalized mood vectors, shape (N, 6), for N response lists."""
+        return self.score_arrays(*self.encode(batch))
+
+
+_compiled = None
+
+
+def get_compiled_questionnaire():
+    """Compile the question tree once and cache it."""
+    global _compiled
+    if _compiled is None:
+        _compiled = CompiledQuestionnaire(QUESTIONS)
+    return _compiled
+
+
+def score_batch(batch):
+    """
+    Score many questionnaire submissions in one vectorized pass.
+
+    Parameters
+    ----------
+    batch : iterable of list of dict
+        Each element is a response list as accepted by score_responses().
+
+    Returns
+    -------
+    np.ndarray
+        Shape (N, 6) float32; row i equals the mood_scores of
+        score_responses(batch[i]) in MOOD_CATEGORIES order.
+    """
+    return get_compiled_questionnaire().score_batch(batch)
+
+
+def score_batch_arrays(question_idx, option_idx, lengths):
+    """
+    Score submissions given as ragged integer arrays.
+
+    Parameters
+    ----------
+    question_idx : array-like of int
+        Integer question id of each response, all submissions concatenated
+        (see CompiledQuestionnaire.question_index).
+    option_idx : array-like of int
+        Chosen option index of each response.
+    lengths : array-like of int
+        Number of responses in each submission.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (len(lengths), 6) normalized mood vectors.
+    """
+    return get_compiled_questionnaire().score_arrays(question_idx, option_idx, lengths)
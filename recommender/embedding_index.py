@@ -0,0 +1,389 @@
+"""
+Mood Embedding Index
+Top-k nearest-neighbour search over per-item mood vectors.
+
+Every song and movie has a 6-dimensional mood vector: the row stored in
+item_mood_vectors when there is one, otherwise the one-hot vector of its
+mood_tag. The index is built offline from the database into one directory
+of .npy files:
+
+    {table}_vectors.npy  (N, 6) float32, L2-normalized, grouped by mood_tag
+                         and, within a mood, by IVF list
+    {table}_ids.npy      (N,) int64 catalog ids, same order
+    {table}_ivf.npz      centroids (L, 6) and list offsets (7, L + 1)
+    meta.json            catalog version, build parameters and the row
+                         range of each mood_tag
+
+At startup the arrays are memory-mapped read-only, so worker processes
+share them through the page cache. A query is a dot product with the
+user's normalized mood vector and an argpartition top-k, either over the
+whole matrix or over the `nprobe` IVF lists nearest to the query, and
+optionally restricted to the items of one mood_tag so the engine can rank
+inside each mood's share of the slots.
+
+Usage:
+    python -m recommender.embedding_index [--nlist 64]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.catalog_snapshot import save_npy
+from database.db_utils import get_catalog_version, pooled_connection
+from fusion.mood_vector import MOOD_DTYPE, MOOD_INDEX, NUM_MOODS
+
+# Where the built index lives
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index")
+
+INDEX_TABLES = ("songs", "movies")
+
+# Build / query tuning (configurable)
+DEFAULT_NLIST = 64          # IVF lists (0 disables the coarse partition)
+DEFAULT_NPROBE = 8          # lists scanned per query
+KMEANS_SAMPLE = 100000      # rows used to train the IVF centroids
+KMEANS_ITERATIONS = 10
+BUILD_CHUNK = 100000        # rows read from SQLite at a time
+
+# Seconds before a lookup looks for an index that was missing again
+INDEX_RETRY_INTERVAL = 5.0
+
+# Random jitter added to scores so equally similar items rotate
+TIE_JITTER = 1e-4
+
+_rng = np.random.default_rng()
+
+
+def _l2_normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def top_k(scores, k):
+    """Indices of the `k` largest scores, best first (argpartition + sort of k)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+# ── Build ────────────────────────────────────────────────────────────────
+
+def load_item_vectors(table):
+    """
+    Read every item's mood vector from the database.
+
+    Returns
+    -------
+    ids : np.ndarray
+        Shape (N,) int64 item ids, ascending.
+    vectors : np.ndarray
+        Shape (N, 6) float32 raw mood vectors.
+    moods : np.ndarray
+        Shape (N,) int8 MOOD_INDEX of each mood_tag (NUM_MOODS if unknown).
+    """
+    with pooled_connection() as conn:
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        ids = np.empty(count, dtype=np.int64)
+        vectors = np.zeros((count, NUM_MOODS), dtype=MOOD_DTYPE)
+        moods = np.full(count, NUM_MOODS, dtype=np.int8)
+        cursor = conn.execute(
+            f"SELECT t.id, t.mood_tag, v.mood_vector FROM {table} t "
+            f"LEFT JOIN item_mood_vectors v "
+            f"  ON v.table_name = ? AND v.item_id = t.id "
+            f"ORDER BY t.id",
+            (table,),
+        )
+        row = 0
+        while True:
+            chunk = cursor.fetchmany(BUILD_CHUNK)
+            if not chunk:
+                break
+            for item_id, mood_tag, blob in chunk:
+                if row >= count:
+                    break
+                ids[row] = item_id
+                if mood_tag in MOOD_INDEX:
+                    moods[row] = MOOD_INDEX[mood_tag]
+                if blob is not None:
+                    vectors[row] = np.frombuffer(blob, dtype=MOOD_DTYPE, count=NUM_MOODS)
+                elif mood_tag in MOOD_INDEX:
+                    vectors[row, MOOD_INDEX[mood_tag]] = 1.0
+                row += 1
+    return ids[:row], vectors[:row], moods[:row]
+
+
+def train_ivf(vectors, nlist, seed=0):
+    """
+    Assign rows to `nlist` k-means lists (spherical, on normalized vectors).
+
+    Returns
+    -------
+    centroids : np.ndarray
+        Shape (L, 6), L <= nlist (empty lists are dropped).
+    assignment : np.ndarray
+        Shape (N,) list index of each row.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    nlist = min(nlist, n)
+    sample = vectors[rng.choice(n, min(n, KMEANS_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        centroids = np.where(np.any(sums != 0, axis=1, keepdims=True),
+                             _l2_normalize(sums), centroids)
+
+    assignment = np.empty(n, dtype=np.int64)
+    for start in range(0, n, BUILD_CHUNK):
+        block = vectors[start:start + BUILD_CHUNK]
+        assignment[start:start + BUILD_CHUNK] = np.argmax(block @ centroids.T, axis=1)
+
+    used = np.unique(assignment)
+    remap = np.full(len(centroids), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return centroids[used], remap[assignment]
+
+
+def build_index(index_dir=None, nlist=DEFAULT_NLIST, verbose=True):
+    """
+    Build the mood index for every catalog table from the database.
+
+    Parameters
+    ----------
+    index_dir : str
+        Output directory.
+    nlist : int
+        Number of IVF lists per table; 0 builds a flat index only.
+    """
+    index_dir = index_dir or INDEX_DIR
+    os.makedirs(index_dir, exist_ok=True)
+    version = get_catalog_version()
+    meta = {"catalog_version": version, "nlist": nlist, "tables": {}}
+
+    for table in INDEX_TABLES:
+        start = time.perf_counter()
+        ids, vectors, moods = load_item_vectors(table)
+        vectors = _l2_normalize(vectors)
+
+        # Rows of one mood_tag (unknown tags last) are contiguous
+        mood_offsets = np.zeros(NUM_MOODS + 2, dtype=np.int64)
+        np.cumsum(np.bincount(moods, minlength=NUM_MOODS + 1), out=mood_offsets[1:])
+
+        if nlist and len(vectors):
+            centroids, assignment = train_ivf(vectors, nlist)
+            order = np.lexsort((assignment, moods))
+            ids, vectors = ids[order], vectors[order]
+            # offsets[m, i]:offsets[m, i + 1] = rows of mood m in list i
+            counts = np.zeros((NUM_MOODS + 1, len(centroids)), dtype=np.int64)
+            np.add.at(counts, (moods, assignment), 1)
+            offsets = np.zeros((NUM_MOODS + 1, len(centroids) + 1), dtype=np.int64)
+            np.cumsum(counts, axis=1, out=offsets[:, 1:])
+            offsets += mood_offsets[:-1, None]
+            tmp = os.path.join(index_dir, f"{table}_ivf.tmp.npz")
+            np.savez(tmp, centroids=centroids, offsets=offsets)
+            os.replace(tmp, os.path.join(index_dir, f"{table}_ivf.npz"))
+        else:
+            order = np.argsort(moods, kind="stable")
+            ids, vectors = ids[order], vectors[order]
+            ivf_path = os.path.join(index_dir, f"{table}_ivf.npz")
+            if os.path.exists(ivf_path):
+                os.remove(ivf_path)
+
+        save_npy(os.path.join(index_dir, f"{table}_vectors.npy"),
+                  np.ascontiguousarray(vectors, dtype=MOOD_DTYPE))
+        save_npy(os.path.join(index_dir, f"{table}_ids.npy"), ids)
+        meta["tables"][table] = {"items": int(len(ids)),
+                                 "mood_offsets": mood_offsets.tolist()}
+        if verbose:
+            print(f"   {table:<8} {len(ids):>10,} items   "
+                  f"{time.perf_counter() - start:6.2f}s")
+
+    # meta.json last: a reader never sees it ahead of the arrays
+    tmp = os.path.join(index_dir, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(index_dir, "meta.json"))
+    if verbose:
+        print(f"✅ Mood index built for catalog version {version} in {index_dir}")
+    return meta
+
+
+# ── Query ────────────────────────────────────────────────────────────────
+
+class MoodIndex:
+    """
+    Memory-mapped mood vectors of one catalog table.
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        (N, 6) L2-normalized float32 matrix (usually a read-only memmap).
+    ids : np.ndarray
+        (N,) item ids in the same order.
+    mood_offsets : np.ndarray
+        (NUM_MOODS + 2,) rows mood_offsets[m]:mood_offsets[m + 1] have
+        mood_tag MOOD_CATEGORIES[m]; the last range holds unknown tags.
+    centroids, offsets : np.ndarray, optional
+        IVF lists: rows offsets[m, i]:offsets[m, i + 1] belong to mood m
+        and centroid i.
+    catalog_version : int, optional
+        Catalog version the index was built from.
+    """
+
+    def __init__(self, vectors, ids, mood_offsets, centroids=None, offsets=None,
+                 catalog_version=None):
+        self.vectors = vectors
+        self.ids = ids
+        self.mood_offsets = mood_offsets
+        self.centroids = centroids
+        self.offsets = offsets
+        self.catalog_version = catalog_version
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, mood_vector, k, mood=None, nprobe=DEFAULT_NPROBE,
+               jitter=TIE_JITTER):
+        """
+        Return the ids of the `k` items most similar to a mood vector.
+
+        Parameters
+        ----------
+        mood_vector : np.ndarray
+            Shape (6,) query, e.g. the fused final scores.
+        k : int
+            Number of results.
+        mood : int, optional
+            MOOD_INDEX of a mood_tag; only items with that tag are ranked.
+        nprobe : int or None
+            IVF lists to scan; None (or an index without IVF) scans all.
+        jitter : float
+            Amplitude of the random tie-breaking noise (0 for determinism).
+
+        Returns
+        -------
+        np.ndarray
+            Up to k item ids, most similar first.
+        """
+        query = _l2_normalize(np.asarray(mood_vector, dtype=MOOD_DTYPE))
+        if mood is None:
+            start, stop = 0, len(self.ids)
+            blocks = self.offsets
+        else:
+            start, stop = self.mood_offsets[mood], self.mood_offsets[mood + 1]
+            blocks = None if self.offsets is None else self.offsets[mood:mood + 1]
+
+        rows = None
+        if self.centroids is not None and nprobe and nprobe < len(self.centroids):
+            # Probe only lists that hold rows of the requested mood(s)
+            sizes = (blocks[:, 1:] - blocks[:, :-1]).sum(axis=0)
+            candidates = np.flatnonzero(sizes)
+            if nprobe < len(candidates):
+                lists = candidates[top_k(self.centroids[candidates] @ query, nprobe)]
+                rows = np.concatenate([
+                    np.arange(block[i], block[i + 1]) for i in lists for block in blocks
+                ])
+                # Scanned lists may hold fewer than k items; fall back to all
+                if len(rows) < k:
+                    rows = None
+
+        if rows is None:
+            scores = self.vectors[start:stop] @ query
+            ids = self.ids[start:stop]
+        else:
+            scores = self.vectors[rows] @ query
+            ids = self.ids[rows]
+
+        if jitter:
+            scores = scores + _rng.random(len(scores), dtype=MOOD_DTYPE) * jitter
+        return ids[top_k(scores, k)]
+
+
+def load_index(table, index_dir=None):
+    """
+    Memory-map the index of one table.
+
+    Returns
+    -------
+    MoodIndex or None
+        None when the index has not been built, or was built before rows
+        were grouped by mood_tag and needs rebuilding.
+    """
+    index_dir = index_dir or INDEX_DIR
+    meta_path = os.path.join(index_dir, "meta.json")
+    vectors_path = os.path.join(index_dir, f"{table}_vectors.npy")
+    if not (os.path.exists(meta_path) and os.path.exists(vectors_path)):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    mood_offsets = meta.get("tables", {}).get(table, {}).get("mood_offsets")
+    if mood_offsets is None:
+        return None
+
+    vectors = np.load(vectors_path, mmap_mode="r")
+    ids = np.load(os.path.join(index_dir, f"{table}_ids.npy"), mmap_mode="r")
+    centroids = offsets = None
+    ivf_path = os.path.join(index_dir, f"{table}_ivf.npz")
+    if os.path.exists(ivf_path):
+        with np.load(ivf_path) as ivf:
+            centroids, offsets = ivf["centroids"], ivf["offsets"]
+    return MoodIndex(vectors, ids, np.asarray(mood_offsets, dtype=np.int64),
+                     centroids, offsets, meta.get("catalog_version"))
+
+
+_indexes = {}
+_missing_until = {}    # table → monotonic time of the next load attempt
+_indexes_lock = threading.Lock()
+
+
+def get_mood_index(table):
+    """
+    Return the process-wide index of `table` (None if not built).
+
+    Only a successful load is kept; while the files are missing, they are
+    looked for again at most once per INDEX_RETRY_INTERVAL, so an index
+    built after startup is picked up without a restart.
+    """
+    index = _indexes.get(table)
+    if index is None and time.monotonic() >= _missing_until.get(table, 0.0):
+        with _indexes_lock:
+            index = _indexes.get(table)
+            if index is None and time.monotonic() >= _missing_until.get(table, 0.0):
+                index = load_index(table)
+                if index is None:
+                    _missing_until[table] = time.monotonic() + INDEX_RETRY_INTERVAL
+                else:
+                    _indexes[table] = index
+    return index
+
+
+def reload_indexes():
+    """Drop the loaded indexes so the next lookup maps the files again."""
+    with _indexes_lock:
+        _indexes.clear()
+        _missing_until.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nlist", type=int, default=DEFAULT_NLIST,
+                        help="IVF lists per table (0 for a flat index)")
+    parser.add_argument("--out", default=None, help=f"output directory (default {INDEX_DIR})")
+    args = parser.parse_args()
+    build_index(args.out, nlist=args.nlist)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,159 @@ Recommendation Engine
 Retrieves mood-matched songs and movies from the database.
 """
 
+import functools
 import os
 import sys
 
+import numpy as np
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db_utils import get_songs_by_mood, get_movies_by_mood, log_mood
+from database.db_utils import (
+    get_catalog_version,
+    get_items_by_ids,
+    get_movies_by_mood,
+    get_songs_by_mood,
+)
+from database.catalog_cache import get_catalog_cache
+from database.catalog_snapshot import get_catalog_snapshot
+from database.log_writer import enqueue_mood_log
+from fusion.mood_vector import MOOD_CATEGORIES, MOOD_DTYPE, MOOD_INDEX, from_dict
+from recommender.embedding_index import get_mood_index
+
+# Serve catalog lookups from the memory-mapped snapshot when one is built
+# and current, else from the in-memory cache, else from SQLite
+USE_CATALOG_SNAPSHOT = True
+USE_CATALOG_CACHE = True
+
+# Spread recommendations over all moods in proportion to their fused scores
+BLEND_MOODS = True
+
+# Rank the items of each mood by mood-vector similarity when a built,
+# up-to-date index exists (random sampling otherwise)
+USE_EMBEDDING_INDEX = True
+
+
+def allocate_slots(mood_vector, num_slots):
+    """
+    Split `num_slots` across moods in proportion to their scores.
+
+    Uses the largest-remainder method: each mood gets the floor of its
+    share, and the leftover slots go to the largest fractional parts
+    (earlier moods first on ties).
+
+    Parameters
+    ----------
+    mood_vector : np.ndarray
+        Shape (6,) non-negative mood scores (need not sum to 1).
+    num_slots : int
+        Number of items to allocate.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (6,) int slot counts summing to num_slots (all zero if the
+        vector is all zero).
+    """
+    scores = np.clip(np.asarray(mood_vector, dtype=MOOD_DTYPE), 0, None)
+    total = scores.sum()
+    if total <= 0 or num_slots <= 0:
+        return np.zeros(len(scores), dtype=np.int64)
+
+    quotas = scores.astype(np.float64) * (num_slots / float(total))
+    counts = np.floor(quotas).astype(np.int64)
+    leftover = num_slots - int(counts.sum())
+    if leftover > 0:
+        order = np.argsort(-(quotas - counts), kind="stable")
+        counts[order[:leftover]] += 1
+    return counts
+
+
+def _blend(sample_fn, mood_vector, num_items, counts=None):
+    """
+    Draw `num_items` items spread over moods by allocate_slots() (or the
+    precomputed `counts`).
+
+    Moods are visited from highest to lowest score; when one has fewer
+    items than its allocation, the shortfall moves on to the next mood.
+    Each mood is sampled once, so the cost is O(num_items). A shortfall
+    left after the last mood is topped up from any mood that still has
+    unused rows (highest score first).
+    """
+    if counts is None:
+        counts = allocate_slots(mood_vector, num_items)
+    order = np.argsort(-np.asarray(mood_vector), kind="stable")
+    items = []
+    taken = {}          # mood index → items taken from it
+    exhausted = set()   # moods that returned fewer rows than asked
+    shortfall = 0
+    for idx in order:
+        want = int(counts[idx]) + shortfall
+        if want == 0:
+            continue
+        picked = sample_fn(MOOD_CATEGORIES[idx], limit=want)
+        items.extend(picked)
+        taken[idx] = len(picked)
+        shortfall = want - len(picked)
+        if shortfall:
+            exhausted.add(idx)
+
+    # Top-up: resample a mood with room for its previous picks plus the
+    # shortfall and keep the rows not already chosen
+    for idx in order:
+        if shortfall == 0:
+            break
+        if idx in exhausted:
+            continue
+        seen = {item["id"] for item in items}
+        picked = sample_fn(MOOD_CATEGORIES[idx], limit=taken.get(idx, 0) + shortfall)
+        fresh = [item for item in picked if item["id"] not in seen][:shortfall]
+        items.extend(fresh)
+        shortfall -= len(fresh)
+    return items
+
+
+def _catalog():
+    """
+    Catalog backend for this request: the snapshot or the in-memory cache
+    (both offer sample, get_many and version), or None for SQLite.
+    """
+    if USE_CATALOG_SNAPSHOT:
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None and snapshot.is_current():
+            return snapshot
+    if USE_CATALOG_CACHE:
+        return get_catalog_cache()
+    return None
+
+
+def _nearest(catalog, table, mood_vector):
+    """
+    A sample_fn(mood_tag, limit) that returns the items of that mood most
+    similar to `mood_vector` in the mood index, or None when no index is
+    built or it was built from another catalog version.
+
+    Used in place of random sampling, it keeps the per-mood slot
+    allocation and only decides which items fill each mood's slots.
+    """
+    index = get_mood_index(table)
+    if index is None:
+        return None
+    version = catalog.version() if catalog is not None else get_catalog_version()
+    if index.catalog_version != version:
+        return None
+
+    def ranked(mood_tag, limit):
+        ids = index.search(mood_vector, limit, mood=MOOD_INDEX[mood_tag]).tolist()
+        if catalog is not None:
+            return catalog.get_many(table, ids)
+        return get_items_by_ids(table, ids)
+    return ranked
 
 
 def get_recommendations(final_mood, cnn_emotion=None, cnn_confidence=None,
                         questionnaire_mood=None, questionnaire_score=None,
-                        num_songs=5, num_movies=5):
+                        num_songs=5, num_movies=5, mood_scores=None):
     """
     Get song and movie recommendations for a given mood.
 
@@ -33,6 +175,11 @@ def get_recommendations(final_mood, cnn_emotion=None, cnn_confidence=None,
         Number of songs to recommend.
     num_movies : int
         Number of movies to recommend.
+    mood_scores : dict, optional
+        Full fused {mood: score} distribution. When given, items are
+        spread across moods in proportion to it (BLEND_MOODS) instead of
+        all coming from final_mood, and within each mood they are ranked
+        by similarity to it in the mood index (USE_EMBEDDING_INDEX).
 
     Returns
     -------
@@ -42,24 +189,65 @@ def get_recommendations(final_mood, cnn_emotion=None, cnn_confidence=None,
         movies : list of dict
     """
 
-    # Fetch recommendations from database
-    songs = get_songs_by_mood(final_mood, limit=num_songs)
-    movies = get_movies_by_mood(final_mood, limit=num_movies)
-
-    # Log the mood analysis session
-    try:
-        log_mood(
-            cnn_emotion=cnn_emotion,
-            cnn_confidence=cnn_confidence,
-            questionnaire_mood=questionnaire_mood,
-            questionnaire_score=questionnaire_score,
-            final_mood=final_mood,
-        )
-    except Exception as e:
-        print(f"Warning: Could not log mood history: {e}")
+    # Fetch recommendations from the catalog
+    songs, movies = retrieve_items(final_mood, num_songs, num_movies, mood_scores)
+
+    # Log the mood analysis session (written in the background)
+    enqueue_mood_log(
+        cnn_emotion=cnn_emotion,
+        cnn_confidence=cnn_confidence,
+        questionnaire_mood=questionnaire_mood,
+        questionnaire_score=questionnaire_score,
+        final_mood=final_mood,
+    )
 
     return {
         "mood": final_mood,
         "songs": songs,
         "movies": movies,
     }
+
+
+def retrieve_items(final_mood, num_songs, num_movies, mood_scores=None, slots=None):
+    """
+    Fetch the songs and movies get_recommendations() returns, without
+    logging the session.
+
+    Parameters
+    ----------
+    slots : tuple of np.ndarray, optional
+        (song_counts, movie_counts): allocate_slots() of `mood_scores` for
+        num_songs and num_movies, for callers that serve the same
+        distribution repeatedly. Items are still sampled on every call.
+
+    Returns
+    -------
+    songs, movies : list of dict
+    """
+    catalog = _catalog()
+    if catalog is not None:
+        song_fn = functools.partial(catalog.sample, "songs")
+        movie_fn = functools.partial(catalog.sample, "movies")
+    else:
+        song_fn, movie_fn = get_songs_by_mood, get_movies_by_mood
+
+    if not mood_scores:
+        return song_fn(final_mood, limit=num_songs), movie_fn(final_mood, limit=num_movies)
+
+    mood_vector = from_dict(mood_scores)
+    if USE_EMBEDDING_INDEX:
+        song_fn = _nearest(catalog, "songs", mood_vector) or song_fn
+        movie_fn = _nearest(catalog, "movies", mood_vector) or movie_fn
+    if not BLEND_MOODS:
+        return song_fn(final_mood, limit=num_songs), movie_fn(final_mood, limit=num_movies)
+
+    song_counts, movie_counts = slots or (None, None)
+    songs = _blend(song_fn, mood_vector, num_songs, song_counts)
+    movies = _blend(movie_fn, mood_vector, num_movies, movie_counts)
+    return songs, movies
+
+
+def catalog_version():
+    """Version of the catalog retrieve_items() currently reads from."""
+    catalog = _catalog()
+    return catalog.version() if catalog is not None else get_catalog_version()
@@ -0,0 +1,141 @@
+"""
+Precomputed Questionnaire-Only Results
+When the image step is skipped, the final mood depends only on the
+questionnaire result, and every complete answer path's result is already
+known (QuestionGraph.paths). This table maps each of those results to
+its fused mood and to the per-mood slot allocation (allocate_slots) of
+its songs and movies, so a questionnaire-only /results request does no
+scoring, fusion or allocation: it samples each mood's share of items
+from the catalog and queues the log record.
+
+Items are sampled on every request through
+recommender.engine.retrieve_items(), so sessions on the same path see
+different items and the catalog's current contents, in the same
+proportions as get_recommendations(). The table used to hold a pool of
+pre-fetched items per entry instead; that showed every session on a path
+the same few rows, kept serving rows removed from the catalog until a
+restart, and cost memory and startup time per path. The costly part,
+fusion and slot allocation, stays precomputed, and sampling is cheap
+next to it (a few snapshot or cache lookups).
+
+Entries are keyed by the questionnaire's mood vector (the float32 bytes of
+its normalized mood_scores), which survives every session backend
+unchanged; paths that yield the same distribution share an entry.
+
+The table is built at startup and rebuilt whenever it is asked for with a
+graph of another fingerprint, which is what happens after
+questionnaire.graph.get_question_graph() recompiles an edited QUESTIONS.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.log_writer import enqueue_mood_log
+from fusion.mood_fusion import fuse_moods
+from fusion.mood_vector import from_dict
+from recommender.engine import allocate_slots, retrieve_items
+
+# Questionnaire-only table tuning (configurable)
+NUM_SONGS = 5
+NUM_MOVIES = 5
+
+
+def result_signature(quest_result):
+    """Table key of a questionnaire result."""
+    return from_dict(quest_result["mood_scores"]).tobytes()
+
+
+class _Entry:
+    """Fused result and slot allocation of one questionnaire result."""
+
+    __slots__ = ("fusion", "quest_mood", "quest_score", "slots")
+
+    def __init__(self, quest_result, num_songs, num_movies):
+        self.fusion = fuse_moods(questionnaire_mood_scores=quest_result["mood_scores"])
+        self.quest_mood = quest_result["top_mood"]
+        self.quest_score = max(quest_result["mood_scores"].values())
+        mood_vector = from_dict(self.fusion["final_scores"])
+        self.slots = (allocate_slots(mood_vector, num_songs),
+                      allocate_slots(mood_vector, num_movies))
+
+
+class QuestionnaireOnlyTable:
+    """
+    Fused results and slot allocations for every complete path of a
+    question graph.
+
+    Parameters
+    ----------
+    graph : questionnaire.graph.QuestionGraph
+        Compiled question tree.
+    num_songs, num_movies : int
+        Items shown per results page.
+    """
+
+    def __init__(self, graph, num_songs=NUM_SONGS, num_movies=NUM_MOVIES):
+        self.fingerprint = graph.fingerprint
+        self.num_songs = num_songs
+        self.num_movies = num_movies
+        self.pid = os.getpid()
+
+        self._entries = {}
+        for result in graph.paths.values():
+            signature = result_signature(result)
+            if signature not in self._entries:
+                self._entries[signature] = _Entry(result, num_songs, num_movies)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, quest_result):
+        """
+        Fused result and recommendations for a questionnaire-only session.
+
+        Returns
+        -------
+        (fusion, recs) or None
+            fusion is the fuse_moods() result (shared; treat it as
+            read-only) and recs the get_recommendations() result; None
+            when no complete path yields `quest_result`'s distribution.
+        """
+        entry = self._entries.get(result_signature(quest_result))
+        if entry is None:
+            return None
+
+        final_mood = entry.fusion["final_mood"]
+        songs, movies = retrieve_items(
+            final_mood, self.num_songs, self.num_movies,
+            mood_scores=entry.fusion["final_scores"], slots=entry.slots,
+        )
+        enqueue_mood_log(
+            cnn_emotion=None,
+            cnn_confidence=None,
+            questionnaire_mood=entry.quest_mood,
+            questionnaire_score=entry.quest_score,
+            final_mood=final_mood,
+        )
+        return entry.fusion, {"mood": final_mood, "songs": songs, "movies": movies}
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_questionnaire_table(graph):
+    """
+    Return the process-wide table for `graph`, building it on first use
+    and after fork (or when called with a graph compiled from another
+    tree, as tests and benchmarks may do).
+    """
+    global _table
+    table = _table
+    if table is None or table.pid != os.getpid() or table.fingerprint != graph.fingerprint:
+        with _table_lock:
+            table = _table
+            if (table is None or table.pid != os.getpid()
+                    or table.fingerprint != graph.fingerprint):
+                table = _table = QuestionnaireOnlyTable(graph)
+    return table
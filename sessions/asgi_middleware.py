@@ -0,0 +1,96 @@
+"""
+ASGI Server-Side Sessions
+Starlette middleware that keeps session data in a sessions.store backend.
+
+Drop-in for starlette's SessionMiddleware: handlers use request.session
+as before, but the cookie holds only a session id. Blocking stores
+(SQLite) are called through `run_blocking`, so the event loop never waits
+on the database.
+"""
+
+import os
+import sys
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.sessions import Session
+from starlette.requests import HTTPConnection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions.codec import SessionCodecError, decode_session, encode_session
+from sessions.store import new_session_id
+
+
+class ServerSideSessionMiddleware:
+    """
+    ASGI middleware backed by a session store.
+
+    Parameters
+    ----------
+    app : ASGI app
+    store : MemorySessionStore or SQLiteSessionStore
+    run_blocking : coroutine function, optional
+        `await run_blocking(fn, *args)` runs a blocking store call off the
+        loop; required when `store.blocking` is true.
+    session_cookie : str
+        Cookie name.
+    """
+
+    def __init__(self, app, store, run_blocking=None, session_cookie="session"):
+        if store.blocking and run_blocking is None:
+            raise ValueError("A blocking session store needs run_blocking.")
+        self.app = app
+        self.store = store
+        self.run_blocking = run_blocking if store.blocking else None
+        self.session_cookie = session_cookie
+        self.security_flags = "HttpOnly; SameSite=Lax"
+
+    async def _call(self, fn, *args):
+        if self.run_blocking is None:
+            return fn(*args)
+        return await self.run_blocking(fn, *args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        sid = HTTPConnection(scope).cookies.get(self.session_cookie)
+        session = None
+        if sid:
+            blob = await self._call(self.store.get, sid)
+            if blob is not None:
+                try:
+                    session = Session(decode_session(blob))
+                except SessionCodecError:
+                    pass
+        if session is None:
+            sid = None  # the id is issued when the session is first saved
+            session = Session()
+        scope["session"] = session
+
+        async def send_wrapper(message):
+            nonlocal sid
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if session.accessed:
+                    headers.add_vary_header("Cookie")
+                if session.modified and session:
+                    if sid is None:
+                        sid = new_session_id()
+                        headers.append(
+                            "Set-Cookie",
+                            f"{self.session_cookie}={sid}; Path=/; {self.security_flags}",
+                        )
+                    await self._call(self.store.set, sid, encode_session(dict(session)))
+                elif session.modified and sid is not None:
+                    # Emptied session: drop it and its cookie
+                    await self._call(self.store.delete, sid)
+                    headers.append(
+                        "Set-Cookie",
+                        f"{self.session_cookie}=; Path=/; "
+                        f"Expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}",
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,161 @@
+"""
+Session Codec
+Compact binary encoding of session data for the server-side stores.
+
+The two values the app keeps per visitor have fixed shapes, so they are
+packed as structs with moods and emotions as one-byte indexes and mood
+vectors as six float32 values:
+
+    header       version (u8), flags (u8)
+    cnn_result   emotion, mood (u8), confidence (f32), mood_scores (6 × f32)
+    quest_result top_mood (u8), mood_scores (6 × f32), raw_scores (6 × f32)
+    extra        compact JSON of any other keys (or of values in another shape)
+
+A session holding both results takes 81 bytes. Scores are produced as
+float32 by the CNN and the scorer, so they survive the round trip
+unchanged.
+"""
+
+import json
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion.labels import EMOTION_LABELS
+from fusion.mood_vector import MOOD_CATEGORIES, MOOD_INDEX, NUM_MOODS
+
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<BB")
+_CNN = struct.Struct(f"<BBf{NUM_MOODS}f")
+_QUEST = struct.Struct(f"<B{NUM_MOODS}f{NUM_MOODS}f")
+
+_HAS_CNN = 1
+_HAS_QUEST = 2
+_HAS_EXTRA = 4
+
+_EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTION_LABELS)}
+_CNN_KEYS = {"emotion", "mood", "confidence", "mood_scores", "face_found"}
+_QUEST_KEYS = {"top_mood", "mood_scores", "raw_scores"}
+
+
+class SessionCodecError(ValueError):
+    """Raised when stored session bytes cannot be decoded."""
+
+
+def _is_scores(value):
+    return isinstance(value, dict) and value.keys() == MOOD_INDEX.keys()
+
+
+def _is_cnn_result(value):
+    return (
+        isinstance(value, dict) and value.keys() == _CNN_KEYS
+        and value["face_found"] is True
+        and value["emotion"] in _EMOTION_INDEX and value["mood"] in MOOD_INDEX
+        and _is_scores(value["mood_scores"])
+    )
+
+
+def _is_quest_result(value):
+    return (
+        isinstance(value, dict) and value.keys() == _QUEST_KEYS
+        and value["top_mood"] in MOOD_INDEX
+        and _is_scores(value["mood_scores"]) and _is_scores(value["raw_scores"])
+    )
+
+
+def _scores(values):
+    return dict(zip(MOOD_CATEGORIES, values))
+
+
+def _vector(scores):
+    return [scores[mood] for mood in MOOD_CATEGORIES]
+
+
+def encode_session(data):
+    """
+    Encode a session dict to bytes.
+
+    Parameters
+    ----------
+    data : dict
+        JSON-serializable session contents.
+
+    Returns
+    -------
+    bytes
+    """
+    flags = 0
+    parts = []
+    extra = dict(data)
+
+    cnn = extra.get("cnn_result")
+    if _is_cnn_result(cnn):
+        flags |= _HAS_CNN
+        parts.append(_CNN.pack(
+            _EMOTION_INDEX[cnn["emotion"]], MOOD_INDEX[cnn["mood"]],
+            cnn["confidence"], *_vector(cnn["mood_scores"]),
+        ))
+        del extra["cnn_result"]
+
+    quest = extra.get("quest_result")
+    if _is_quest_result(quest):
+        flags |= _HAS_QUEST
+        parts.append(_QUEST.pack(
+            MOOD_INDEX[quest["top_mood"]],
+            *_vector(quest["mood_scores"]), *_vector(quest["raw_scores"]),
+        ))
+        del extra["quest_result"]
+
+    if extra:
+        flags |= _HAS_EXTRA
+        parts.append(json.dumps(extra, separators=(",", ":")).encode("utf-8"))
+
+    return _HEADER.pack(FORMAT_VERSION, flags) + b"".join(parts)
+
+
+def decode_session(blob):
+    """
+    Decode bytes written by encode_session() into a new session dict.
+
+    Raises
+    ------
+    SessionCodecError
+        If the bytes are truncated, corrupt or from another format version.
+    """
+    try:
+        version, flags = _HEADER.unpack_from(blob)
+        if version != FORMAT_VERSION:
+            raise SessionCodecError(f"Unsupported session format version {version}.")
+        offset = _HEADER.size
+        data = {}
+
+        if flags & _HAS_CNN:
+            emotion, mood, confidence, *scores = _CNN.unpack_from(blob, offset)
+            offset += _CNN.size
+            data["cnn_result"] = {
+                "emotion": EMOTION_LABELS[emotion],
+                "mood": MOOD_CATEGORIES[mood],
+                "confidence": confidence,
+                "mood_scores": _scores(scores),
+                "face_found": True,
+            }
+
+        if flags & _HAS_QUEST:
+            top, *vectors = _QUEST.unpack_from(blob, offset)
+            offset += _QUEST.size
+            data["quest_result"] = {
+                "mood_scores": _scores(vectors[:NUM_MOODS]),
+                "top_mood": MOOD_CATEGORIES[top],
+                "raw_scores": _scores(vectors[NUM_MOODS:]),
+            }
+
+        if flags & _HAS_EXTRA:
+            data.update(json.loads(bytes(blob[offset:])))
+        elif offset != len(blob):
+            raise SessionCodecError("Trailing bytes after session data.")
+        return data
+    except (struct.error, IndexError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise SessionCodecError(f"Corrupt session data: {e}") from e
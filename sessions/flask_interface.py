@@ -0,0 +1,109 @@
+"""
+Flask Server-Side Sessions
+SessionInterface that keeps session data in a sessions.store backend.
+
+The cookie holds only a random session id; nothing is serialized, signed
+or verified per request. The store is read when a request opens its
+session and written only when the session was modified.
+"""
+
+import os
+import sys
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions.codec import SessionCodecError, decode_session, encode_session
+from sessions.store import new_session_id
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that tracks modification and remembers its id."""
+
+    def __init__(self, initial=None, sid=None):
+        def on_update(session):
+            session.modified = True
+            session.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface backed by a session store.
+
+    Parameters
+    ----------
+    store : MemorySessionStore or SQLiteSessionStore
+        Where session blobs live (see sessions.store).
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            blob = self.store.get(sid)
+            if blob is not None:
+                try:
+                    return ServerSideSession(decode_session(blob), sid=sid)
+                except SessionCodecError:
+                    pass
+        # The id is issued when the session is first saved
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session.modified:
+            return
+
+        # Emptied session: drop it and its cookie
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure,
+                    samesite=samesite, httponly=httponly,
+                )
+            return
+
+        new = session.sid is None
+        if new:
+            session.sid = new_session_id()
+        self.store.set(session.sid, encode_session(dict(session)))
+
+        # The id never changes, so the cookie is only sent once
+        if new:
+            response.set_cookie(
+                name, session.sid, expires=self.get_expiration_time(app, session),
+                httponly=httponly, domain=domain, path=path, secure=secure,
+                samesite=samesite,
+            )
+            response.vary.add("Cookie")
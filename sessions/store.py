@@ -0,0 +1,151 @@
+"""
+Server-Side Session Stores
+Keep session data on the server so the cookie only carries a session id.
+
+Two backends share one interface (get, set, delete), each storing the
+bytes produced by sessions.codec:
+
+    MemorySessionStore   in-process LRU with a TTL; fastest, but sessions
+                         live in one process (single-worker deployments)
+    SQLiteSessionStore   `sessions` table in the app database, shared by
+                         every worker process on the host
+
+get_session_store(backend) returns the process-wide store for a backend
+name ("memory" or "sqlite").
+"""
+
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+# Session tuning (configurable)
+SESSION_TTL = 24 * 60 * 60        # seconds a session lives after its last write
+MEMORY_MAX_SESSIONS = 100000      # LRU capacity of the in-process store
+SQLITE_PURGE_INTERVAL = 60.0      # seconds between deletes of expired rows
+
+SESSION_ID_BYTES = 16
+
+
+def new_session_id():
+    """Random, URL-safe session id (128 bits)."""
+    return secrets.token_urlsafe(SESSION_ID_BYTES)
+
+
+class MemorySessionStore:
+    """
+    In-process LRU of session blobs with a per-entry TTL.
+
+    Reads refresh an entry's LRU position; writes also restart its TTL.
+    When full, the least recently used session is evicted.
+    """
+
+    blocking = False
+
+    def __init__(self, max_sessions=MEMORY_MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.pid = os.getpid()
+        self._entries = OrderedDict()   # sid → (expires, blob)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """Return the stored bytes for `sid`, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return entry[1]
+
+    def set(self, sid, blob):
+        """Store `blob` under `sid`, evicting the oldest session if full."""
+        with self._lock:
+            self._entries[sid] = (time.monotonic() + self.ttl, blob)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        """Remove `sid` if present."""
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteSessionStore:
+    """
+    Session blobs in the `sessions` table of the app database.
+
+    Uses the pooled connections, so every worker process on the host sees
+    the same sessions. Expired rows are ignored on read and deleted at
+    most once per SQLITE_PURGE_INTERVAL, piggybacking on a write.
+    """
+
+    blocking = True
+
+    def __init__(self, ttl=SESSION_TTL, purge_interval=SQLITE_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.pid = os.getpid()
+        self._next_purge = 0.0
+
+    def get(self, sid):
+        """Return the stored bytes for `sid`, or None if missing or expired."""
+        with db_utils.pooled_connection() as conn:
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE sid = ? AND expires > ?", (sid, time.time())
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, sid, blob):
+        """Store `blob` under `sid` and restart its TTL."""
+        now = time.time()
+        with db_utils.pooled_connection() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+                (sid, blob, now + self.ttl),
+            )
+            if now >= self._next_purge:
+                self._next_purge = now + self.purge_interval
+                conn.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+
+    def delete(self, sid):
+        """Remove `sid` if present."""
+        with db_utils.pooled_connection() as conn, conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+SESSION_BACKENDS = {
+    "memory": MemorySessionStore,
+    "sqlite": SQLiteSessionStore,
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(backend="memory"):
+    """Return the process-wide store for `backend`, recreating it after fork."""
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(
+            f"Unknown session backend {backend!r}; expected one of {sorted(SESSION_BACKENDS)}."
+        )
+    store = _stores.get(backend)
+    if store is None or store.pid != os.getpid():
+        with _stores_lock:
+            store = _stores.get(backend)
+            if store is None or store.pid != os.getpid():
+                store = _stores[backend] = SESSION_BACKENDS[backend]()
+    return store
@@ -0,0 +1,72 @@
+"""
+Tests for the session codec
+Sessions must survive encode_session() / decode_session() unchanged.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion.mood_vector import MOOD_CATEGORIES
+from questionnaire.graph import get_question_graph
+from sessions.codec import (
+    FORMAT_VERSION, SessionCodecError, decode_session, encode_session,
+)
+
+
+def _float32_scores(values):
+    return {mood: float(np.float32(v)) for mood, v in zip(MOOD_CATEGORIES, values)}
+
+
+CNN_RESULT = {
+    "emotion": "happy",
+    "mood": "happy",
+    "confidence": float(np.float32(0.8123)),
+    "mood_scores": _float32_scores([0.7, 0.05, 0.05, 0.1, 0.05, 0.05]),
+    "face_found": True,
+}
+
+
+class CodecRoundTripTest(unittest.TestCase):
+
+    def assert_round_trip(self, data):
+        self.assertEqual(decode_session(encode_session(data)), data)
+
+    def test_empty_session(self):
+        self.assert_round_trip({})
+
+    def test_cnn_result(self):
+        self.assert_round_trip({"cnn_result": CNN_RESULT})
+
+    def test_every_questionnaire_result(self):
+        for quest_result in get_question_graph().paths.values():
+            self.assert_round_trip({"quest_result": quest_result})
+
+    def test_both_results_are_compact(self):
+        quest_result = next(iter(get_question_graph().paths.values()))
+        data = {"cnn_result": CNN_RESULT, "quest_result": quest_result}
+        self.assertEqual(len(encode_session(data)), 81)
+        self.assert_round_trip(data)
+
+    def test_other_keys_and_shapes_go_through_json(self):
+        self.assert_round_trip({"cnn_result": CNN_RESULT, "_flashes": [["info", "hi"]]})
+        self.assert_round_trip({"cnn_result": dict(CNN_RESULT, face_found=False)})
+        self.assert_round_trip({"quest_result": {"top_mood": "calm"}, "user": 7})
+
+
+class CodecErrorTest(unittest.TestCase):
+
+    def test_corrupt_data_is_rejected(self):
+        blob = encode_session({"cnn_result": CNN_RESULT})
+        for bad in (b"", blob[:-1], blob + b"\0", bytes([FORMAT_VERSION + 1]) + blob[1:],
+                    encode_session({"a": 1})[:-1]):
+            with self.assertRaises(SessionCodecError):
+                decode_session(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
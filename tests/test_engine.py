@@ -0,0 +1,152 @@
+"""
+Tests for mood-blended recommendations
+Slot allocation totals and the per-mood sampling in the engine.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion.mood_vector import MOOD_CATEGORIES, NUM_MOODS
+from recommender import engine
+from recommender.embedding_index import MoodIndex, _l2_normalize
+from recommender.engine import _blend, allocate_slots
+
+
+def _fake_catalog(rows_per_mood):
+    """sample_fn over `rows_per_mood[mood]` rows per mood."""
+    rows = {
+        mood: [{"id": m * 1000 + i, "mood_tag": mood} for i in range(rows_per_mood[m])]
+        for m, mood in enumerate(MOOD_CATEGORIES)
+    }
+
+    def sample(mood_tag, limit):
+        return rows[mood_tag][:limit]
+    return sample
+
+
+class AllocateSlotsTest(unittest.TestCase):
+
+    def test_counts_sum_to_num_slots(self):
+        rng = np.random.default_rng(0)
+        for num_slots in (1, 5, 7, 10, 100):
+            for _ in range(200):
+                vector = rng.random(NUM_MOODS) * (rng.random(NUM_MOODS) > 0.4)
+                if not vector.any():
+                    continue
+                counts = allocate_slots(vector, num_slots)
+                self.assertEqual(int(counts.sum()), num_slots)
+                self.assertTrue((counts >= 0).all())
+                # Never more than one slot away from the exact share
+                quotas = vector / vector.sum() * num_slots
+                self.assertTrue((np.abs(counts - quotas) < 1).all())
+
+    def test_unscored_moods_get_nothing(self):
+        vector = np.array([0.41, 0, 0, 0, 0.39, 0.2])
+        counts = allocate_slots(vector, 5)
+        self.assertEqual(counts.tolist(), [2, 0, 0, 0, 2, 1])
+
+    def test_zero_vector_or_no_slots(self):
+        self.assertEqual(allocate_slots(np.zeros(NUM_MOODS), 5).sum(), 0)
+        self.assertEqual(allocate_slots(np.ones(NUM_MOODS), 0).sum(), 0)
+
+
+class BlendTest(unittest.TestCase):
+
+    def test_follows_the_allocation(self):
+        vector = np.array([0.6, 0, 0, 0, 0.4, 0])
+        items = _blend(_fake_catalog([10] * NUM_MOODS), vector, 5)
+        moods = [item["mood_tag"] for item in items]
+        self.assertEqual(moods.count("happy"), 3)
+        self.assertEqual(moods.count("excited"), 2)
+
+    def test_shortfall_is_topped_up(self):
+        # Every scored mood runs short; the rest comes from unscored moods
+        vector = np.array([0.5, 0, 0, 0, 0.3, 0.2])
+        items = _blend(_fake_catalog([1, 5, 5, 5, 2, 1]), vector, 5)
+        self.assertEqual(len(items), 5)
+        self.assertEqual(len({item["id"] for item in items}), 5)
+        self.assertEqual(sum(item["mood_tag"] == "sad" for item in items), 1)
+
+    def test_returns_what_the_catalog_has(self):
+        vector = np.ones(NUM_MOODS)
+        items = _blend(_fake_catalog([1] * NUM_MOODS), vector, 10)
+        self.assertEqual(len(items), NUM_MOODS)
+
+
+class _FakeSnapshot:
+    """Catalog backend over {id: item} with the snapshot's interface."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def version(self):
+        return 1
+
+    def sample(self, table, mood_tag, limit):
+        return [item for item in self.items.values() if item["mood_tag"] == mood_tag][:limit]
+
+    def get_many(self, table, ids):
+        return [self.items[i] for i in ids]
+
+
+def _fake_index(vectors_per_mood):
+    """MoodIndex (flat) over the given raw vectors of each mood, grouped by mood."""
+    ids, vectors, items = [], [], {}
+    mood_offsets = [0]
+    for m, mood in enumerate(MOOD_CATEGORIES):
+        for i, vector in enumerate(vectors_per_mood[m]):
+            item_id = m * 1000 + i
+            ids.append(item_id)
+            vectors.append(vector)
+            items[item_id] = {"id": item_id, "mood_tag": mood}
+        mood_offsets.append(len(ids))
+    mood_offsets.append(len(ids))
+    index = MoodIndex(_l2_normalize(np.array(vectors, dtype=np.float32)),
+                      np.array(ids, dtype=np.int64),
+                      np.array(mood_offsets, dtype=np.int64), catalog_version=1)
+    return index, _FakeSnapshot(items)
+
+
+class IndexRankingTest(unittest.TestCase):
+
+    def setUp(self):
+        one_hot = np.eye(NUM_MOODS)
+        # happy has 10 pure items and 2 that lean towards excited
+        vectors = [[one_hot[m]] * 10 for m in range(NUM_MOODS)]
+        vectors[0] = vectors[0] + [one_hot[0] + one_hot[4]] * 2
+        self.index, self.catalog = _fake_index(vectors)
+        for target, value in (("_catalog", lambda: self.catalog),
+                              ("get_mood_index", lambda table: self.index),
+                              ("USE_EMBEDDING_INDEX", True),
+                              ("BLEND_MOODS", True)):
+            patcher = mock.patch.object(engine, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_search_stays_in_mood(self):
+        ids = self.index.search(np.ones(NUM_MOODS), 5, mood=2)
+        self.assertTrue(all(2000 <= i < 3000 for i in ids))
+
+    def test_mixed_vector_keeps_the_allocation(self):
+        scores = {"happy": 0.6, "excited": 0.4}
+        songs, movies = engine.retrieve_items("happy", 5, 5, scores)
+        for items in (songs, movies):
+            moods = [item["mood_tag"] for item in items]
+            self.assertEqual(moods.count("happy"), 3)
+            self.assertEqual(moods.count("excited"), 2)
+
+    def test_ranks_within_each_mood(self):
+        songs, _ = engine.retrieve_items("happy", 5, 5, {"happy": 0.6, "excited": 0.4})
+        happy = {item["id"] for item in songs if item["mood_tag"] == "happy"}
+        # The two items closest to the mixed vector come first
+        self.assertTrue({10, 11} <= happy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for mood fusion
+The vectorized fusion keeps the dict-based results, including its ties.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion.mood_fusion import fuse_moods, fuse_vectors
+from fusion.mood_vector import MOOD_CATEGORIES, NUM_MOODS
+
+ZERO_SCORES = dict.fromkeys(MOOD_CATEGORIES, 0.0)
+
+
+class FuseMoodsTest(unittest.TestCase):
+
+    def test_no_input_is_neutral(self):
+        for cnn, quest in ((None, None), ({}, None), (None, {})):
+            result = fuse_moods(cnn, quest)
+            self.assertEqual(result["final_mood"], "neutral")
+            self.assertEqual(result["confidence"], 1.0)
+            self.assertFalse(result["cnn_used"] or result["quest_used"])
+
+    def test_zero_total_ties_to_the_first_mood(self):
+        for cnn, quest in ((ZERO_SCORES, None), (None, ZERO_SCORES),
+                           (ZERO_SCORES, ZERO_SCORES), ({"sad": 0.0}, None)):
+            result = fuse_moods(cnn, quest)
+            self.assertEqual(result["final_mood"], "happy")
+            self.assertEqual(result["confidence"], 0.0)
+            self.assertEqual(set(result["final_scores"].values()), {0.0})
+
+    def test_weighted_combination(self):
+        result = fuse_moods({"sad": 1.0}, {"happy": 1.0})
+        self.assertEqual(result["final_mood"], "sad")
+        self.assertAlmostEqual(result["final_scores"]["sad"], 0.6, places=6)
+        self.assertAlmostEqual(result["final_scores"]["happy"], 0.4, places=6)
+
+    def test_zero_source_gives_way_to_the_other(self):
+        result = fuse_moods(ZERO_SCORES, {"angry": 1.0})
+        self.assertEqual(result["final_mood"], "angry")
+        self.assertEqual(result["confidence"], 1.0)
+
+
+class FuseVectorsTest(unittest.TestCase):
+
+    def test_rows_without_a_source_get_the_fallback(self):
+        cnn = np.zeros((2, NUM_MOODS))
+        cnn[0, 1] = 1.0
+        fused = fuse_vectors(cnn, np.zeros((2, NUM_MOODS)))
+        self.assertEqual(fused[0].argmax(), 1)
+        self.assertEqual(fused[1].tolist(), [0, 0, 0, 1, 0, 0])
+        zeros = fuse_vectors(cnn, np.zeros((2, NUM_MOODS)), fallback=None)
+        self.assertFalse(zeros[1].any())
+
+
+if __name__ == "__main__":
+    unittest.main()
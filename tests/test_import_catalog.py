@@ -0,0 +1,155 @@
+"""
+Tests for the bulk catalog importer
+An interrupted import resumes from its last checkpoint without losing or
+duplicating rows.
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils, import_catalog
+from database.import_catalog import CatalogImportError
+from fusion.mood_vector import MOOD_CATEGORIES
+
+NUM_ROWS = 250
+REJECTED = {7, 100, 201}    # rows written with an unknown mood
+
+
+def _songs():
+    for i in range(NUM_ROWS):
+        mood = "bored" if i in REJECTED else MOOD_CATEGORIES[i % len(MOOD_CATEGORIES)]
+        # Quoted newlines and commas make CSV records span several lines
+        title = f"Song {i}\nlive, remastered" if i % 10 == 0 else f"Song {i}"
+        yield {"title": title, "artist": f"Artist {i}", "genre": "Pop",
+               "mood_tag": mood, "youtube_url": f"https://youtu.be/{i}"}
+
+
+def _interrupt_after(count):
+    """validate_record() that raises KeyboardInterrupt on call `count`."""
+    real = import_catalog.validate_record
+    calls = [0]
+
+    def validate(table, record):
+        calls[0] += 1
+        if calls[0] > count:
+            raise KeyboardInterrupt
+        return real(table, record)
+    return validate
+
+
+class ImportResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._db_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(self._tmp.name, "test.db")
+
+    def tearDown(self):
+        db_utils.DB_PATH = self._db_path
+        self._tmp.cleanup()
+
+    def write_csv(self):
+        path = os.path.join(self._tmp.name, "songs.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=import_catalog.CATALOG_COLUMNS["songs"])
+            writer.writeheader()
+            writer.writerows(_songs())
+        return path
+
+    def write_jsonl(self):
+        path = os.path.join(self._tmp.name, "songs.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for song in _songs():
+                f.write(json.dumps(song) + "\n")
+        return path
+
+    def imported_titles(self):
+        conn = db_utils.get_connection()
+        try:
+            return [row[0] for row in conn.execute("SELECT title FROM songs ORDER BY id")]
+        finally:
+            conn.close()
+
+    def import_(self, path, **kwargs):
+        return import_catalog.import_catalog(
+            "songs", path, chunk_size=10, commit_every=40, verbose=False, **kwargs
+        )
+
+    def assert_resumes(self, path):
+        with mock.patch.object(import_catalog, "validate_record", _interrupt_after(130)):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_(path)
+        partial = self.imported_titles()
+        self.assertTrue(0 < len(partial) < NUM_ROWS - len(REJECTED))
+
+        result = self.import_(path)
+        expected = [song["title"] for i, song in enumerate(_songs()) if i not in REJECTED]
+        self.assertEqual(self.imported_titles(), expected)
+        self.assertEqual(result["imported"], len(expected))
+        self.assertEqual(result["rejected"], len(REJECTED))
+
+    def test_csv_resume(self):
+        self.assert_resumes(self.write_csv())
+
+    def test_jsonl_resume(self):
+        self.assert_resumes(self.write_jsonl())
+
+    def test_completed_import_is_skipped(self):
+        path = self.write_jsonl()
+        self.import_(path)
+        self.assertEqual(self.import_(path)["seconds"], 0.0)
+        self.assertEqual(len(self.imported_titles()), NUM_ROWS - len(REJECTED))
+
+    def test_changed_file_needs_restart(self):
+        path = self.write_jsonl()
+        with mock.patch.object(import_catalog, "validate_record", _interrupt_after(50)):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(next(_songs())) + "\n")
+        with self.assertRaises(CatalogImportError):
+            self.import_(path)
+
+        result = self.import_(path, restart=True)
+        expected = NUM_ROWS - len(REJECTED) + 1
+        self.assertEqual(result["imported"], expected)
+        self.assertEqual(result["rejected"], len(REJECTED))
+        # The partial run's rows were replaced, not duplicated
+        self.assertEqual(len(self.imported_titles()), expected)
+
+    def test_restart_of_completed_import_replaces_its_rows(self):
+        path = self.write_csv()
+        self.import_(path)
+        self.import_(path, restart=True)
+        self.assertEqual(len(self.imported_titles()), NUM_ROWS - len(REJECTED))
+
+    def test_malformed_lines_are_rejected(self):
+        path = os.path.join(self._tmp.name, "songs.jsonl")
+        songs = list(_songs())[:60]
+        with open(path, "wb") as f:
+            for i, song in enumerate(songs):
+                f.write(json.dumps(song).encode("utf-8") + b"\n")
+                if i == 45:
+                    f.write(b'{"title": "cut off\n')     # invalid JSON
+                    f.write(b"[1, 2, 3]\n")              # not an object
+                    f.write(b"\xff\xfe not utf-8\n")
+        # Interrupt after the bad lines, then resume past them
+        with mock.patch.object(import_catalog, "validate_record", _interrupt_after(55)):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_(path)
+        result = self.import_(path)
+        valid = [s for i, s in enumerate(songs) if i not in REJECTED]
+        self.assertEqual(result["imported"], len(valid))
+        self.assertEqual(result["rejected"], 3 + len(REJECTED & set(range(60))))
+        self.assertEqual(self.imported_titles(), [s["title"] for s in valid])
+
+
+if __name__ == "__main__":
+    unittest.main()
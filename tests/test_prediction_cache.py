@@ -0,0 +1,84 @@
+"""
+Tests for the prediction result cache
+Single and batch predictions share entries; failures are never cached.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion import predict
+from emotion.result_cache import ResultCache
+
+FACE = np.zeros((48, 48), dtype=np.float32)
+PROBABILITIES = np.array([0.1, 0.0, 0.0, 0.7, 0.1, 0.1, 0.0], dtype=np.float32)
+
+
+def _fake_detect(image_bytes, reduced_decode=False):
+    """Bytes starting with F hold a face, with N none; anything else fails."""
+    if image_bytes.startswith(b"F"):
+        return FACE, None, (0, 0, 48, 48)
+    if image_bytes.startswith(b"N"):
+        return None, None, None
+    raise ValueError("Could not decode image from bytes.")
+
+
+class BatchCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.classified = []
+
+        def classify_many(faces):
+            self.classified.append(len(faces))
+            return np.tile(PROBABILITIES, (len(faces), 1))
+
+        for target, value in (("get_result_cache", lambda cache=ResultCache(): cache),
+                              ("detect_face_from_bytes", _fake_detect),
+                              ("classify_face", lambda face: PROBABILITIES),
+                              ("_classify_many", classify_many)):
+            patcher = mock.patch.object(predict, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_batch_hits_what_a_single_prediction_cached(self):
+        single = predict.predict_emotion_from_bytes(b"F1")
+        results = predict.predict_emotions_from_bytes([b"F1", b"F2"])
+        self.assertEqual(results[0], single)
+        self.assertEqual(self.classified, [1])  # only F2 was classified
+
+    def test_repeated_batch_is_served_from_the_cache(self):
+        images = [b"F1", b"N1", b"F2"]
+        first = predict.predict_emotions_from_bytes(images)
+        second = predict.predict_emotions_from_bytes(images)
+        self.assertEqual(first, second)
+        self.assertEqual(self.classified, [2, 0])
+        self.assertEqual([r["face_found"] for r in second], [True, False, True])
+
+    def test_errors_are_not_cached(self):
+        with mock.patch.object(predict, "_detect_for_batch",
+                               wraps=predict._detect_for_batch) as detect:
+            for _ in range(2):
+                results = predict.predict_emotions_from_bytes([b"bad"])
+                self.assertIn("error", results[0])
+        self.assertEqual(detect.call_count, 2)
+
+
+class ModelIdentityTest(unittest.TestCase):
+
+    def test_identity_without_model_files_is_stable(self):
+        identities = set()
+        for _ in range(2):
+            with mock.patch.object(predict, "_model_id", None), \
+                    mock.patch.object(predict, "SERVING_MODEL_PATH", "/nonexistent/a"), \
+                    mock.patch.object(predict, "KERAS_MODEL_PATH", "/nonexistent/b"):
+                identities.add(predict.model_identity())
+        self.assertEqual(len(identities), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
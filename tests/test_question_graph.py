@@ -0,0 +1,89 @@
+"""
+Tests for the compiled question graph
+Runtime edits of QUESTIONS reach the graph and the questionnaire-only table.
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from questionnaire import graph as graph_module
+from questionnaire.graph import get_question_graph, tree_fingerprint
+from questionnaire.questions import QUESTIONS
+from recommender.questionnaire_table import get_questionnaire_table
+
+
+class QuestionEditTest(unittest.TestCase):
+
+    def setUp(self):
+        original = copy.deepcopy(QUESTIONS)
+        self.graph = get_question_graph()
+
+        def restore():
+            QUESTIONS.clear()
+            QUESTIONS.update(original)
+            graph_module._graph = self.graph
+            graph_module._rejected = None
+            graph_module._next_check = 0.0
+        self.addCleanup(restore)
+
+    def recheck(self):
+        graph_module._next_check = 0.0
+        return get_question_graph()
+
+    def test_fingerprint_matches_the_compiled_graph(self):
+        self.assertEqual(tree_fingerprint(QUESTIONS), self.graph.fingerprint)
+
+    def test_unchanged_tree_is_not_recompiled(self):
+        self.assertIs(self.recheck(), self.graph)
+
+    def test_edit_rebuilds_graph_and_table(self):
+        table = get_questionnaire_table(self.graph)
+        QUESTIONS["q1"]["options"][0]["mood_scores"] = {"sad": 1.0}
+
+        graph = self.recheck()
+        self.assertIsNot(graph, self.graph)
+        self.assertNotEqual(graph.fingerprint, self.graph.fingerprint)
+        self.assertNotEqual(graph.bodies["q1"], self.graph.bodies["q1"])
+
+        rebuilt = get_questionnaire_table(graph)
+        self.assertIsNot(rebuilt, table)
+        self.assertEqual(rebuilt.fingerprint, graph.fingerprint)
+
+    def test_invalid_edit_keeps_the_previous_graph(self):
+        QUESTIONS["q1"]["options"][0]["next_question_id"] = "no-such-question"
+        self.assertIs(self.recheck(), self.graph)
+        self.assertIs(self.recheck(), self.graph)
+
+
+def _path_responses(graph, key):
+    """Response list that walks the option indexes `key` from the root."""
+    responses, qid = [], graph.root
+    for option_index in key:
+        responses.append({"question_id": qid, "option_index": option_index})
+        qid = graph.questions[qid]["options"][option_index].get("next_question_id")
+    return responses
+
+
+class PathKeyTest(unittest.TestCase):
+
+    def test_complete_paths_round_trip(self):
+        graph = get_question_graph()
+        for key in graph.paths:
+            self.assertEqual(graph.path_key(_path_responses(graph, key)), key)
+
+    def test_non_integer_option_indexes_are_rejected(self):
+        graph = get_question_graph()
+        key = next(k for k in graph.paths if k[0] in (0, 1))
+        responses = _path_responses(graph, key)
+        for bad in (bool(key[0]), float(key[0]), str(key[0]), None):
+            with self.subTest(bad=bad):
+                changed = [dict(responses[0], option_index=bad)] + responses[1:]
+                self.assertIsNone(graph.path_key(changed))
+
+
+if __name__ == "__main__":
+    unittest.main()
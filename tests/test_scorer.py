@@ -0,0 +1,93 @@
+"""
+Tests for batch questionnaire scoring
+score_batch() must agree with score_responses() on every kind of input.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion.mood_vector import MOOD_INDEX, from_dict
+from questionnaire.graph import get_question_graph
+from questionnaire.questions import QUESTIONS
+from questionnaire.scorer import score_batch, score_responses
+
+
+def _path_responses(graph, key):
+    """Response list that walks the option indexes `key` from the root."""
+    responses, qid = [], graph.root
+    for option_index in key:
+        responses.append({"question_id": qid, "option_index": option_index})
+        qid = graph.questions[qid]["options"][option_index].get("next_question_id")
+    return responses
+
+
+class ScoreBatchTest(unittest.TestCase):
+
+    def assert_matches(self, batch):
+        vectors = score_batch(batch)
+        self.assertEqual(vectors.shape, (len(batch), 6))
+        for responses, vector in zip(batch, vectors):
+            expected = from_dict(score_responses(responses)["mood_scores"])
+            np.testing.assert_allclose(vector, expected, rtol=1e-6, atol=1e-7)
+
+    def test_every_complete_path(self):
+        graph = get_question_graph()
+        self.assert_matches([_path_responses(graph, key) for key in graph.paths])
+
+    def test_partial_and_empty_submissions(self):
+        qid = next(iter(QUESTIONS))
+        self.assert_matches([
+            [],
+            [{"question_id": qid, "option_index": 0}],
+            [{"question_id": qid, "option_index": 0}] * 3,
+        ])
+
+    def test_invalid_responses_are_ignored(self):
+        qid = next(iter(QUESTIONS))
+        num_options = len(QUESTIONS[qid]["options"])
+        self.assert_matches([
+            [{"question_id": "no-such-question", "option_index": 0}],
+            [{"question_id": qid, "option_index": num_options}],
+            [{"question_id": qid, "option_index": -1},
+             {"question_id": qid, "option_index": 1}],
+        ])
+
+
+def _python_scores(responses):
+    """The pre-vector scorer: plain float accumulation and normalization."""
+    raw = dict.fromkeys(MOOD_INDEX, 0.0)
+    for response in responses:
+        option = QUESTIONS[response["question_id"]]["options"][response["option_index"]]
+        for mood, score in option.get("mood_scores", {}).items():
+            raw[mood] += score
+    total = sum(raw.values())
+    return raw, {mood: score / total for mood, score in raw.items()}
+
+
+class FloatAccumulationTest(unittest.TestCase):
+
+    def test_matches_float64_scoring_on_every_path(self):
+        graph = get_question_graph()
+        for key in graph.paths:
+            responses = _path_responses(graph, key)
+            raw, scores = _python_scores(responses)
+            result = score_responses(responses)
+            # Scores are summed and normalized in float64, then rounded once
+            np.testing.assert_array_equal(
+                from_dict(result["raw_scores"]),
+                np.array([raw[m] for m in MOOD_INDEX], dtype=np.float32),
+            )
+            np.testing.assert_array_equal(
+                from_dict(result["mood_scores"]),
+                np.array([scores[m] for m in MOOD_INDEX], dtype=np.float32),
+            )
+            self.assertEqual(graph.paths[key]["mood_scores"], result["mood_scores"])
+
+
+if __name__ == "__main__":
+    unittest.main()
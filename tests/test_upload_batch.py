@@ -0,0 +1,121 @@
+"""
+Tests for the upload endpoints
+Empty and undecodable images become per-image errors in a batch and a 400
+for a single upload, never a 500.
+"""
+
+import io
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db_utils
+
+_tmp = None
+_patches = []
+client = None
+
+
+def setUpModule():
+    global _tmp, client
+    # app seeds its database at import, so point it at a scratch copy first
+    _tmp = tempfile.TemporaryDirectory()
+    _patches[:] = [
+        mock.patch.object(db_utils, "DB_PATH", os.path.join(_tmp.name, "test.db")),
+        mock.patch.dict(os.environ, {"EMOTION_WARMUP": "0"}),
+    ]
+    for patcher in _patches:
+        patcher.start()
+    from app import app
+    client = app.test_client()
+
+
+def tearDownModule():
+    from database.log_writer import flush_mood_log
+    flush_mood_log()
+    db_utils.close_pool()
+    for patcher in reversed(_patches):
+        patcher.stop()
+    _tmp.cleanup()
+
+
+def _jpeg(width, height):
+    ok, buf = cv2.imencode(".jpg", np.full((height, width, 3), 128, np.uint8))
+    return buf.tobytes()
+
+
+BLANK = _jpeg(64, 64)
+BAD_IMAGES = {
+    "empty": b"",
+    "garbage": b"not an image at all",
+    "jpeg marker only": b"\xff\xd8\xff",
+    "truncated large jpeg": _jpeg(2000, 1500)[:600],
+}
+
+
+class UploadBatchTest(unittest.TestCase):
+
+    def post_files(self, images):
+        return client.post(
+            "/api/upload-batch",
+            data={"images": [(io.BytesIO(data), f"{i}.jpg") for i, data in enumerate(images)]},
+            content_type="multipart/form-data",
+        )
+
+    def post_packed(self, images):
+        body = b"".join(struct.pack("<I", len(data)) + data for data in images)
+        return client.post("/api/upload-batch", data=body,
+                           content_type="application/octet-stream")
+
+    def assert_per_image_errors(self, response, count):
+        self.assertEqual(response.status_code, 200, response.get_json())
+        payload = response.get_json()
+        self.assertEqual(payload["count"], count)
+        self.assertEqual(payload["faces_found"], 0)
+        return payload["results"]
+
+    def test_bad_images_in_multipart_batch(self):
+        for name, data in BAD_IMAGES.items():
+            with self.subTest(name):
+                results = self.assert_per_image_errors(self.post_files([data, BLANK]), 2)
+                self.assertFalse(results[0]["face_found"])
+                self.assertIn("error", results[0])
+                self.assertFalse(results[1]["face_found"])
+
+    def test_bad_images_in_packed_batch(self):
+        images = list(BAD_IMAGES.values()) + [BLANK]
+        results = self.assert_per_image_errors(self.post_packed(images), len(images))
+        self.assertTrue(all("decode" in r["error"] or "Empty" in r["error"]
+                            for r in results[:-1]))
+
+    def test_malformed_requests_are_rejected(self):
+        self.assertEqual(self.post_files([]).status_code, 400)
+        truncated = struct.pack("<I", 100) + b"short"
+        response = client.post("/api/upload-batch", data=truncated,
+                               content_type="application/octet-stream")
+        self.assertEqual(response.status_code, 400)
+
+
+class UploadImageTest(unittest.TestCase):
+
+    def test_undecodable_image_is_a_bad_request(self):
+        for name, data in BAD_IMAGES.items():
+            with self.subTest(name):
+                response = client.post(
+                    "/upload", data={"image": (io.BytesIO(data), "face.jpg")},
+                    content_type="multipart/form-data",
+                )
+                self.assertEqual(response.status_code, 400, response.get_json())
+                self.assertIn("error", response.get_json())
+
+
+if __name__ == "__main__":
+    unittest.main()